@@ -9,7 +9,7 @@ from datetime import datetime
 from utils import count_records, get_db_connection
 
 def generate_stats():
-    """Generate database statistics"""
+    """Generate database statistics (row counts tracked in ROW_COUNTS)"""
     
     tables = {
         'categories': 'CATEGORY',
@@ -4,10 +4,9 @@ Ensures database structure matches expected schema
 Used by GitHub Actions for testing
 """
 
-import sqlite3
 import sys
-from config import DATABASE_PATH
-from utils import setup_logger
+from config import get_setting
+from utils import setup_logger, open_db_connection
 
 logger = setup_logger('DatabaseValidator')
 
@@ -41,8 +40,7 @@ def validate_schema():
     logger.info("Starting database schema validation...")
     
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.execute('PRAGMA foreign_keys = ON')
+        conn = open_db_connection(get_setting('DATABASE_PATH'), profile='readonly')
         
         all_valid = True
         
@@ -11,21 +11,20 @@ Generate CATEGORY records
 Creates realistic category data for the retail POS system
 """
 
-import random
+from seeding import rand
 from datetime import datetime
-from config import (
-    REAL_CATEGORIES, 
-    BATCH_SIZES,
-    PRODUCT_PREFIXES,
-    PRODUCT_CATEGORIES_WORDS
-)
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
+    remaining_keys,
+    sample_keyspace,
+    GenerationResult,
     log_generation_summary,
-    count_records
+    count_records,
+    check_cancelled
 )
 
 # Setup logger
@@ -35,39 +34,60 @@ logger = setup_logger('CategoryGenerator')
 # CATEGORY GENERATION LOGIC
 # ============================================
 
+# Variations of a real category name
+CATEGORY_VARIATIONS = [
+    "{} & Accessories",
+    "{} Care",
+    "General {}",
+    "{} Products",
+    "Specialty {}"
+]
+
+# Words for completely new categories (optionally prefixed)
+CATEGORY_WORDS = [
+    "Health", "Wellness", "Beauty", "Personal Care",
+    "Medical", "Nutrition", "Supplements", "Skincare",
+    "Bodycare", "Healthcare", "Lifestyle", "Essentials"
+]
+
+def category_prefixes():
+    """Prefixes for new categories, weighted to no prefix"""
+    return ["", ""] + get_setting('PRODUCT_PREFIXES')[:10]
+
 def generate_category_name():
     """Generate realistic category name"""
     
     # 70% chance: Use real category from data
-    if random.random() < 0.7 and REAL_CATEGORIES:
-        base_category = random.choice(REAL_CATEGORIES)
+    real_categories = get_setting('REAL_CATEGORIES')
+    if rand.random() < 0.7 and real_categories:
+        base_category = rand.choice(real_categories)
         
         # 80% chance: Return as-is, 20% chance: Add variation
-        if random.random() < 0.8:
+        if rand.random() < 0.8:
             return base_category
         else:
             # Add variation
-            variations = [
-                f"{base_category} & Accessories",
-                f"{base_category} Care",
-                f"General {base_category}",
-                f"{base_category} Products",
-                f"Specialty {base_category}"
-            ]
-            return random.choice(variations)
+            return rand.choice(CATEGORY_VARIATIONS).format(base_category)
     
     # 30% chance: Generate completely new category
-    prefix = random.choice(["", ""] + PRODUCT_PREFIXES[:10])  # Weighted to no prefix
-    category_word = random.choice([
-        "Health", "Wellness", "Beauty", "Personal Care",
-        "Medical", "Nutrition", "Supplements", "Skincare",
-        "Bodycare", "Healthcare", "Lifestyle", "Essentials"
-    ])
+    prefix = rand.choice(category_prefixes())
+    category_word = rand.choice(CATEGORY_WORDS)
     
     if prefix:
         return f"{prefix} {category_word}"
     return category_word
 
+def category_name_space():
+    """Every name generate_category_name() can produce"""
+    real_categories = get_setting('REAL_CATEGORIES')
+    names = list(real_categories)
+    names += [variation.format(base) for base in real_categories for variation in CATEGORY_VARIATIONS]
+    names += [
+        f"{prefix} {word}" if prefix else word
+        for prefix in category_prefixes() for word in CATEGORY_WORDS
+    ]
+    return list(dict.fromkeys(names))
+
 def generate_category_description(name):
     """Generate description for category"""
     templates = [
@@ -78,24 +98,31 @@ def generate_category_description(name):
         f"Essential {name.lower()} products",
         None  # 1 in 6 chance of no description
     ]
-    return random.choice(templates)
+    return rand.choice(templates)
 
 def category_exists(name):
-    """Check if category with name already exists"""
-    return record_exists('CATEGORY', 'Category_Name', name)
+    """Check if category with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('CATEGORY', 'Category_Name')
 
-def insert_category(name, description):
-    """Insert category into database"""
+def insert_categories(categories):
+    """
+    Insert batch of categories into database
+    
+    Args:
+        categories: List of (name, description) tuples
+    
+    Returns:
+        list: (category_id, error) for each category
+    """
     query = """
         INSERT INTO CATEGORY (Category_Name, Description)
         VALUES (?, ?)
     """
     try:
-        category_id = execute_query(query, (name, description))
-        return category_id
+        return insert_many(query, categories)
     except Exception as e:
-        logger.error(f"Failed to insert category '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert category batch: {e}")
+        return [(None, e)] * len(categories)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -109,46 +136,68 @@ def generate_categories(batch_size=None):
         batch_size: Number of categories to generate (default from config)
     
     Returns:
-        tuple: (success_count, failed_count)
+        GenerationResult: (success_count, failed_count), flagged if the
+        category name space ran out
     """
     if batch_size is None:
-        batch_size = BATCH_SIZES['CATEGORY']
+        batch_size = get_batch_size('CATEGORY')
     
     logger.info(f"Starting category generation - Batch size: {batch_size}")
     
+    # Only names that don't exist yet can be generated
+    category_names = get_unique_index('CATEGORY', 'Category_Name')
+    name_space = category_name_space()
+    remaining = len(remaining_keys(name_space, category_names))
+    
+    if remaining == 0:
+        logger.warning(f"Keyspace exhausted: all {len(name_space)} category names exist. Skipping.")
+        return GenerationResult(0, 0, keyspace_exhausted=True)
+    
+    keyspace_exhausted = remaining < batch_size
+    if keyspace_exhausted:
+        logger.warning(f"Only {remaining} category names left - generating {remaining}")
+        batch_size = remaining
+    
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    categories = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique category name
-            category_name = generate_unique_value(
+            # Generate unique category name (also unique within this batch)
+            category_name = reserve_unique_value(
                 generate_category_name,
-                category_exists,
+                category_names,
                 max_retries=20
             )
             
             if category_name is None:
-                logger.warning(f"Could not generate unique category name after max retries")
-                failed_count += 1
-                continue
+                # Random draws keep hitting taken names: pick one of those left
+                category_name = sample_keyspace(name_space, category_names, 1)[0]
             
             # Generate description
             description = generate_category_description(category_name)
             
-            # Insert into database
-            category_id = insert_category(category_name, description)
-            
-            if category_id:
-                logger.info(f"✓ Created category #{category_id}: {category_name}")
-                success_count += 1
-            else:
-                failed_count += 1
+            categories.append((category_name, description))
                 
         except Exception as e:
             logger.error(f"Error generating category: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_categories(categories)
+    
+    for (category_name, description), (category_id, error) in zip(categories, results):
+        if category_id:
+            logger.debug(f"✓ Created category #{category_id}: {category_name}")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert category '{category_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'CATEGORY', success_count, failed_count, batch_size)
     
@@ -156,7 +205,7 @@ def generate_categories(batch_size=None):
     total_categories = count_records('CATEGORY')
     logger.info(f"Total categories in database: {total_categories}")
     
-    return success_count, failed_count
+    return GenerationResult(success_count, failed_count, keyspace_exhausted)
 
 # ============================================
 # SCRIPT EXECUTION
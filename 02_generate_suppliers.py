@@ -11,18 +11,19 @@ Generate SUPPLIER records
 Creates realistic supplier/vendor data
 """
 
-import random
+from seeding import rand
 from datetime import datetime
-from config import REAL_SUPPLIERS, BATCH_SIZES
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
     log_generation_summary,
     count_records,
     random_phone,
-    random_email
+    random_email,
+    check_cancelled
 )
 
 # Setup logger
@@ -50,26 +51,27 @@ def generate_supplier_name():
     """Generate realistic supplier name"""
     
     # 50% chance: Use pattern from real supplier codes
-    if random.random() < 0.5 and REAL_SUPPLIERS:
-        code = random.choice(REAL_SUPPLIERS).replace('.', '').upper()
+    real_suppliers = get_setting('REAL_SUPPLIERS')
+    if rand.random() < 0.5 and real_suppliers:
+        code = rand.choice(real_suppliers).replace('.', '').upper()
         
         # Expand code into full company name
         if len(code) <= 4:
-            prefix = random.choice(SUPPLIER_PREFIXES)
-            suffix = random.choice(SUPPLIER_COMPANY_TYPES)
+            prefix = rand.choice(SUPPLIER_PREFIXES)
+            suffix = rand.choice(SUPPLIER_COMPANY_TYPES)
             return f"{prefix} {suffix} ({code})"
         else:
-            suffix = random.choice(SUPPLIER_COMPANY_TYPES)
+            suffix = rand.choice(SUPPLIER_COMPANY_TYPES)
             return f"{code} {suffix}"
     
     # 50% chance: Generate new supplier name
     structures = [
-        lambda: f"{random.choice(SUPPLIER_PREFIXES)} {random.choice(SUPPLIER_COMPANY_TYPES)} Pty Ltd",
-        lambda: f"{random.choice(['ABC', 'XYZ', 'RST', 'MNO', 'DEF'])} {random.choice(SUPPLIER_COMPANY_TYPES)}",
-        lambda: f"{random.choice(SUPPLIER_COMPANY_TYPES)} {random.choice(['Direct', 'Plus', 'Pro', 'Express'])}",
+        lambda: f"{rand.choice(SUPPLIER_PREFIXES)} {rand.choice(SUPPLIER_COMPANY_TYPES)} Pty Ltd",
+        lambda: f"{rand.choice(['ABC', 'XYZ', 'RST', 'MNO', 'DEF'])} {rand.choice(SUPPLIER_COMPANY_TYPES)}",
+        lambda: f"{rand.choice(SUPPLIER_COMPANY_TYPES)} {rand.choice(['Direct', 'Plus', 'Pro', 'Express'])}",
     ]
     
-    return random.choice(structures)()
+    return rand.choice(structures)()
 
 def generate_contact_name():
     """Generate contact person name"""
@@ -83,18 +85,18 @@ def generate_contact_name():
     ]
     
     # 20% chance of no contact name
-    if random.random() < 0.2:
+    if rand.random() < 0.2:
         return None
     
-    return f"{random.choice(first_names)} {random.choice(last_names)}"
+    return f"{rand.choice(first_names)} {rand.choice(last_names)}"
 
 def generate_address():
     """Generate Australian business address"""
     # 30% chance of no address
-    if random.random() < 0.3:
+    if rand.random() < 0.3:
         return None
     
-    street_number = random.randint(1, 999)
+    street_number = rand.randint(1, 999)
     street_names = [
         "George", "Pitt", "King", "Elizabeth", "Bourke",
         "Collins", "Swanston", "Queen", "Flinders", "Market"
@@ -108,31 +110,40 @@ def generate_address():
     
     states = ["NSW", "VIC", "QLD", "WA", "SA", "TAS", "NT", "ACT"]
     
-    street = f"{street_number} {random.choice(street_names)} {random.choice(street_types)}"
-    suburb = random.choice(suburbs)
-    state = random.choice(states)
-    postcode = random.randint(2000, 7999)
+    street = f"{street_number} {rand.choice(street_names)} {rand.choice(street_types)}"
+    suburb = rand.choice(suburbs)
+    state = rand.choice(states)
+    postcode = rand.randint(2000, 7999)
     
     return f"{street}, {suburb} {state} {postcode}"
 
 def generate_payment_terms():
     """Generate payment terms"""
     # 40% chance of no payment terms
-    if random.random() < 0.4:
+    if rand.random() < 0.4:
         return None
     
     terms = [
         "Net 7", "Net 14", "Net 30", "Net 60", "Net 90",
         "EOM", "COD", "Due on Receipt", "2/10 Net 30"
     ]
-    return random.choice(terms)
+    return rand.choice(terms)
 
 def supplier_exists(name):
-    """Check if supplier with name already exists"""
-    return record_exists('SUPPLIER', 'Supplier_Name', name)
+    """Check if supplier with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('SUPPLIER', 'Supplier_Name')
 
-def insert_supplier(name, contact_name, contact_phone, contact_email, address, payment_terms, active_status):
-    """Insert supplier into database"""
+def insert_suppliers(suppliers):
+    """
+    Insert batch of suppliers into database
+    
+    Args:
+        suppliers: List of (name, contact_name, contact_phone, contact_email,
+                   address, payment_terms, active_status) tuples
+    
+    Returns:
+        list: (supplier_id, error) for each supplier
+    """
     query = """
         INSERT INTO SUPPLIER (
             Supplier_Name, Contact_Name, Contact_Phone, Contact_Email,
@@ -141,14 +152,10 @@ def insert_supplier(name, contact_name, contact_phone, contact_email, address, p
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """
     try:
-        supplier_id = execute_query(query, (
-            name, contact_name, contact_phone, contact_email,
-            address, payment_terms, active_status
-        ))
-        return supplier_id
+        return insert_many(query, suppliers)
     except Exception as e:
-        logger.error(f"Failed to insert supplier '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert supplier batch: {e}")
+        return [(None, e)] * len(suppliers)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -157,19 +164,23 @@ def insert_supplier(name, contact_name, contact_phone, contact_email, address, p
 def generate_suppliers(batch_size=None):
     """Generate batch of supplier records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['SUPPLIER']
+        batch_size = get_batch_size('SUPPLIER')
     
     logger.info(f"Starting supplier generation - Batch size: {batch_size}")
     
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    suppliers = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique supplier name
-            supplier_name = generate_unique_value(
+            # Generate unique supplier name (also unique within this batch)
+            supplier_name = reserve_unique_value(
                 generate_supplier_name,
-                supplier_exists,
+                get_unique_index('SUPPLIER', 'Supplier_Name'),
                 max_retries=20
             )
             
@@ -184,24 +195,29 @@ def generate_suppliers(batch_size=None):
             contact_email = random_email(supplier_name.split()[0]) if contact_name else None
             address = generate_address()
             payment_terms = generate_payment_terms()
-            active_status = 1 if random.random() < 0.95 else 0  # 95% active
+            active_status = 1 if rand.random() < 0.95 else 0  # 95% active
             
-            # Insert into database
-            supplier_id = insert_supplier(
+            suppliers.append((
                 supplier_name, contact_name, contact_phone, contact_email,
                 address, payment_terms, active_status
-            )
-            
-            if supplier_id:
-                logger.info(f"✓ Created supplier #{supplier_id}: {supplier_name}")
-                success_count += 1
-            else:
-                failed_count += 1
+            ))
                 
         except Exception as e:
             logger.error(f"Error generating supplier: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_suppliers(suppliers)
+    
+    for supplier, (supplier_id, error) in zip(suppliers, results):
+        supplier_name = supplier[0]
+        if supplier_id:
+            logger.debug(f"✓ Created supplier #{supplier_id}: {supplier_name}")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert supplier '{supplier_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'SUPPLIER', success_count, failed_count, batch_size)
     
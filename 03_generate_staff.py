@@ -11,18 +11,19 @@ Generate STAFF records
 Creates realistic staff/employee data based on real patterns
 """
 
-import random
+from seeding import rand, reference_time
 from datetime import datetime, timedelta
-from config import FIRST_NAMES, LAST_INITIALS, BATCH_SIZES
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
     log_generation_summary,
     count_records,
     random_date,
-    format_date_sqlite
+    format_date_sqlite,
+    check_cancelled
 )
 
 # Setup logger
@@ -41,9 +42,9 @@ JOB_ROLES = [
 
 def generate_staff_name():
     """Generate staff name in format: FirstName LastInitial ID"""
-    first_name = random.choice(FIRST_NAMES)
-    last_initial = random.choice(LAST_INITIALS)
-    staff_id_number = random.randint(10000, 999999)
+    first_name = rand.choice(get_setting('FIRST_NAMES'))
+    last_initial = rand.choice(get_setting('LAST_INITIALS'))
+    staff_id_number = rand.randint(10000, 999999)
     
     # Match real pattern: "Andy R 61499" (name, space, initial, space, ID)
     return f"{first_name} {last_initial} {staff_id_number}"
@@ -51,12 +52,12 @@ def generate_staff_name():
 def generate_hire_date():
     """Generate realistic hire date"""
     # 30% chance of no hire date
-    if random.random() < 0.3:
+    if rand.random() < 0.3:
         return None
     
     # Hire date between 5 years ago and 1 month ago
-    end_date = datetime.now() - timedelta(days=30)
-    start_date = datetime.now() - timedelta(days=365*5)
+    end_date = reference_time() - timedelta(days=30)
+    start_date = reference_time() - timedelta(days=365*5)
     
     hire_date = random_date(start_date, end_date)
     return format_date_sqlite(hire_date)
@@ -64,27 +65,34 @@ def generate_hire_date():
 def generate_role():
     """Generate job role"""
     # 20% chance of no role specified
-    if random.random() < 0.2:
+    if rand.random() < 0.2:
         return None
     
-    return random.choice(JOB_ROLES)
+    return rand.choice(JOB_ROLES)
 
 def staff_exists(name):
-    """Check if staff with name already exists"""
-    return record_exists('STAFF', 'Staff_Name', name)
+    """Check if staff with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('STAFF', 'Staff_Name')
 
-def insert_staff(name, active_status, hire_date, role):
-    """Insert staff into database"""
+def insert_staff(staff):
+    """
+    Insert batch of staff into database
+    
+    Args:
+        staff: List of (name, active_status, hire_date, role) tuples
+    
+    Returns:
+        list: (staff_id, error) for each staff member
+    """
     query = """
         INSERT INTO STAFF (Staff_Name, Active_Status, Hire_Date, Role)
         VALUES (?, ?, ?, ?)
     """
     try:
-        staff_id = execute_query(query, (name, active_status, hire_date, role))
-        return staff_id
+        return insert_many(query, staff)
     except Exception as e:
-        logger.error(f"Failed to insert staff '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert staff batch: {e}")
+        return [(None, e)] * len(staff)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -93,19 +101,23 @@ def insert_staff(name, active_status, hire_date, role):
 def generate_staff(batch_size=None):
     """Generate batch of staff records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['STAFF']
+        batch_size = get_batch_size('STAFF')
     
     logger.info(f"Starting staff generation - Batch size: {batch_size}")
     
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    staff = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique staff name
-            staff_name = generate_unique_value(
+            # Generate unique staff name (also unique within this batch)
+            staff_name = reserve_unique_value(
                 generate_staff_name,
-                staff_exists,
+                get_unique_index('STAFF', 'Staff_Name'),
                 max_retries=50  # Higher retries due to ID randomness
             )
             
@@ -115,23 +127,27 @@ def generate_staff(batch_size=None):
                 continue
             
             # Generate other fields
-            active_status = 1 if random.random() < 0.92 else 0  # 92% active
+            active_status = 1 if rand.random() < 0.92 else 0  # 92% active
             hire_date = generate_hire_date()
             role = generate_role()
             
-            # Insert into database
-            staff_id = insert_staff(staff_name, active_status, hire_date, role)
-            
-            if staff_id:
-                logger.info(f"✓ Created staff #{staff_id}: {staff_name} ({role or 'No role'})")
-                success_count += 1
-            else:
-                failed_count += 1
+            staff.append((staff_name, active_status, hire_date, role))
                 
         except Exception as e:
             logger.error(f"Error generating staff: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_staff(staff)
+    
+    for (staff_name, active_status, hire_date, role), (staff_id, error) in zip(staff, results):
+        if staff_id:
+            logger.debug(f"✓ Created staff #{staff_id}: {staff_name} ({role or 'No role'})")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert staff '{staff_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'STAFF', success_count, failed_count, batch_size)
     
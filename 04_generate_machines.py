@@ -11,18 +11,19 @@ Generate MACHINE records
 Creates realistic POS terminal/machine data
 """
 
-import random
+from seeding import rand, reference_time
 from datetime import datetime, timedelta
-from config import REAL_MACHINES, BATCH_SIZES
+from config import get_batch_size
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
     log_generation_summary,
     count_records,
     random_date,
-    format_date_sqlite
+    format_date_sqlite,
+    check_cancelled
 )
 
 # Setup logger
@@ -42,16 +43,16 @@ LOCATIONS = [
 
 def generate_machine_name():
     """Generate machine name in TILLXX format"""
-    # Get existing machines to find next number
-    existing = execute_query(
-        "SELECT Machine_Name FROM MACHINE WHERE Machine_Name LIKE 'TILL%'",
-        fetch=True
-    )
+    # Existing machines (including names generated earlier this run) give the next number
+    existing = [
+        name for name in get_unique_index('MACHINE', 'Machine_Name')
+        if name.upper().startswith('TILL')
+    ]
     
     existing_numbers = []
-    for (name,) in existing:
+    for name in existing:
         try:
-            num = int(name.replace('TILL', '').replace('0', ''))
+            num = int(name[len('TILL'):])
             existing_numbers.append(num)
         except:
             continue
@@ -63,49 +64,56 @@ def generate_machine_name():
         next_num = 1
     
     # 80% chance: Use TILLXX format, 20% chance: Use custom name
-    if random.random() < 0.8:
+    if rand.random() < 0.8:
         return f"TILL{next_num:02d}"
     else:
         prefixes = ["POS", "TERMINAL", "REGISTER", "CHECKOUT"]
-        return f"{random.choice(prefixes)}{next_num:02d}"
+        return f"{rand.choice(prefixes)}{next_num:02d}"
 
 def generate_location():
     """Generate machine location"""
     # 25% chance of no location
-    if random.random() < 0.25:
+    if rand.random() < 0.25:
         return None
     
-    return random.choice(LOCATIONS)
+    return rand.choice(LOCATIONS)
 
 def generate_install_date():
     """Generate installation date"""
     # 30% chance of no install date
-    if random.random() < 0.3:
+    if rand.random() < 0.3:
         return None
     
     # Install date between 3 years ago and 1 week ago
-    end_date = datetime.now() - timedelta(days=7)
-    start_date = datetime.now() - timedelta(days=365*3)
+    end_date = reference_time() - timedelta(days=7)
+    start_date = reference_time() - timedelta(days=365*3)
     
     install_date = random_date(start_date, end_date)
     return format_date_sqlite(install_date)
 
 def machine_exists(name):
-    """Check if machine with name already exists"""
-    return record_exists('MACHINE', 'Machine_Name', name)
+    """Check if machine with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('MACHINE', 'Machine_Name')
 
-def insert_machine(name, location, active_status, install_date):
-    """Insert machine into database"""
+def insert_machines(machines):
+    """
+    Insert batch of machines into database
+    
+    Args:
+        machines: List of (name, location, active_status, install_date) tuples
+    
+    Returns:
+        list: (machine_id, error) for each machine
+    """
     query = """
         INSERT INTO MACHINE (Machine_Name, Location, Active_Status, Install_Date)
         VALUES (?, ?, ?, ?)
     """
     try:
-        machine_id = execute_query(query, (name, location, active_status, install_date))
-        return machine_id
+        return insert_many(query, machines)
     except Exception as e:
-        logger.error(f"Failed to insert machine '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert machine batch: {e}")
+        return [(None, e)] * len(machines)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -114,19 +122,23 @@ def insert_machine(name, location, active_status, install_date):
 def generate_machines(batch_size=None):
     """Generate batch of machine records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['MACHINE']
+        batch_size = get_batch_size('MACHINE')
     
     logger.info(f"Starting machine generation - Batch size: {batch_size}")
     
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    machines = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique machine name
-            machine_name = generate_unique_value(
+            # Generate unique machine name (also unique within this batch)
+            machine_name = reserve_unique_value(
                 generate_machine_name,
-                machine_exists,
+                get_unique_index('MACHINE', 'Machine_Name'),
                 max_retries=20
             )
             
@@ -137,22 +149,26 @@ def generate_machines(batch_size=None):
             
             # Generate other fields
             location = generate_location()
-            active_status = 1 if random.random() < 0.98 else 0  # 98% active
+            active_status = 1 if rand.random() < 0.98 else 0  # 98% active
             install_date = generate_install_date()
             
-            # Insert into database
-            machine_id = insert_machine(machine_name, location, active_status, install_date)
-            
-            if machine_id:
-                logger.info(f"✓ Created machine #{machine_id}: {machine_name} at {location or 'Unknown'}")
-                success_count += 1
-            else:
-                failed_count += 1
+            machines.append((machine_name, location, active_status, install_date))
                 
         except Exception as e:
             logger.error(f"Error generating machine: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_machines(machines)
+    
+    for (machine_name, location, active_status, install_date), (machine_id, error) in zip(machines, results):
+        if machine_id:
+            logger.debug(f"✓ Created machine #{machine_id}: {machine_name} at {location or 'Unknown'}")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert machine '{machine_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'MACHINE', success_count, failed_count, batch_size)
     
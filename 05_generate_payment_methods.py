@@ -11,16 +11,18 @@ Generate PAYMENT_METHOD records
 Creates realistic payment method reference data
 """
 
-import random
+from seeding import rand
 from datetime import datetime
-from config import REAL_PAYMENT_METHODS, BATCH_SIZES
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    sample_keyspace,
+    GenerationResult,
     log_generation_summary,
-    count_records
+    count_records,
+    check_cancelled
 )
 
 # Setup logger
@@ -30,8 +32,8 @@ logger = setup_logger('PaymentMethodGenerator')
 # PAYMENT METHOD GENERATION LOGIC
 # ============================================
 
-# Extended payment methods beyond real data
-EXTENDED_PAYMENT_METHODS = REAL_PAYMENT_METHODS + [
+# Payment methods beyond the real data
+EXTRA_PAYMENT_METHODS = [
     "VISA", "MASTERCARD", "AMEX", "PAYPAL", "AFTERPAY",
     "ZIP PAY", "MOBILE PAYMENT", "APPLE PAY", "GOOGLE PAY",
     "SAMSUNG PAY", "GIFT CARD", "STORE CREDIT", "VOUCHER"
@@ -79,24 +81,28 @@ PROCESSING_FEES = {
     "VOUCHER": 0.0
 }
 
-def generate_payment_method_name():
-    """Generate payment method name"""
-    return random.choice(EXTENDED_PAYMENT_METHODS)
-
 def get_payment_description(name):
     """Get description for payment method"""
     return PAYMENT_DESCRIPTIONS.get(name, f"{name} payment method")
 
 def get_processing_fee(name):
     """Get processing fee for payment method"""
-    return PROCESSING_FEES.get(name, round(random.uniform(0.5, 2.0), 2))
+    return PROCESSING_FEES.get(name, round(rand.uniform(0.5, 2.0), 2))
 
 def payment_method_exists(name):
-    """Check if payment method with name already exists"""
-    return record_exists('PAYMENT_METHOD', 'Payment_Method_Name', name)
+    """Check if payment method with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('PAYMENT_METHOD', 'Payment_Method_Name')
 
-def insert_payment_method(name, description, processing_fee, active_status):
-    """Insert payment method into database"""
+def insert_payment_methods(payment_methods):
+    """
+    Insert batch of payment methods into database
+    
+    Args:
+        payment_methods: List of (name, description, processing_fee, active_status) tuples
+    
+    Returns:
+        list: (payment_id, error) for each payment method
+    """
     query = """
         INSERT INTO PAYMENT_METHOD (
             Payment_Method_Name, Description, Processing_Fee_Percent, Active_Status
@@ -104,11 +110,10 @@ def insert_payment_method(name, description, processing_fee, active_status):
         VALUES (?, ?, ?, ?)
     """
     try:
-        payment_id = execute_query(query, (name, description, processing_fee, active_status))
-        return payment_id
+        return insert_many(query, payment_methods)
     except Exception as e:
-        logger.error(f"Failed to insert payment method '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert payment method batch: {e}")
+        return [(None, e)] * len(payment_methods)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -117,45 +122,57 @@ def insert_payment_method(name, description, processing_fee, active_status):
 def generate_payment_methods(batch_size=None):
     """Generate batch of payment method records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['PAYMENT_METHOD']
+        batch_size = get_batch_size('PAYMENT_METHOD')
     
     logger.info(f"Starting payment method generation - Batch size: {batch_size}")
     
+    # Draw this batch's names, without replacement, from those not taken yet
+    names = sample_keyspace(
+        get_setting('REAL_PAYMENT_METHODS') + EXTRA_PAYMENT_METHODS,
+        get_unique_index('PAYMENT_METHOD', 'Payment_Method_Name'),
+        batch_size
+    )
+    
+    if not names:
+        logger.warning("Keyspace exhausted: every payment method name exists. Skipping.")
+        return GenerationResult(0, 0, keyspace_exhausted=True)
+    
+    keyspace_exhausted = len(names) < batch_size
+    if keyspace_exhausted:
+        logger.warning(f"Only {len(names)} payment method names left - generating {len(names)}")
+        batch_size = len(names)
+    
     success_count = 0
     failed_count = 0
     
-    for i in range(batch_size):
+    # Build the whole batch in memory, then write it in one transaction
+    payment_methods = []
+    
+    for payment_name in names:
+        check_cancelled()
         try:
-            # Generate unique payment method name
-            payment_name = generate_unique_value(
-                generate_payment_method_name,
-                payment_method_exists,
-                max_retries=30
-            )
-            
-            if payment_name is None:
-                logger.warning(f"Could not generate unique payment method name after max retries")
-                failed_count += 1
-                continue
-            
             # Generate other fields
             description = get_payment_description(payment_name)
             processing_fee = get_processing_fee(payment_name)
-            active_status = 1 if random.random() < 0.96 else 0  # 96% active
-            
-            # Insert into database
-            payment_id = insert_payment_method(payment_name, description, processing_fee, active_status)
+            active_status = 1 if rand.random() < 0.96 else 0  # 96% active
             
-            if payment_id:
-                logger.info(f"✓ Created payment method #{payment_id}: {payment_name} ({processing_fee}% fee)")
-                success_count += 1
-            else:
-                failed_count += 1
+            payment_methods.append((payment_name, description, processing_fee, active_status))
                 
         except Exception as e:
             logger.error(f"Error generating payment method: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_payment_methods(payment_methods)
+    
+    for (payment_name, description, processing_fee, active_status), (payment_id, error) in zip(payment_methods, results):
+        if payment_id:
+            logger.debug(f"✓ Created payment method #{payment_id}: {payment_name} ({processing_fee}% fee)")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert payment method '{payment_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'PAYMENT_METHOD', success_count, failed_count, batch_size)
     
@@ -163,7 +180,7 @@ def generate_payment_methods(batch_size=None):
     total_payment_methods = count_records('PAYMENT_METHOD')
     logger.info(f"Total payment methods in database: {total_payment_methods}")
     
-    return success_count, failed_count
+    return GenerationResult(success_count, failed_count, keyspace_exhausted)
 
 # ============================================
 # SCRIPT EXECUTION
@@ -11,16 +11,17 @@ Generate TRANSACTION_TYPE records
 Creates realistic transaction type reference data
 """
 
-import random
 from datetime import datetime
-from config import REAL_TRANSACTION_TYPES, BATCH_SIZES
+from config import get_batch_size
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    sample_keyspace,
+    GenerationResult,
     log_generation_summary,
-    count_records
+    count_records,
+    check_cancelled
 )
 
 # Setup logger
@@ -94,10 +95,6 @@ TRANSACTION_TYPE_CONFIG = {
     }
 }
 
-def generate_transaction_type_name():
-    """Generate transaction type name"""
-    return random.choice(list(TRANSACTION_TYPE_CONFIG.keys()))
-
 def get_transaction_type_config(name):
     """Get configuration for transaction type"""
     return TRANSACTION_TYPE_CONFIG.get(name, {
@@ -107,11 +104,20 @@ def get_transaction_type_config(name):
     })
 
 def transaction_type_exists(name):
-    """Check if transaction type with name already exists"""
-    return record_exists('TRANSACTION_TYPE', 'Transaction_Type_Name', name)
+    """Check if transaction type with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('TRANSACTION_TYPE', 'Transaction_Type_Name')
 
-def insert_transaction_type(name, description, affects_inventory, affects_revenue):
-    """Insert transaction type into database"""
+def insert_transaction_types(transaction_types):
+    """
+    Insert batch of transaction types into database
+    
+    Args:
+        transaction_types: List of (name, description, affects_inventory,
+                           affects_revenue) tuples
+    
+    Returns:
+        list: (type_id, error) for each transaction type
+    """
     query = """
         INSERT INTO TRANSACTION_TYPE (
             Transaction_Type_Name, Description, Affects_Inventory, Affects_Revenue
@@ -119,11 +125,10 @@ def insert_transaction_type(name, description, affects_inventory, affects_revenu
         VALUES (?, ?, ?, ?)
     """
     try:
-        type_id = execute_query(query, (name, description, affects_inventory, affects_revenue))
-        return type_id
+        return insert_many(query, transaction_types)
     except Exception as e:
-        logger.error(f"Failed to insert transaction type '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert transaction type batch: {e}")
+        return [(None, e)] * len(transaction_types)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -132,50 +137,62 @@ def insert_transaction_type(name, description, affects_inventory, affects_revenu
 def generate_transaction_types(batch_size=None):
     """Generate batch of transaction type records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['TRANSACTION_TYPE']
+        batch_size = get_batch_size('TRANSACTION_TYPE')
     
     logger.info(f"Starting transaction type generation - Batch size: {batch_size}")
     
+    # Draw this batch's names, without replacement, from those not taken yet
+    names = sample_keyspace(
+        list(TRANSACTION_TYPE_CONFIG),
+        get_unique_index('TRANSACTION_TYPE', 'Transaction_Type_Name'),
+        batch_size
+    )
+    
+    if not names:
+        logger.warning("Keyspace exhausted: every transaction type name exists. Skipping.")
+        return GenerationResult(0, 0, keyspace_exhausted=True)
+    
+    keyspace_exhausted = len(names) < batch_size
+    if keyspace_exhausted:
+        logger.warning(f"Only {len(names)} transaction type names left - generating {len(names)}")
+        batch_size = len(names)
+    
     success_count = 0
     failed_count = 0
     
-    for i in range(batch_size):
+    # Build the whole batch in memory, then write it in one transaction
+    transaction_types = []
+    
+    for type_name in names:
+        check_cancelled()
         try:
-            # Generate unique transaction type name
-            type_name = generate_unique_value(
-                generate_transaction_type_name,
-                transaction_type_exists,
-                max_retries=20
-            )
-            
-            if type_name is None:
-                logger.warning(f"Could not generate unique transaction type name after max retries")
-                failed_count += 1
-                continue
-            
             # Get configuration
             config = get_transaction_type_config(type_name)
             
-            # Insert into database
-            type_id = insert_transaction_type(
+            transaction_types.append((
                 type_name,
                 config['description'],
                 config['affects_inventory'],
                 config['affects_revenue']
-            )
-            
-            if type_id:
-                inv_flag = "✓" if config['affects_inventory'] else "✗"
-                rev_flag = "✓" if config['affects_revenue'] else "✗"
-                logger.info(f"✓ Created transaction type #{type_id}: {type_name} [Inv:{inv_flag} Rev:{rev_flag}]")
-                success_count += 1
-            else:
-                failed_count += 1
+            ))
                 
         except Exception as e:
             logger.error(f"Error generating transaction type: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_transaction_types(transaction_types)
+    
+    for (type_name, _, affects_inventory, affects_revenue), (type_id, error) in zip(transaction_types, results):
+        if type_id:
+            inv_flag = "✓" if affects_inventory else "✗"
+            rev_flag = "✓" if affects_revenue else "✗"
+            logger.debug(f"✓ Created transaction type #{type_id}: {type_name} [Inv:{inv_flag} Rev:{rev_flag}]")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert transaction type '{type_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'TRANSACTION_TYPE', success_count, failed_count, batch_size)
     
@@ -183,7 +200,7 @@ def generate_transaction_types(batch_size=None):
     total_types = count_records('TRANSACTION_TYPE')
     logger.info(f"Total transaction types in database: {total_types}")
     
-    return success_count, failed_count
+    return GenerationResult(success_count, failed_count, keyspace_exhausted)
 
 # ============================================
 # SCRIPT EXECUTION
@@ -11,18 +11,18 @@ Generate PRODUCT_GROUP records
 Creates realistic product groups linked to categories
 """
 
-import random
+from seeding import rand
 from datetime import datetime
-from config import REAL_PRODUCT_GROUPS, BATCH_SIZES
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
     log_generation_summary,
     count_records,
-    get_random_record,
-    get_all_records
+    get_sampler,
+    check_cancelled
 )
 
 # Setup logger
@@ -43,14 +43,15 @@ def generate_product_group_name():
     """Generate realistic product group name"""
     
     # 60% chance: Use real product group from data
-    if random.random() < 0.6 and REAL_PRODUCT_GROUPS:
-        base_group = random.choice(REAL_PRODUCT_GROUPS)
+    real_groups = get_setting('REAL_PRODUCT_GROUPS')
+    if rand.random() < 0.6 and real_groups:
+        base_group = rand.choice(real_groups)
         
         # 70% chance: Return as-is, 30% chance: Add modifier
-        if random.random() < 0.7:
+        if rand.random() < 0.7:
             return base_group
         else:
-            modifier = random.choice(PRODUCT_GROUP_MODIFIERS)
+            modifier = rand.choice(PRODUCT_GROUP_MODIFIERS)
             # Remove number suffix if exists
             base_clean = ''.join([c for c in base_group if not c.isdigit()]).strip()
             return f"{modifier} {base_clean}"
@@ -67,11 +68,11 @@ def generate_product_group_name():
         "Series", "Line", "Items", "Supplies"
     ]
     
-    category = random.choice(categories)
+    category = rand.choice(categories)
     
     # 50% chance: Add subcategory
-    if random.random() < 0.5:
-        sub = random.choice(subcategories)
+    if rand.random() < 0.5:
+        sub = rand.choice(subcategories)
         return f"{category} {sub}"
     
     return category
@@ -86,34 +87,41 @@ def generate_product_group_description(name):
         f"{name} for all requirements",
         None  # 1 in 6 chance of no description
     ]
-    return random.choice(templates)
+    return rand.choice(templates)
 
 def get_random_category_id():
     """Get random category ID from database"""
-    result = get_random_record('CATEGORY', 'Category_ID')
-    if result:
-        return result[0]
+    category_id = get_sampler('CATEGORY', 'Category_ID').draw()
+    if category_id is not None:
+        return category_id
     
     # If no categories exist, log error
     logger.error("No categories found in database. Run category generator first.")
     return None
 
 def product_group_exists(name):
-    """Check if product group with name already exists"""
-    return record_exists('PRODUCT_GROUP', 'Product_Group_Name', name)
+    """Check if product group with name already exists (or was generated earlier this run)"""
+    return name in get_unique_index('PRODUCT_GROUP', 'Product_Group_Name')
 
-def insert_product_group(name, description, category_id):
-    """Insert product group into database"""
+def insert_product_groups(product_groups):
+    """
+    Insert batch of product groups into database
+    
+    Args:
+        product_groups: List of (name, description, category_id) tuples
+    
+    Returns:
+        list: (group_id, error) for each product group
+    """
     query = """
         INSERT INTO PRODUCT_GROUP (Product_Group_Name, Description, Category_ID)
         VALUES (?, ?, ?)
     """
     try:
-        group_id = execute_query(query, (name, description, category_id))
-        return group_id
+        return insert_many(query, product_groups)
     except Exception as e:
-        logger.error(f"Failed to insert product group '{name}': {e}")
-        return None
+        logger.error(f"Failed to insert product group batch: {e}")
+        return [(None, e)] * len(product_groups)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -122,7 +130,7 @@ def insert_product_group(name, description, category_id):
 def generate_product_groups(batch_size=None):
     """Generate batch of product group records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['PRODUCT_GROUP']
+        batch_size = get_batch_size('PRODUCT_GROUP')
     
     logger.info(f"Starting product group generation - Batch size: {batch_size}")
     
@@ -135,12 +143,16 @@ def generate_product_groups(batch_size=None):
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    product_groups = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique product group name
-            group_name = generate_unique_value(
+            # Generate unique product group name (also unique within this batch)
+            group_name = reserve_unique_value(
                 generate_product_group_name,
-                product_group_exists,
+                get_unique_index('PRODUCT_GROUP', 'Product_Group_Name'),
                 max_retries=30
             )
             
@@ -159,19 +171,23 @@ def generate_product_groups(batch_size=None):
             # Generate description
             description = generate_product_group_description(group_name)
             
-            # Insert into database
-            group_id = insert_product_group(group_name, description, category_id)
-            
-            if group_id:
-                logger.info(f"✓ Created product group #{group_id}: {group_name} (Category: {category_id})")
-                success_count += 1
-            else:
-                failed_count += 1
+            product_groups.append((group_name, description, category_id))
                 
         except Exception as e:
             logger.error(f"Error generating product group: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_product_groups(product_groups)
+    
+    for (group_name, description, category_id), (group_id, error) in zip(product_groups, results):
+        if group_id:
+            logger.debug(f"✓ Created product group #{group_id}: {group_name} (Category: {category_id})")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert product group '{group_name}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'PRODUCT_GROUP', success_count, failed_count, batch_size)
     
@@ -11,21 +11,19 @@ Generate PRODUCT records
 Creates realistic product data with pricing, costs, and inventory
 """
 
-import random
+from seeding import rand
 from datetime import datetime
-from config import (
-    BATCH_SIZES, PRICE_RANGES, COST_MARGIN_RANGE, STOCK_RANGE,
-    PRODUCT_PREFIXES, PRODUCT_CATEGORIES_WORDS, PRODUCT_SIZES
-)
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
-    execute_query,
-    record_exists,
-    generate_unique_value,
+    insert_many,
+    get_unique_index,
+    reserve_unique_value,
     log_generation_summary,
     count_records,
-    get_random_record,
-    round_price
+    get_sampler,
+    round_price,
+    check_cancelled
 )
 
 # Setup logger
@@ -45,10 +43,13 @@ BRAND_NAMES = [
     "Johnsons", "Curash", "Avent", "Huggies", "Libra", "U by Kotex"
 ]
 
+# PLUs are 3-6 digits, so every possible PLU fits in a 10**6 bit uniqueness bitmap
+PLU_LIMIT = 10**6
+
 def generate_plu():
     """Generate PLU code (3-6 digits)"""
-    length = random.choices([3, 4, 5, 6], weights=[10, 30, 40, 20])[0]
-    return str(random.randint(10**(length-1), 10**length - 1))
+    length = rand.choices([3, 4, 5, 6], weights=[10, 30, 40, 20])[0]
+    return str(rand.randint(10**(length-1), 10**length - 1))
 
 def generate_product_description():
     """Generate realistic product description"""
@@ -56,25 +57,28 @@ def generate_product_description():
     # Structure: [Brand] [Prefix] [Category] [Size]
     # Example: "Blackmores Super Strength CoQ10 300mg 30 Capsules"
     
+    prefixes = get_setting('PRODUCT_PREFIXES')
+    words = get_setting('PRODUCT_CATEGORIES_WORDS')
+    sizes = get_setting('PRODUCT_SIZES')
     structures = [
         # Brand + Category + Size (most common)
-        lambda: f"{random.choice(BRAND_NAMES)} {random.choice(PRODUCT_CATEGORIES_WORDS)} {random.choice(PRODUCT_SIZES)}",
+        lambda: f"{rand.choice(BRAND_NAMES)} {rand.choice(words)} {rand.choice(sizes)}",
         
         # Brand + Prefix + Category + Size
-        lambda: f"{random.choice(BRAND_NAMES)} {random.choice(PRODUCT_PREFIXES)} {random.choice(PRODUCT_CATEGORIES_WORDS)} {random.choice(PRODUCT_SIZES)}",
+        lambda: f"{rand.choice(BRAND_NAMES)} {rand.choice(prefixes)} {rand.choice(words)} {rand.choice(sizes)}",
         
         # Just Category + Size
-        lambda: f"{random.choice(PRODUCT_CATEGORIES_WORDS)} {random.choice(PRODUCT_SIZES)}",
+        lambda: f"{rand.choice(words)} {rand.choice(sizes)}",
         
         # Brand + Two Categories + Size
-        lambda: f"{random.choice(BRAND_NAMES)} {random.choice(PRODUCT_CATEGORIES_WORDS)} {random.choice(PRODUCT_CATEGORIES_WORDS[:10])} {random.choice(PRODUCT_SIZES)}",
+        lambda: f"{rand.choice(BRAND_NAMES)} {rand.choice(words)} {rand.choice(words[:10])} {rand.choice(sizes)}",
     ]
     
-    description = random.choice(structures)()
+    description = rand.choice(structures)()
     
     # Pad with spaces to match real data format (80-100 chars with trailing spaces)
     # Real data has descriptions padded to ~100 characters
-    target_length = random.randint(80, 100)
+    target_length = rand.randint(80, 100)
     if len(description) < target_length:
         description = description + ' ' * (target_length - len(description))
     
@@ -86,10 +90,11 @@ def generate_product_price():
     # Most products: $2.50 - $50
     # Some expensive: $50 - $100
     
-    if random.random() < 0.85:  # 85% common range
-        base_price = random.uniform(PRICE_RANGES['common_low'], PRICE_RANGES['common_high'])
+    price_ranges = get_setting('PRICE_RANGES')
+    if rand.random() < 0.85:  # 85% common range
+        base_price = rand.uniform(price_ranges['common_low'], price_ranges['common_high'])
     else:  # 15% higher range
-        base_price = random.uniform(PRICE_RANGES['common_high'], PRICE_RANGES['max'])
+        base_price = rand.uniform(price_ranges['common_high'], price_ranges['max'])
     
     # Round to .49, .99, .95, etc.
     return round_price(base_price)
@@ -97,7 +102,7 @@ def generate_product_price():
 def generate_cost_from_price(price):
     """Generate cost based on price (Avg Real Cost)"""
     # Cost is typically 30-85% of sale price
-    margin = random.uniform(*COST_MARGIN_RANGE)
+    margin = rand.uniform(*get_setting('COST_MARGIN_RANGE'))
     cost = price * margin
     return round(cost, 2)
 
@@ -107,41 +112,42 @@ def generate_stock_on_hand():
     # Some items out of stock (0)
     # Few items with high stock (50-100)
     
+    stock_range = get_setting('STOCK_RANGE')
     weights = [5, 70, 20, 5]  # 0, low, medium, high
     ranges = [
         (0, 0),
-        (STOCK_RANGE['typical_low'], STOCK_RANGE['typical_high']),
-        (STOCK_RANGE['typical_high'], 75),
-        (75, STOCK_RANGE['max'])
+        (stock_range['typical_low'], stock_range['typical_high']),
+        (stock_range['typical_high'], 75),
+        (75, stock_range['max'])
     ]
     
-    selected_range = random.choices(ranges, weights=weights)[0]
-    return random.randint(*selected_range)
+    selected_range = rand.choices(ranges, weights=weights)[0]
+    return rand.randint(*selected_range)
 
 def generate_expected_stock(soh):
     """Generate expected stock based on SOH"""
     # EXP is typically similar to SOH or slightly higher
     # 30% chance of null
-    if random.random() < 0.3:
+    if rand.random() < 0.3:
         return None
     
     # Usually within +/- 30% of SOH
-    variation = random.uniform(0.7, 1.3)
+    variation = rand.uniform(0.7, 1.3)
     exp = int(soh * variation)
     return max(0, exp)
 
 def generate_history():
     """Generate sales history (space-separated monthly sales)"""
     # Generate 12-13 months of history
-    months = random.randint(12, 13)
+    months = rand.randint(12, 13)
     history_values = []
     
     # Base monthly sales
-    base_sales = random.randint(5, 50)
+    base_sales = rand.randint(5, 50)
     
     for _ in range(months):
         # Add variation +/- 50%
-        variation = random.uniform(0.5, 1.5)
+        variation = rand.uniform(0.5, 1.5)
         monthly_sales = int(base_sales * variation)
         history_values.append(str(max(0, monthly_sales)))
     
@@ -149,25 +155,27 @@ def generate_history():
 
 def get_random_product_group_id():
     """Get random product group ID"""
-    result = get_random_record('PRODUCT_GROUP', 'Product_Group_ID')
-    if result:
-        return result[0]
-    return None
+    return get_sampler('PRODUCT_GROUP', 'Product_Group_ID').draw()
 
 def get_random_supplier_id():
     """Get random supplier ID"""
-    result = get_random_record('SUPPLIER', 'Supplier_ID')
-    if result:
-        return result[0]
-    return None
+    return get_sampler('SUPPLIER', 'Supplier_ID').draw()
 
 def plu_exists(plu):
-    """Check if PLU already exists"""
-    return record_exists('PRODUCT', 'PLU', plu)
+    """Check if PLU already exists (or was generated earlier this run)"""
+    return plu in get_unique_index('PRODUCT', 'PLU', PLU_LIMIT)
 
-def insert_product(plu, description, avg_real_cost, soh, exp, history, 
-                  product_group_id, supplier_id):
-    """Insert product into database"""
+def insert_products(products):
+    """
+    Insert batch of products into database
+    
+    Args:
+        products: List of (plu, description, avg_real_cost, soh, exp, history,
+                  product_group_id, supplier_id) tuples
+    
+    Returns:
+        list: (plu, error) for each product; plu is None on failure
+    """
     query = """
         INSERT INTO PRODUCT (
             PLU, Description, Avg_Real_Cost, SOH, EXP, History,
@@ -176,14 +184,15 @@ def insert_product(plu, description, avg_real_cost, soh, exp, history,
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """
     try:
-        execute_query(query, (
-            plu, description, avg_real_cost, soh, exp, history,
-            product_group_id, supplier_id
-        ))
-        return plu
+        results = insert_many(query, products)
     except Exception as e:
-        logger.error(f"Failed to insert product PLU '{plu}': {e}")
-        return None
+        logger.error(f"Failed to insert product batch: {e}")
+        return [(None, e)] * len(products)
+    
+    return [
+        (product[0] if row_id else None, error)
+        for product, (row_id, error) in zip(products, results)
+    ]
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -192,7 +201,7 @@ def insert_product(plu, description, avg_real_cost, soh, exp, history,
 def generate_products(batch_size=None):
     """Generate batch of product records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['PRODUCT']
+        batch_size = get_batch_size('PRODUCT')
     
     logger.info(f"Starting product generation - Batch size: {batch_size}")
     
@@ -211,12 +220,16 @@ def generate_products(batch_size=None):
     success_count = 0
     failed_count = 0
     
+    # Build the whole batch in memory, then write it in one transaction
+    products = []
+    
     for i in range(batch_size):
+        check_cancelled()
         try:
-            # Generate unique PLU
-            plu = generate_unique_value(
+            # Generate unique PLU (also unique within this batch)
+            plu = reserve_unique_value(
                 generate_plu,
-                plu_exists,
+                get_unique_index('PRODUCT', 'PLU', PLU_LIMIT),
                 max_retries=50
             )
             
@@ -242,22 +255,27 @@ def generate_products(batch_size=None):
                 failed_count += 1
                 continue
             
-            # Insert into database
-            result = insert_product(
+            products.append((
                 plu, description, avg_real_cost, soh, exp, history,
                 product_group_id, supplier_id
-            )
-            
-            if result:
-                logger.info(f"✓ Created product PLU {plu}: {description.strip()[:50]}... (SOH: {soh}, Cost: ${avg_real_cost:.2f})")
-                success_count += 1
-            else:
-                failed_count += 1
+            ))
                 
         except Exception as e:
             logger.error(f"Error generating product: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_products(products)
+    
+    for product, (result, error) in zip(products, results):
+        plu, description, avg_real_cost, soh = product[:4]
+        if result:
+            logger.debug(f"✓ Created product PLU {plu}: {description.strip()[:50]}... (SOH: {soh}, Cost: ${avg_real_cost:.2f})")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert product PLU '{plu}': {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'PRODUCT', success_count, failed_count, batch_size)
     
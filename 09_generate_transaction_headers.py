@@ -11,20 +11,20 @@ Generate TRANSACTION_HEADER records
 Creates realistic transaction header data with proper foreign keys
 """
 
-import random
+import logging
+from seeding import rand
 from datetime import datetime
-from config import BATCH_SIZES, DATE_RANGE, BUSINESS_HOURS
+from config import get_batch_size, get_date_range
 from utils import (
     setup_logger,
-    execute_query,
+    insert_many,
     log_generation_summary,
     count_records,
-    get_random_record,
-    get_all_records,
-    random_datetime,
-    format_datetime_sqlite,
-    random_boolean
+    random_boolean,
+    check_cancelled
 )
+from reference_cache import get_reference_cache
+from timestamps import get_timestamp_generator
 
 # Setup logger
 logger = setup_logger('TransactionHeaderGenerator')
@@ -33,96 +33,101 @@ logger = setup_logger('TransactionHeaderGenerator')
 # TRANSACTION HEADER GENERATION LOGIC
 # ============================================
 
-def generate_transaction_timestamp():
-    """Generate realistic transaction timestamp"""
-    start_date = DATE_RANGE['start_date']
-    end_date = DATE_RANGE['end_date']
+def generate_transaction_timestamp(start_date=None, end_date=None):
+    """Generate realistic transaction timestamp (default: configured date range)"""
+    return generate_transaction_timestamps(1, start_date, end_date)[0]
+
+def generate_transaction_timestamps(n, start_date=None, end_date=None, rng=None, sort=False):
+    """
+    Generate n transaction timestamps in one call
     
-    # Generate during business hours (8 AM - 10 PM)
-    transaction_dt = random_datetime(start_date, end_date, business_hours_only=True)
+    Business hours only, weighted by the configured hour-of-day and
+    day-of-week traffic (see timestamps.py)
     
-    return format_datetime_sqlite(transaction_dt)
+    Args:
+        rng: Optional numpy.random.Generator (default: the current seeded stream)
+        sort: Return them in time order
+    """
+    default_start, default_end = get_date_range()
+    if start_date is None:
+        start_date = default_start
+    if end_date is None:
+        end_date = default_end
+    
+    return get_timestamp_generator(start_date, end_date).generate(n, rng, sort)
 
 def get_random_staff_id():
-    """Get random active staff ID"""
-    result = get_random_record('STAFF', 'Staff_ID', 'Active_Status = 1')
-    if result:
-        return result[0]
-    
-    # If no active staff, get any staff
-    result = get_random_record('STAFF', 'Staff_ID')
-    if result:
-        return result[0]
-    
-    return None
+    """Get random active staff ID (any staff if none are active)"""
+    return get_reference_cache().random_staff_id()
 
 def get_random_machine_id():
-    """Get random active machine ID"""
-    result = get_random_record('MACHINE', 'Machine_ID', 'Active_Status = 1')
-    if result:
-        return result[0]
-    
-    # If no active machines, get any machine
-    result = get_random_record('MACHINE', 'Machine_ID')
-    if result:
-        return result[0]
-    
-    return None
+    """Get random active machine ID (any machine if none are active)"""
+    return get_reference_cache().random_machine_id()
 
 def get_random_payment_method_id():
-    """Get random active payment method ID"""
-    result = get_random_record('PAYMENT_METHOD', 'Payment_Method_ID', 'Active_Status = 1')
-    if result:
-        return result[0]
-    
-    # If no active payment methods, get any
-    result = get_random_record('PAYMENT_METHOD', 'Payment_Method_ID')
-    if result:
-        return result[0]
-    
-    return None
+    """Get random active payment method ID (any method if none are active)"""
+    return get_reference_cache().random_payment_method_id()
 
 def get_random_transaction_type_id():
-    """Get random transaction type ID"""
-    # Weight towards "Normal Item Sale" (80% of transactions)
-    all_types = get_all_records('TRANSACTION_TYPE', 'Transaction_Type_ID, Transaction_Type_Name')
-    
-    if not all_types:
-        return None
-    
-    # Find "Normal Item Sale" type
-    normal_sale_id = None
-    for type_id, type_name in all_types:
-        if type_name == "Normal Item Sale":
-            normal_sale_id = type_id
-            break
-    
-    # 80% chance of Normal Item Sale, 20% random other type
-    if normal_sale_id and random.random() < 0.8:
-        return normal_sale_id
-    else:
-        return random.choice(all_types)[0]
+    """Get random transaction type ID (80% Normal Item Sale)"""
+    return get_reference_cache().random_transaction_type_id()
 
 def get_for_staff_id(staff_id):
     """
     Determine if transaction is for a staff member
     10% chance it's a staff purchase
     """
-    if random.random() < 0.1:  # 10% staff purchases
+    if rand.random() < 0.1:  # 10% staff purchases
         # Could be for the same staff or different staff
-        if random.random() < 0.5:
+        if rand.random() < 0.5:
             return staff_id  # Same staff
         else:
             # Different staff
-            result = get_random_record('STAFF', 'Staff_ID')
-            if result:
-                return result[0]
+            return get_reference_cache().random_staff_id(active_only=False)
     
     return None  # Regular customer transaction
 
-def insert_transaction_header(timestamp, staff_id, machine_id, payment_method_id,
-                              transaction_type_id, for_staff_id):
-    """Insert transaction header into database"""
+def build_transaction_header(start_date=None, end_date=None, timestamp=None):
+    """
+    Build one transaction header row
+    
+    Args:
+        timestamp: Pre-generated Time_Stamp (default: drawn between the dates)
+    
+    Returns:
+        tuple: (timestamp, staff_id, machine_id, payment_method_id,
+               transaction_type_id, for_staff_id), or None if a required
+               foreign key is unavailable
+    """
+    if timestamp is None:
+        timestamp = generate_transaction_timestamp(start_date, end_date)
+    staff_id = get_random_staff_id()
+    machine_id = get_random_machine_id()
+    payment_method_id = get_random_payment_method_id()
+    transaction_type_id = get_random_transaction_type_id()
+    
+    if None in [staff_id, machine_id, payment_method_id, transaction_type_id]:
+        return None
+    
+    # Determine if for staff
+    for_staff_id = get_for_staff_id(staff_id)
+    
+    return (
+        timestamp, staff_id, machine_id, payment_method_id,
+        transaction_type_id, for_staff_id
+    )
+
+def insert_transaction_headers(headers):
+    """
+    Insert batch of transaction headers into database
+    
+    Args:
+        headers: List of (timestamp, staff_id, machine_id, payment_method_id,
+                 transaction_type_id, for_staff_id) tuples
+    
+    Returns:
+        list: (transaction_id, error) for each header
+    """
     query = """
         INSERT INTO TRANSACTION_HEADER (
             Time_Stamp, Staff_ID, Machine_ID, Payment_Method_ID,
@@ -131,14 +136,10 @@ def insert_transaction_header(timestamp, staff_id, machine_id, payment_method_id
         VALUES (?, ?, ?, ?, ?, ?)
     """
     try:
-        transaction_id = execute_query(query, (
-            timestamp, staff_id, machine_id, payment_method_id,
-            transaction_type_id, for_staff_id
-        ))
-        return transaction_id
+        return insert_many(query, headers)
     except Exception as e:
-        logger.error(f"Failed to insert transaction header: {e}")
-        return None
+        logger.error(f"Failed to insert transaction header batch: {e}")
+        return [(None, e)] * len(headers)
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -147,69 +148,71 @@ def insert_transaction_header(timestamp, staff_id, machine_id, payment_method_id
 def generate_transaction_headers(batch_size=None):
     """Generate batch of transaction header records"""
     if batch_size is None:
-        batch_size = BATCH_SIZES['TRANSACTION_HEADER']
+        batch_size = get_batch_size('TRANSACTION_HEADER')
     
     logger.info(f"Starting transaction header generation - Batch size: {batch_size}")
     
-    # Check dependencies
-    staff_count = count_records('STAFF')
-    machine_count = count_records('MACHINE')
-    payment_count = count_records('PAYMENT_METHOD')
-    type_count = count_records('TRANSACTION_TYPE')
+    # Check dependencies (reference tables are loaded once and held in memory)
+    reference = get_reference_cache()
     
-    if staff_count == 0:
+    if not reference.staff:
         logger.error("No staff found. Run staff generator first.")
         return 0, batch_size
     
-    if machine_count == 0:
+    if not reference.machines:
         logger.error("No machines found. Run machine generator first.")
         return 0, batch_size
     
-    if payment_count == 0:
+    if not reference.payment_methods:
         logger.error("No payment methods found. Run payment method generator first.")
         return 0, batch_size
     
-    if type_count == 0:
+    if not reference.transaction_types:
         logger.error("No transaction types found. Run transaction type generator first.")
         return 0, batch_size
     
     success_count = 0
     failed_count = 0
     
-    for i in range(batch_size):
+    # Build the whole batch in memory, then write it in one transaction
+    headers = []
+    timestamps = generate_transaction_timestamps(batch_size)
+    
+    for timestamp in timestamps:
+        check_cancelled()
         try:
             # Generate transaction data
-            timestamp = generate_transaction_timestamp()
-            staff_id = get_random_staff_id()
-            machine_id = get_random_machine_id()
-            payment_method_id = get_random_payment_method_id()
-            transaction_type_id = get_random_transaction_type_id()
+            header = build_transaction_header(timestamp=timestamp)
             
-            if None in [staff_id, machine_id, payment_method_id, transaction_type_id]:
+            if header is None:
                 logger.error("Failed to get required foreign keys")
                 failed_count += 1
                 continue
             
-            # Determine if for staff
-            for_staff_id = get_for_staff_id(staff_id)
-            
-            # Insert into database
-            transaction_id = insert_transaction_header(
-                timestamp, staff_id, machine_id, payment_method_id,
-                transaction_type_id, for_staff_id
-            )
-            
-            if transaction_id:
-                staff_flag = f" [Staff Purchase]" if for_staff_id else ""
-                logger.info(f"✓ Created transaction #{transaction_id}: {timestamp} on Machine #{machine_id}{staff_flag}")
-                success_count += 1
-            else:
-                failed_count += 1
+            headers.append(header)
                 
         except Exception as e:
             logger.error(f"Error generating transaction header: {e}")
             failed_count += 1
     
+    # Insert into database
+    results = insert_transaction_headers(headers)
+    
+    # Per-row events are only built when DEBUG logging is on
+    log_rows = logger.isEnabledFor(logging.DEBUG)
+    
+    for header, (transaction_id, error) in zip(headers, results):
+        timestamp, staff_id, machine_id = header[:3]
+        for_staff_id = header[5]
+        if transaction_id:
+            if log_rows:
+                staff_flag = f" [Staff Purchase]" if for_staff_id else ""
+                logger.debug(f"✓ Created transaction #{transaction_id}: {timestamp} on Machine #{machine_id}{staff_flag}")
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert transaction header: {error}")
+            failed_count += 1
+    
     # Log summary
     log_generation_summary(logger, 'TRANSACTION_HEADER', success_count, failed_count, batch_size)
     
@@ -8,22 +8,32 @@ Created on Sun Feb  2 00:42:36 2024
 
 """
 Generate TRANSACTION_LINE records
-Creates realistic transaction line items with products, quantities, pricing
+Creates transaction baskets: a header plus its 1-N line items with products,
+quantities, pricing, written together so every transaction has lines
 """
 
-import random
+import importlib
+import logging
+import sqlite3
+from seeding import rand
 from datetime import datetime
-from config import BATCH_SIZES, DISCOUNT_PROBABILITY, DISCOUNT_PERCENTAGES
+from config import get_batch_size, get_setting
 from utils import (
     setup_logger,
     execute_query,
+    insert_many,
+    transaction,
     log_generation_summary,
     count_records,
-    get_random_record,
-    get_all_records,
     calculate_total_paid,
-    round_price
+    round_price,
+    check_cancelled
 )
+from reference_cache import get_reference_cache
+from stock_ledger import StockLedger
+
+# Header rows are built by the header generator
+header_generator = importlib.import_module('09_generate_transaction_headers')
 
 # Setup logger
 logger = setup_logger('TransactionLineGenerator')
@@ -32,47 +42,44 @@ logger = setup_logger('TransactionLineGenerator')
 # TRANSACTION LINE GENERATION LOGIC
 # ============================================
 
-def get_random_transaction_id():
-    """Get random transaction header ID"""
-    result = get_random_record('TRANSACTION_HEADER', 'Transaction_ID')
-    if result:
-        return result[0]
-    return None
-
-def get_random_product():
-    """Get random product with details"""
-    # Get product with positive stock
-    result = get_random_record(
-        'PRODUCT',
-        'PLU, Description, Avg_Real_Cost, SOH',
-        'SOH > 0'
-    )
+def load_products():
+    """
+    Load product rows once per run (products with stock preferred)
     
-    if result:
-        return result
+    Returns:
+        list: (plu, description, avg_cost, soh) rows
+    """
+    query = "SELECT PLU, Description, Avg_Real_Cost, SOH FROM PRODUCT"
+    in_stock = execute_query(query + " WHERE SOH > 0", fetch=True)
     
-    # If no products with stock, get any product
-    result = get_random_record('PRODUCT', 'PLU, Description, Avg_Real_Cost, SOH')
-    return result
+    # If no products with stock, use any product
+    return in_stock or execute_query(query, fetch=True)
+
+def generate_basket_size():
+    """Draw number of lines for one transaction from BASKET_SIZE_WEIGHTS"""
+    weights = get_setting('BASKET_SIZE_WEIGHTS')
+    return rand.choices(list(weights), weights=list(weights.values()))[0]
+
+# Most transactions are 1 item (70%)
+# Some are 2-5 items (25%)
+# Few are 6-10 items (5%)
+QUANTITY_WEIGHTS = [70, 25, 5]
+QUANTITY_RANGES = [(1, 1), (2, 5), (6, 10)]
+
+# Typical retail markup: 1.3x to 3x cost
+MARKUP_RANGE = (1.3, 3.0)
 
 def generate_quantity():
     """Generate realistic quantity"""
-    # Most transactions are 1 item (70%)
-    # Some are 2-5 items (25%)
-    # Few are 6-10 items (5%)
-    
-    weights = [70, 25, 5]
-    ranges = [(1, 1), (2, 5), (6, 10)]
-    
-    selected_range = random.choices(ranges, weights=weights)[0]
-    return random.randint(*selected_range)
+    selected_range = rand.choices(QUANTITY_RANGES, weights=QUANTITY_WEIGHTS)[0]
+    return rand.randint(*selected_range)
 
 def generate_original_price(avg_cost):
     """
     Generate original price based on product cost
     Typical retail markup: 1.3x to 3x cost
     """
-    markup = random.uniform(1.3, 3.0)
+    markup = rand.uniform(*MARKUP_RANGE)
     base_price = avg_cost * markup
     
     # Round to realistic price (.49, .99, .95, etc.)
@@ -80,21 +87,92 @@ def generate_original_price(avg_cost):
 
 def should_apply_discount():
     """Determine if discount should be applied"""
-    return random.random() < DISCOUNT_PROBABILITY
+    return rand.random() < get_setting('DISCOUNT_PROBABILITY')
 
 def get_discount_percent():
     """Get discount percentage if applicable"""
-    return random.choice(DISCOUNT_PERCENTAGES)
+    return rand.choice(get_setting('DISCOUNT_PERCENTAGES'))
 
-def check_transaction_has_lines(transaction_id):
-    """Check if transaction already has line items"""
-    query = "SELECT COUNT(*) FROM TRANSACTION_LINE WHERE Transaction_ID = ?"
-    result = execute_query(query, (transaction_id,), fetch=True)
-    return result[0][0] > 0
+def build_transaction_line(transaction_id, product, soh=None):
+    """
+    Build one transaction line row
+    
+    Args:
+        transaction_id: Header the line belongs to
+        product: (plu, description, avg_cost, soh) row
+        soh: Stock on hand to clamp the quantity to (default: the row's SOH)
+    
+    Returns:
+        tuple: (transaction_id, plu, qty, original_price, total_paid, discount_percent)
+    """
+    plu, description, avg_cost, product_soh = product
+    if soh is None:
+        soh = product_soh
+    
+    # Generate quantity
+    qty = generate_quantity()
+    
+    # Adjust quantity if exceeds stock
+    if qty > soh and soh > 0:
+        qty = soh
+    elif soh <= 0:
+        qty = 1  # Allow even if out of stock (backorder)
+    
+    # Generate pricing
+    original_price = generate_original_price(avg_cost)
+    # Check if discount applies
+    discount_percent = 0.0
+    if should_apply_discount():
+        discount_percent = get_discount_percent()
+    
+    # Calculate total paid
+    total_paid = calculate_total_paid(original_price, qty, discount_percent)
+    
+    return (
+        transaction_id, plu, qty, original_price,
+        total_paid, discount_percent
+    )
 
-def insert_transaction_line(transaction_id, plu, qty, original_price, 
-                           total_paid, discount_percent):
-    """Insert transaction line into database"""
+def build_basket(products, start_date=None, end_date=None, timestamp=None, ledger=None):
+    """
+    Build one transaction header and its lines
+    
+    Args:
+        products: Product rows from load_products()
+        timestamp: Pre-generated Time_Stamp (default: drawn between the dates)
+        ledger: StockLedger whose stock clamps quantities (default: the rows'
+                SOH); the lines hold their stock until the batch is written
+    
+    Returns:
+        tuple: (header, lines) where lines carry transaction_id None until
+               the header is inserted, or None if the header can't be built
+    """
+    header = header_generator.build_transaction_header(start_date, end_date, timestamp)
+    if header is None:
+        return None
+    
+    lines = []
+    for _ in range(generate_basket_size()):
+        product = rand.choice(products)
+        if ledger is None:
+            lines.append(build_transaction_line(None, product))
+            continue
+        line = build_transaction_line(None, product, ledger.available(product[0]))
+        ledger.hold(line[1], header[4], line[2])
+        lines.append(line)
+    return header, lines
+
+def insert_transaction_lines(lines):
+    """
+    Insert batch of transaction lines into database
+    
+    Args:
+        lines: List of (transaction_id, plu, qty, original_price, total_paid,
+               discount_percent) tuples
+    
+    Returns:
+        list: (line_id, error) for each line
+    """
     query = """
         INSERT INTO TRANSACTION_LINE (
             Transaction_ID, PLU, Qty_Supplied, Original_Price,
@@ -102,15 +180,67 @@ def insert_transaction_line(transaction_id, plu, qty, original_price,
         )
         VALUES (?, ?, ?, ?, ?, ?)
     """
+    # Errors propagate so the basket transaction rolls back with its headers
+    return insert_many(query, lines)
+
+def insert_baskets(headers, lines, ledger=None):
+    """
+    Insert headers and their lines in one transaction
+    
+    A header is only written with its lines: headers without any lines
+    are skipped, and if every line of a written header fails the whole
+    transaction is rolled back.
+    
+    Args:
+        headers: List of header tuples
+        lines: List of line tuples whose first field is the index of their
+               header in headers (replaced by the real Transaction_ID)
+        ledger: StockLedger to apply the written lines to; its net stock
+                movements are flushed to PRODUCT in the same transaction
+                and committed to the ledger only if that transaction commits
+    
+    Returns:
+        tuple: (header_results, lines, line_results) where header_results
+               has one entry per header and lines are the rows actually
+               attempted (lines of failed headers are dropped)
+    """
+    positions = sorted({line[0] for line in lines})
+    
     try:
-        line_id = execute_query(query, (
-            transaction_id, plu, qty, original_price,
-            total_paid, discount_percent
-        ))
-        return line_id
-    except Exception as e:
-        logger.error(f"Failed to insert transaction line: {e}")
-        return None
+        with transaction():
+            results = header_generator.insert_transaction_headers([headers[p] for p in positions])
+            transaction_ids = [None] * len(headers)
+            for position, (transaction_id, _) in zip(positions, results):
+                transaction_ids[position] = transaction_id
+            
+            kept = [line for line in lines if transaction_ids[line[0]]]
+            lines = [(transaction_ids[line[0]],) + line[1:] for line in kept]
+            line_results = insert_transaction_lines(lines)
+            
+            written = [line for line, (line_id, _) in zip(kept, line_results) if line_id]
+            empty = {line[0] for line in kept} - {line[0] for line in written}
+            if empty:
+                raise sqlite3.IntegrityError(
+                    f"No lines written for transaction {transaction_ids[min(empty)]}"
+                )
+            
+            if ledger is not None:
+                ledger.move_lines(headers, written)
+                ledger.flush()
+    except BaseException:
+        # Nothing was written, so the ledger mustn't keep the movements
+        if ledger is not None:
+            ledger.rollback()
+        raise
+    
+    if ledger is not None:
+        ledger.commit()
+    
+    header_results = [(None, ValueError("Basket has no lines"))] * len(headers)
+    for position, result in zip(positions, results):
+        header_results[position] = result
+    
+    return header_results, lines, line_results
 
 # ============================================
 # MAIN GENERATION FUNCTION
@@ -118,100 +248,109 @@ def insert_transaction_line(transaction_id, plu, qty, original_price,
 
 def generate_transaction_lines(batch_size=None):
     """
-    Generate batch of transaction line records
-    Each line item is linked to a transaction header
+    Generate batch of transaction baskets
+    Each basket is a new transaction header with 1-N line items
+    
+    Args:
+        batch_size: Number of transactions (default get_batch_size('TRANSACTION_HEADER'))
     """
     if batch_size is None:
-        batch_size = BATCH_SIZES['TRANSACTION_LINE']
+        batch_size = get_batch_size('TRANSACTION_HEADER')
     
-    logger.info(f"Starting transaction line generation - Batch size: {batch_size}")
+    logger.info(f"Starting transaction basket generation - Batch size: {batch_size}")
     
-    # Check dependencies
-    transaction_count = count_records('TRANSACTION_HEADER')
-    product_count = count_records('PRODUCT')
+    # Check dependencies (reference tables and products are held in memory)
+    reference = get_reference_cache()
     
-    if transaction_count == 0:
-        logger.error("No transaction headers found. Run transaction header generator first.")
+    if not (reference.staff and reference.machines and
+            reference.payment_methods and reference.transaction_types):
+        logger.error("Reference tables are empty. Run staff, machine, payment method and transaction type generators first.")
         return 0, batch_size
     
-    if product_count == 0:
+    products = load_products()
+    
+    if not products:
         logger.error("No products found. Run product generator first.")
         return 0, batch_size
     
+    # Stock moves with every line written (sales subtract, returns add)
+    ledger = StockLedger(products, reference.transaction_types)
+    
     success_count = 0
     failed_count = 0
     
-    # Strategy: Add 1-5 line items to transactions that don't have lines yet
-    # Or add additional lines to existing transactions
+    # Build the whole batch in memory, then write it in one transaction.
+    # Lines point at their header's position in headers until inserted.
+    headers = []
+    lines = []
+    timestamps = header_generator.generate_transaction_timestamps(batch_size)
     
-    for i in range(batch_size):
+    for timestamp in timestamps:
+        check_cancelled()
         try:
-            # Get random transaction
-            transaction_id = get_random_transaction_id()
-            if transaction_id is None:
-                logger.error("Failed to get transaction ID")
-                failed_count += 1
-                continue
-            
-            # Get random product
-            product = get_random_product()
-            if product is None:
-                logger.error("Failed to get product")
+            basket = build_basket(products, timestamp=timestamp, ledger=ledger)
+            if basket is None:
+                logger.error("Failed to get required foreign keys")
                 failed_count += 1
                 continue
             
-            plu, description, avg_cost, soh = product
-            
-            # Generate quantity
-            qty = generate_quantity()
-            
-            # Adjust quantity if exceeds stock
-            if qty > soh and soh > 0:
-                qty = soh
-            elif soh == 0:
-                qty = 1  # Allow even if out of stock (backorder)
-            
-            # Generate pricing
-            original_price = generate_original_price(avg_cost)
-            # Check if discount applies
-            discount_percent = 0.0
-            if should_apply_discount():
-                discount_percent = get_discount_percent()
-            
-            # Calculate total paid
-            total_paid = calculate_total_paid(original_price, qty, discount_percent)
-            
-            # Insert into database
-            line_id = insert_transaction_line(
-                transaction_id, plu, qty, original_price,
-                total_paid, discount_percent
-            )
-            
-            if line_id:
-                discount_str = f" ({discount_percent}% off)" if discount_percent > 0 else ""
-                logger.info(f"✓ Created line #{line_id}: Transaction #{transaction_id}, PLU {plu}, Qty {qty}, ${total_paid:.2f}{discount_str}")
-                success_count += 1
-            else:
-                failed_count += 1
+            header, basket_lines = basket
+            position = len(headers)
+            headers.append(header)
+            lines.extend((position,) + line[1:] for line in basket_lines)
                 
         except Exception as e:
-            logger.error(f"Error generating transaction line: {e}")
+            logger.error(f"Error generating transaction basket: {e}")
+            failed_count += 1
+    
+    # Insert into database (all or nothing)
+    try:
+        header_results, lines, line_results = insert_baskets(headers, lines, ledger)
+    except Exception as e:
+        logger.error(f"Failed to insert transaction baskets, rolled back: {e}")
+        log_generation_summary(logger, 'TRANSACTION_HEADER', 0, batch_size, batch_size)
+        return 0, failed_count + len(headers) + len(lines)
+    
+    headers_created = 0
+    for transaction_id, error in header_results:
+        if transaction_id:
+            headers_created += 1
+        else:
+            logger.error(f"Failed to insert transaction header: {error}")
+            failed_count += 1
+    
+    # Coverage comes from the lines just written, not a table scan
+    transactions_with_lines = set()
+    
+    # Per-row events are only built when DEBUG logging is on
+    log_rows = logger.isEnabledFor(logging.DEBUG)
+    
+    for line, (line_id, error) in zip(lines, line_results):
+        transaction_id, plu, qty, original_price, total_paid, discount_percent = line
+        if line_id:
+            if log_rows:
+                discount_str = f" ({discount_percent}% off)" if discount_percent > 0 else ""
+                logger.debug(f"✓ Created line #{line_id}: Transaction #{transaction_id}, PLU {plu}, Qty {qty}, ${total_paid:.2f}{discount_str}")
+            transactions_with_lines.add(transaction_id)
+            success_count += 1
+        else:
+            logger.error(f"Failed to insert transaction line: {error}")
             failed_count += 1
     
     # Log summary
-    log_generation_summary(logger, 'TRANSACTION_LINE', success_count, failed_count, batch_size)
+    log_generation_summary(logger, 'TRANSACTION_HEADER', headers_created, batch_size - headers_created, batch_size)
+    if lines:
+        log_generation_summary(logger, 'TRANSACTION_LINE', success_count, len(lines) - success_count, len(lines))
+    
+    # Log statistics
+    logger.info(f"Transactions with line items: {len(transactions_with_lines)}/{headers_created}")
+    if headers_created:
+        logger.info(f"Average lines per transaction: {success_count / headers_created:.2f}")
     
     # Log current totals
     total_lines = count_records('TRANSACTION_LINE')
     logger.info(f"Total transaction lines in database: {total_lines}")
     
-    # Log statistics
-    transactions_with_lines = execute_query(
-        "SELECT COUNT(DISTINCT Transaction_ID) FROM TRANSACTION_LINE",
-        fetch=True
-    )[0][0]
-    logger.info(f"Transactions with line items: {transactions_with_lines}/{transaction_count}")
-    
     return success_count, failed_count
 
 # ============================================
@@ -0,0 +1,564 @@
+"""
+Bulk Backfill
+Generates large volumes of data into a fresh database at full speed
+Reference tables are topped up through their normal generators, then
+transaction headers and their lines are created together in large chunks
+with SQLite durability relaxed for the duration of the load.
+New databases get the db_schema tables, with indexes built after the load
+
+Transaction generation can be sharded over worker processes (--workers):
+workers build rows from pre-loaded key arrays without touching the
+database, and the main process is the single writer that bulk-inserts them.
+Rows are generated in fixed blocks of GENERATION_BLOCK_SIZE headers, each
+from its own seeded stream, so a given --seed (or config MASTER_SEED)
+produces the same rows for any --workers and --chunk-size
+
+Each header's line count is drawn from BASKET_SIZE_WEIGHTS, like the
+basket stage, so TRANSACTION_LINE isn't a target: the line total comes
+out at about the header target times the mean basket size (~2.6).
+
+The writer runs every shard's lines through a running stock ledger
+before inserting them, so products are never sold below zero: when a
+line needs more than its product has left, a replenishment receipt first
+tops the stock back up to RESTOCK_LEVEL. Every generated line is written
+at its full quantity, however large the backfill is next to the products'
+starting stock.
+
+Usage:
+    python backfill.py loadtest.db --target TRANSACTION_HEADER=4000000 \
+        --start-date 2025-01-01 --end-date 2025-12-31 --workers 4
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from config import get_setting, get_date_range
+from utils import (
+    setup_logger,
+    set_database_path,
+    set_db_profile,
+    open_db_connection,
+    get_db_connection,
+    checkpoint,
+    count_records,
+    log_generation_summary,
+    apply_setting_overrides
+)
+import db_schema
+import line_engine
+from stock_ledger import StockLedger
+from seeding import make_stream, use_stream
+from reference_cache import clear_reference_cache, get_reference_cache, use_reference_cache
+
+# Setup logger
+logger = setup_logger('Backfill')
+
+# ============================================
+# BACKFILL SETTINGS
+# ============================================
+
+# Default target row counts (totals, not increments)
+BACKFILL_TARGETS = {
+    'CATEGORY': 20,
+    'SUPPLIER': 100,
+    'STAFF': 30,
+    'MACHINE': 6,
+    'PAYMENT_METHOD': 5,
+    'TRANSACTION_TYPE': 6,
+    'PRODUCT_GROUP': 100,
+    'PRODUCT': 5000,
+    'TRANSACTION_HEADER': 100000
+}
+
+# Reference tables are filled by their normal generators, in dependency order
+REFERENCE_STAGES = [
+    ('CATEGORY', '01_generate_categories', 'generate_categories'),
+    ('SUPPLIER', '02_generate_suppliers', 'generate_suppliers'),
+    ('STAFF', '03_generate_staff', 'generate_staff'),
+    ('MACHINE', '04_generate_machines', 'generate_machines'),
+    ('PAYMENT_METHOD', '05_generate_payment_methods', 'generate_payment_methods'),
+    ('TRANSACTION_TYPE', '06_generate_transaction_types', 'generate_transaction_types'),
+    ('PRODUCT_GROUP', '07_generate_product_groups', 'generate_product_groups'),
+    ('PRODUCT', '08_generate_products', 'generate_products'),
+]
+
+# Headers per chunk; each chunk and its lines are committed together
+# (rounded to whole generation blocks)
+BACKFILL_CHUNK_SIZE = 10000
+
+# Headers per generation block. Each block draws from its own seeded stream,
+# so the rows don't depend on the chunk size or worker count. Changing this
+# changes the generated data.
+GENERATION_BLOCK_SIZE = 1000
+
+# PRAGMA profile for the load (see DB_PROFILES): no fsync, large cache.
+# A crash mid-load can lose the load, which is fine for a fresh database.
+BACKFILL_PROFILE = 'bulk'
+
+# ============================================
+# DATABASE SETUP
+# ============================================
+
+def copy_schema(database_path, schema_source):
+    """Create an empty database with the tables and indexes of schema_source"""
+    source = open_db_connection(schema_source, pragmas={}, profile='readonly')
+    statements = [
+        sql for (sql,) in source.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, rowid
+        """)
+    ]
+    source.close()
+
+    if not statements:
+        raise ValueError(f"No schema found in {schema_source}")
+
+    conn = sqlite3.connect(database_path)
+    conn.executescript(';\n'.join(statements) + ';')
+    conn.close()
+
+def resolve_seed():
+    """MASTER_SEED if configured, else a fresh random seed (logged so the run can be repeated)"""
+    seed = get_setting('MASTER_SEED')
+    if seed is not None:
+        return seed
+    return random.randrange(2**32)
+
+def load_generator(module_name):
+    """Import a numbered generator script as a module"""
+    return importlib.import_module(module_name)
+
+# ============================================
+# BACKFILL STAGES
+# ============================================
+
+def backfill_reference_tables(targets, seed=None):
+    """Top up each reference table to its target row count"""
+    for table, module_name, function_name in REFERENCE_STAGES:
+        needed = targets[table] - count_records(table)
+        if needed <= 0:
+            continue
+
+        logger.info(f"Backfilling {table}: {needed:,} rows")
+        generate = getattr(load_generator(module_name), function_name)
+        with use_stream(make_stream('backfill', table, master_seed=seed)):
+            result = generate(batch_size=needed)
+
+        if getattr(result, 'keyspace_exhausted', False):
+            logger.warning(f"{table} stopped at {count_records(table):,} rows: keyspace exhausted")
+
+    # Header generation reads the reference tables written above
+    clear_reference_cache()
+
+def plan_blocks(header_target, seed):
+    """Split the load into generation blocks of (index, headers, seed)"""
+    return [
+        (index, min(GENERATION_BLOCK_SIZE, header_target - start), seed)
+        for index, start in enumerate(range(0, header_target, GENERATION_BLOCK_SIZE))
+    ]
+
+def mean_basket_size():
+    """Expected lines per header under BASKET_SIZE_WEIGHTS"""
+    weights = get_setting('BASKET_SIZE_WEIGHTS')
+    return sum(size * weight for size, weight in weights.items()) / sum(weights.values())
+
+def plan_shards(header_target, chunk_size, seed):
+    """
+    Group the generation blocks into shards of about chunk_size headers
+
+    Returns:
+        list: (index, blocks) tuples
+    """
+    blocks = plan_blocks(header_target, seed)
+    per_shard = max(chunk_size // GENERATION_BLOCK_SIZE, 1)
+    return [
+        (index, blocks[start:start + per_shard])
+        for index, start in enumerate(range(0, len(blocks), per_shard))
+    ]
+
+# ============================================
+# SHARD WORKERS
+# ============================================
+
+# Set once per worker process by init_worker()
+_worker_state = {}
+
+def init_worker(reference, products, start_date, end_date, vectorized=False):
+    """Install the pre-loaded key arrays in a worker process"""
+    use_reference_cache(reference)
+    _worker_state.update(
+        header_module=load_generator('09_generate_transaction_headers'),
+        line_module=load_generator('10_generate_transaction_lines'),
+        products=products,
+        product_columns=line_engine.ProductColumns(products) if vectorized else None,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+def generate_shard(shard):
+    """
+    Generate one shard of headers and lines without touching the database
+
+    Lines reference their header by its position in the shard; the writer
+    maps that to the real Transaction_ID.
+
+    Returns:
+        tuple: (index, headers, lines)
+    """
+    index, blocks = shard
+    headers = []
+    lines = []
+
+    for block in blocks:
+        block_headers, block_lines = generate_block(block, offset=len(headers))
+        headers.extend(block_headers)
+        lines.extend(block_lines)
+
+    return index, headers, lines
+
+def generate_block(block, offset=0):
+    """
+    Generate one block of headers and their lines
+
+    The block draws only from the stream derived from (seed, block index),
+    so its rows are the same whichever worker and shard generate it.
+
+    Args:
+        block: (index, headers, seed) from plan_blocks()
+        offset: Position of the block's first header in its shard
+
+    Returns:
+        tuple: (headers, lines), lines referencing headers by shard position
+    """
+    index, n_headers, seed = block
+    with use_stream(make_stream('transactions', index, master_seed=seed)) as stream:
+        return _generate_block(stream, n_headers, offset)
+
+def draw_basket_sizes(stream, rng, n):
+    """Lines for each of n headers, drawn from BASKET_SIZE_WEIGHTS"""
+    weights = get_setting('BASKET_SIZE_WEIGHTS')
+    sizes = list(weights)
+    if rng is None:
+        return stream.choices(sizes, weights=list(weights.values()), k=n)
+    p = line_engine.np.array(list(weights.values()), dtype=line_engine.np.float64)
+    return line_engine.np.array(sizes)[rng.choice(len(sizes), size=n, p=p / p.sum())].tolist()
+
+def _generate_block(stream, n_headers, offset):
+    header_module = _worker_state['header_module']
+    line_module = _worker_state['line_module']
+    products = _worker_state['products']
+    product_columns = _worker_state['product_columns']
+
+    # The NumPy engine draws from its own generator, seeded from the block's
+    rng = None
+    if product_columns is not None:
+        rng = line_engine.np.random.default_rng(stream.getrandbits(64))
+
+    timestamps = header_module.generate_transaction_timestamps(
+        n_headers, _worker_state['start_date'], _worker_state['end_date'], rng
+    )
+    headers = [header_module.build_transaction_header(timestamp=timestamp) for timestamp in timestamps]
+
+    basket_sizes = draw_basket_sizes(stream, rng, n_headers)
+
+    if product_columns is not None:
+        positions = [
+            offset + position
+            for position, size in enumerate(basket_sizes)
+            for _ in range(size)
+        ]
+        return headers, line_engine.build_lines(positions, product_columns, rng)
+
+    lines = []
+    for position, size in enumerate(basket_sizes):
+        for _ in range(size):
+            product = products[stream.randrange(len(products))]
+            lines.append(line_module.build_transaction_line(offset + position, product))
+
+    return headers, lines
+
+# ============================================
+# WRITER
+# ============================================
+
+def write_shard(headers, lines, ledger=None):
+    """
+    Insert one shard's headers and lines in a single transaction
+
+    Headers left without lines are not written and count as failed. If
+    the shard can't be written in full it is rolled back and every row
+    counts as failed.
+
+    Args:
+        ledger: StockLedger updated with the shard's lines (and flushed to
+                PRODUCT in the same transaction); restock for them
+                with ledger.restock_lines() first
+
+    Returns:
+        tuple: (headers_created, lines_created, failed_count)
+    """
+    try:
+        header_results, lines, line_results = _worker_state['line_module'].insert_baskets(headers, lines, ledger)
+    except Exception as e:
+        logger.error(f"Failed to write shard, rolled back: {e}")
+        return 0, 0, len(headers) + len(lines)
+
+    headers_created = sum(1 for transaction_id, _ in header_results if transaction_id)
+    lines_created = sum(1 for line_id, _ in line_results if line_id)
+    failed_count = len(headers) - headers_created + len(line_results) - lines_created
+
+    return headers_created, lines_created, failed_count
+
+def backfill_transactions(header_target, start_date, end_date,
+                          chunk_size=None, workers=1, seed=None, vectorized=False):
+    """
+    Generate headers and their lines together, one transaction per shard
+
+    With workers > 1, shards are generated in a process pool and streamed
+    back in order to this process, which is the only writer. Workers
+    don't see each other's sales, so the writer restocks for each shard's
+    lines from its running stock ledger (in shard order, so the rows still
+    only depend on seed) and moves PRODUCT.SOH with every shard it writes.
+
+    Returns:
+        tuple: (headers_created, lines_created, failed_count)
+    """
+    if chunk_size is None:
+        chunk_size = BACKFILL_CHUNK_SIZE
+    if seed is None:
+        seed = resolve_seed()
+
+    reference = get_reference_cache()
+    if not (reference.staff and reference.machines and
+            reference.payment_methods and reference.transaction_types):
+        logger.error("Reference tables are empty. Cannot generate transaction headers.")
+        return 0, 0, header_target
+
+    products = load_generator('10_generate_transaction_lines').load_products()
+    if not products:
+        logger.error("No products found. Cannot generate transaction lines.")
+        return 0, 0, header_target
+
+    ledger = StockLedger(products, reference.transaction_types)
+    shards = plan_shards(header_target, chunk_size, seed)
+    engine = "numpy" if vectorized else "python"
+    logger.info(f"Generating {len(shards)} shards with {workers} worker(s), seed {seed}, {engine} line engine")
+
+    init_args = (reference, products, start_date, end_date, vectorized)
+    init_worker(*init_args)
+
+    headers_done = 0
+    lines_done = 0
+    receipts = 0
+    received = 0
+    failed_count = 0
+    start = time.perf_counter()
+    chunk_start = start
+
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=init_args)
+        generated = pool.imap(generate_shard, shards)
+    else:
+        generated = map(generate_shard, shards)
+
+    try:
+        for index, headers, lines in generated:
+            shard_receipts, shard_received = ledger.restock_lines(headers, lines)
+            receipts += shard_receipts
+            received += shard_received
+            headers_created, lines_created, failed = write_shard(headers, lines, ledger)
+            headers_done += headers_created
+            lines_done += lines_created
+            failed_count += failed
+
+            now = time.perf_counter()
+            chunk_rate = (headers_created + lines_created) / max(now - chunk_start, 1e-9)
+            overall_rate = (headers_done + lines_done) / max(now - start, 1e-9)
+            chunk_start = now
+            logger.info(
+                f"Shard {index + 1}/{len(shards)} | Headers {headers_done:,}/{header_target:,} | "
+                f"Lines {lines_done:,} | "
+                f"{chunk_rate:,.0f} rows/sec (overall {overall_rate:,.0f} rows/sec)"
+            )
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if receipts:
+        logger.info(f"Restocked {received:,} units in {receipts:,} replenishment receipts")
+
+    return headers_done, lines_done, failed_count
+
+def products_below_zero():
+    """PLUs whose stock on hand is negative"""
+    return {plu for (plu,) in get_db_connection().execute("SELECT PLU FROM PRODUCT WHERE SOH < 0")}
+
+# ============================================
+# MAIN FUNCTION
+# ============================================
+
+def run_backfill(database_path, targets, start_date, end_date,
+                 schema_source=None, append=False, chunk_size=None,
+                 workers=1, seed=None, vectorized=False):
+    """
+    Backfill database_path up to the target row counts
+
+    Args:
+        database_path: Database to fill (created unless append)
+        targets: dict of table -> target total row count (lines follow
+                 from the headers and BASKET_SIZE_WEIGHTS)
+        start_date, end_date: Transaction timestamp range
+        schema_source: Existing database whose schema is copied
+                       (default: db_schema tables, indexes added after the load)
+        append: Allow filling an existing database
+        workers: Processes generating transaction shards
+        seed: Seed for every generated row (default: MASTER_SEED, else random)
+        vectorized: Generate lines with the NumPy line engine
+
+    Returns:
+        bool: True if every requested row was created and no product was
+              sold below zero stock
+    """
+    if os.path.exists(database_path) and not append:
+        logger.error(f"{database_path} already exists. Use --append to add to it.")
+        return False
+
+    build_indexes = False
+    if not os.path.exists(database_path):
+        if schema_source:
+            logger.info(f"Creating {database_path} with schema from {schema_source}")
+            copy_schema(database_path, schema_source)
+        else:
+            logger.info(f"Creating {database_path} (indexes are built after the load)")
+            build_indexes = True
+
+    set_database_path(database_path)
+    set_db_profile(BACKFILL_PROFILE)
+    if build_indexes:
+        db_schema.create_schema(get_db_connection(), indexes=False)
+    clear_reference_cache()
+
+    if seed is None:
+        seed = resolve_seed()
+    logger.info(f"Seed: {seed}")
+
+    run_start = time.perf_counter()
+
+    try:
+        backfill_reference_tables(targets, seed)
+
+        header_needed = max(targets['TRANSACTION_HEADER'] - count_records('TRANSACTION_HEADER'), 0)
+
+        negative_before = products_below_zero()
+        if header_needed == 0:
+            logger.info("Transaction headers already at target, skipping transactions")
+            headers, lines, failed = 0, 0, 0
+        else:
+            logger.info(f"Expecting about {round(header_needed * mean_basket_size()):,} lines "
+                        f"({mean_basket_size():.2f} per header from BASKET_SIZE_WEIGHTS)")
+            headers, lines, failed = backfill_transactions(
+                header_needed, start_date, end_date,
+                chunk_size, workers, seed, vectorized
+            )
+            log_generation_summary(logger, 'TRANSACTION_HEADER', headers, failed, header_needed)
+
+        # Products can start below zero (cron runs backorder), but the
+        # backfill must not take any there
+        oversold = products_below_zero() - negative_before
+        if oversold:
+            logger.error(f"Backfill left {len(oversold):,} products below zero stock")
+    finally:
+        if build_indexes:
+            index_start = time.perf_counter()
+            indexes = db_schema.migrate(get_db_connection())
+            logger.info(f"Built {len(indexes)} indexes in {time.perf_counter() - index_start:.1f}s")
+        checkpoint(get_db_connection())
+        set_db_profile(None)
+
+    elapsed = time.perf_counter() - run_start
+    logger.info(f"Backfill finished in {elapsed:.1f}s "
+                f"({(headers + lines) / max(elapsed, 1e-9):,.0f} transaction rows/sec)")
+
+    return failed == 0 and not oversold
+
+def parse_targets(values):
+    """Parse TABLE=COUNT arguments over the default targets"""
+    targets = dict(BACKFILL_TARGETS)
+    for value in values or []:
+        table, _, count = value.partition('=')
+        table = table.strip().upper()
+        if table == 'TRANSACTION_LINE':
+            raise argparse.ArgumentTypeError(
+                "TRANSACTION_LINE isn't a target: lines per header come from BASKET_SIZE_WEIGHTS "
+                "(set TRANSACTION_HEADER instead)"
+            )
+        if table not in targets or not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid target '{value}' (expected TABLE=COUNT)")
+        targets[table] = int(count)
+    return targets
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD date argument"""
+    return datetime.strptime(value, '%Y-%m-%d')
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-generate data into a fresh database")
+    parser.add_argument('database', help="Database file to create and fill")
+    parser.add_argument('--target', action='append', metavar='TABLE=COUNT',
+                        help="Target total row count for a table (repeatable)")
+    parser.add_argument('--start-date', type=parse_date, default=None,
+                        help="First transaction date (YYYY-MM-DD, default: configured date range)")
+    parser.add_argument('--end-date', type=parse_date, default=None,
+                        help="Last transaction date (YYYY-MM-DD, default: configured date range)")
+    parser.add_argument('--schema-from', default=None,
+                        help="Existing database to copy the schema from (default: db_schema)")
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE,
+                        help="Transaction headers per committed chunk")
+    parser.add_argument('--append', action='store_true',
+                        help="Add to an existing database instead of creating one")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes generating transaction shards")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for all generated rows (default: config MASTER_SEED, else random)")
+    parser.add_argument('--engine', choices=['auto', 'numpy', 'python'], default='auto',
+                        help="Line generation engine (auto: numpy if installed)")
+    parser.add_argument('--set', action='append', metavar='NAME=VALUE', dest='overrides',
+                        help="Override a config setting for this run (repeatable)")
+    args = parser.parse_args()
+
+    try:
+        apply_setting_overrides(args.overrides)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e))
+    default_start, default_end = get_date_range()
+
+    if args.engine == 'numpy' and not line_engine.HAS_NUMPY:
+        parser.error("--engine numpy needs NumPy installed")
+    vectorized = args.engine == 'numpy' or (args.engine == 'auto' and line_engine.HAS_NUMPY)
+
+    try:
+        targets = parse_targets(args.target)
+        success = run_backfill(
+            args.database, targets, args.start_date or default_start, args.end_date or default_end,
+            schema_source=args.schema_from, append=args.append, chunk_size=args.chunk_size,
+            workers=args.workers, seed=args.seed, vectorized=vectorized
+        )
+        exit_code = 0 if success else 1
+    except Exception as e:
+        logger.error(f"Fatal error in backfill: {e}")
+        exit_code = 1
+
+    sys.exit(exit_code)
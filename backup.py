@@ -0,0 +1,282 @@
+"""
+Online Backup
+Copies the database with SQLite's backup API and streams the copy into a
+compressed archive (zstd when the zstandard package is installed, else gzip)
+
+The copy runs BACKUP_PAGES_PER_STEP pages at a time, so the source is
+only locked for one step at a time and writers get in between steps.
+Pages are copied into an in-memory database, which is checked with
+PRAGMA quick_check and then written out through the compressor; no
+uncompressed copy touches the disk. (Python before 3.11 can't serialize
+an in-memory database, so there, or with --spool, the copy goes to a
+temporary file beside the archive instead.)
+
+Usage:
+    python backup.py                          # backups/retail_pos_YYYY-MM-DD.db.zst (or .gz)
+    python backup.py --format gzip --level 6
+    python backup.py --output-dir /mnt/backups --pages 4096
+
+Restore with `zstd -d` or `gunzip`.
+"""
+
+import argparse
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from config import get_setting
+from utils import setup_logger, open_db_connection
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HAS_ZSTD = zstandard is not None
+
+# Setup logger
+logger = setup_logger('Backup')
+
+BACKUP_DIR = 'backups'
+BACKUP_PAGES_PER_STEP = 1024
+
+# Times a paged copy may start over before it's taken in one step
+BACKUP_MAX_RESTARTS = 3
+
+# Bytes handed to the compressor at a time
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+# format -> (file extension, default level)
+FORMATS = {
+    'zstd': ('.zst', 3),
+    'gzip': ('.gz', 6),
+}
+
+# ============================================
+# COPY
+# ============================================
+
+class CopyRestarted(Exception):
+    """Raised from the progress callback to give up on a paged copy"""
+
+def copy_database(database_path, target, pages=None, max_restarts=None):
+    """
+    Copy a database into target with the backup API, a step at a time
+
+    A write to the source between steps makes SQLite start the copy over.
+    After max_restarts of those, the copy is taken in a single step (one
+    read transaction: writers carry on in WAL mode, and in rollback-journal
+    mode they wait for that one step only).
+
+    Args:
+        target: Open connection to copy into
+        pages: Pages per step (default BACKUP_PAGES_PER_STEP)
+        max_restarts: Default BACKUP_MAX_RESTARTS
+
+    Returns:
+        tuple: (steps taken, restarts)
+    """
+    if pages is None:
+        pages = BACKUP_PAGES_PER_STEP
+    if max_restarts is None:
+        max_restarts = BACKUP_MAX_RESTARTS
+    steps = 0
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal steps, restarts, last_remaining
+        steps += 1
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise CopyRestarted()
+        last_remaining = remaining
+        if steps % 100 == 0:
+            logger.debug(f"Copied {total - remaining:,}/{total:,} pages")
+
+    source = open_db_connection(database_path, profile='readonly')
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except CopyRestarted:
+            logger.info(f"Source changed more than {max_restarts} times during the copy - copying in one step")
+            source.backup(target)
+            steps += 1
+    finally:
+        source.close()
+    return steps, restarts
+
+def quick_check(conn):
+    """
+    Run PRAGMA quick_check
+
+    Returns:
+        list: Problems found (empty when the database is ok)
+    """
+    rows = [row[0] for row in conn.execute('PRAGMA quick_check').fetchall()]
+    return [] if rows == ['ok'] else rows
+
+# ============================================
+# COMPRESSION
+# ============================================
+
+def open_archive(path, file_format, level):
+    """Writable binary stream that compresses into path"""
+    if file_format == 'zstd':
+        return zstandard.ZstdCompressor(level=level).stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, 'wb', compresslevel=level)
+
+def write_chunks(archive, data):
+    """Write a bytes-like object in WRITE_CHUNK_SIZE pieces"""
+    view = memoryview(data)
+    for start in range(0, len(view), WRITE_CHUNK_SIZE):
+        archive.write(view[start:start + WRITE_CHUNK_SIZE])
+
+# ============================================
+# BACKUP
+# ============================================
+
+def archive_path(output_dir, database_path, file_format):
+    """backups/<database name>_<date>.db plus the format's extension"""
+    name = os.path.splitext(os.path.basename(database_path))[0]
+    extension = FORMATS[file_format][0]
+    return os.path.join(output_dir, f"{name}_{datetime.now():%Y-%m-%d}.db{extension}")
+
+def run_backup(database_path, output_dir, file_format=None, level=None, pages=None, spool=False):
+    """
+    Back up a live database into a compressed, integrity-checked archive
+
+    Args:
+        file_format: 'zstd' or 'gzip' (default zstd when available)
+        level: Compression level (default per format)
+        spool: Copy to a temporary file instead of memory (for databases
+               too big to hold in memory twice)
+
+    Returns:
+        dict: Archive path, sizes, step counts and timings
+    """
+    if file_format is None:
+        file_format = 'zstd' if HAS_ZSTD else 'gzip'
+    if file_format == 'zstd' and not HAS_ZSTD:
+        raise ValueError("zstd needs the zstandard package (pip install zstandard)")
+    if level is None:
+        level = FORMATS[file_format][1]
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = archive_path(output_dir, database_path, file_format)
+    in_memory = not spool and hasattr(sqlite3.Connection, 'serialize')
+
+    spool_file = None
+    if in_memory:
+        target = sqlite3.connect(':memory:')
+    else:
+        spool_file = tempfile.NamedTemporaryFile(dir=output_dir, suffix='.db', delete=False)
+        spool_file.close()
+        target = sqlite3.connect(spool_file.name)
+
+    try:
+        start = time.perf_counter()
+        steps, restarts = copy_database(database_path, target, pages)
+        copy_time = time.perf_counter() - start
+
+        page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        page_count = target.execute('PRAGMA page_count').fetchone()[0]
+        size = page_size * page_count
+
+        start = time.perf_counter()
+        problems = quick_check(target)
+        check_time = time.perf_counter() - start
+        if problems:
+            raise RuntimeError(f"quick_check failed on the copy: {'; '.join(problems[:5])}")
+
+        start = time.perf_counter()
+        with open_archive(path + '.tmp', file_format, level) as archive:
+            if in_memory:
+                write_chunks(archive, target.serialize())
+            else:
+                target.close()
+                with open(spool_file.name, 'rb') as f:
+                    while True:
+                        chunk = f.read(WRITE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        archive.write(chunk)
+        os.replace(path + '.tmp', path)
+        compress_time = time.perf_counter() - start
+    finally:
+        target.close()
+        if spool_file is not None:
+            os.remove(spool_file.name)
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+
+    return {
+        'path': path,
+        'format': file_format,
+        'level': level,
+        'pages': page_count,
+        'steps': steps,
+        'restarts': restarts,
+        'size': size,
+        'compressed_size': os.path.getsize(path),
+        'copy_time': copy_time,
+        'check_time': check_time,
+        'compress_time': compress_time,
+    }
+
+def log_report(report):
+    """Log a backup's throughput and compression ratio"""
+    mb = report['size'] / (1024 * 1024)
+    compressed_mb = report['compressed_size'] / (1024 * 1024)
+    total_time = report['copy_time'] + report['check_time'] + report['compress_time']
+
+    def rate(seconds):
+        return f"{mb / seconds:,.1f} MB/s" if seconds > 0 else "-"
+
+    logger.info(f"Backup written: {report['path']}")
+    logger.info(f"  Copy          {report['copy_time']:7.2f}s {rate(report['copy_time']):>12}  "
+                f"({report['pages']:,} pages in {report['steps']:,} steps, {report['restarts']} restarts)")
+    logger.info(f"  quick_check   {report['check_time']:7.2f}s {rate(report['check_time']):>12}  ok")
+    logger.info(f"  {report['format']:<6} -{report['level']:<5} {report['compress_time']:7.2f}s "
+                f"{rate(report['compress_time']):>12}")
+    logger.info(f"  Total         {total_time:7.2f}s {rate(total_time):>12}")
+    ratio = report['size'] / report['compressed_size'] if report['compressed_size'] else 0
+    logger.info(f"  Size          {mb:,.2f} MB -> {compressed_mb:,.2f} MB ({ratio:.1f}x)")
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up the database into a compressed archive")
+    parser.add_argument('--database', default=get_setting('DATABASE_PATH'),
+                        help="Database file (default: configured DATABASE_PATH)")
+    parser.add_argument('--output-dir', default=BACKUP_DIR, help="Archive directory")
+    parser.add_argument('--format', choices=list(FORMATS),
+                        help="Compression (default: zstd if zstandard is installed, else gzip)")
+    parser.add_argument('--level', type=int, help="Compression level")
+    parser.add_argument('--pages', type=int, default=BACKUP_PAGES_PER_STEP,
+                        help="Pages copied per backup step")
+    parser.add_argument('--spool', action='store_true',
+                        help="Copy to a temporary file instead of memory")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        logger.error(f"{args.database} does not exist")
+        return 1
+
+    try:
+        report = run_backup(args.database, args.output_dir, args.format, args.level, args.pages, args.spool)
+    except (ValueError, RuntimeError) as e:
+        logger.error(str(e))
+        return 1
+
+    log_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Line Engine Benchmark
+Times the scalar line generator against the NumPy line engine on the same
+synthetic products and compares their output distributions
+
+Usage:
+    python benchmark_line_engine.py [--lines 200000] [--products 2000] [--seed 1]
+"""
+
+import argparse
+import importlib
+import sys
+import time
+from collections import Counter
+import line_engine
+from seeding import rand
+
+# Scalar generator being compared against
+line_generator = importlib.import_module('10_generate_transaction_lines')
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def synthetic_products(count):
+    """(plu, description, avg_cost, soh) rows with realistic costs and stock"""
+    return [
+        (str(100000 + i), f"Product {i}", round(rand.uniform(0.5, 60.0), 2), rand.randint(0, 100))
+        for i in range(count)
+    ]
+
+def scalar_lines(n, products):
+    """Lines from build_transaction_line(), one product draw per line"""
+    return [
+        line_generator.build_transaction_line(0, rand.choice(products))
+        for _ in range(n)
+    ]
+
+def vectorized_lines(n, products, seed):
+    """Lines from the NumPy engine"""
+    rng = line_engine.np.random.default_rng(seed)
+    return line_engine.build_lines([0] * n, line_engine.ProductColumns(products), rng)
+
+def summarize(lines):
+    """Distribution statistics of (transaction_id, plu, qty, price, total, discount) rows"""
+    n = len(lines)
+    quantities = Counter()
+    endings = Counter()
+    discounts = Counter()
+    total_qty = 0
+    total_paid = 0.0
+
+    for _, _, qty, price, total, discount in lines:
+        bucket = '1' if qty == 1 else '2-5' if qty <= 5 else '6-10'
+        quantities[bucket] += 1
+        endings[f"{round(price % 1, 2):.2f}"] += 1
+        discounts[discount] += 1
+        total_qty += qty
+        total_paid += total
+
+    stats = {'mean qty': total_qty / n, 'mean total': total_paid / n}
+    stats.update({f"qty {bucket}": quantities[bucket] / n for bucket in ('1', '2-5', '6-10')})
+    stats.update({f"ending {ending}": count / n for ending, count in sorted(endings.items())})
+    stats.update({f"discount {pct:g}%": count / n for pct, count in sorted(discounts.items())})
+    return stats
+
+def timed(func, *args):
+    """Run func, returning (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs NumPy line generation")
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rand.seed(args.seed)
+    products = synthetic_products(args.products)
+
+    scalar, scalar_time = timed(scalar_lines, args.lines, products)
+    print(f"scalar:     {scalar_time:8.3f}s  {args.lines / scalar_time:12,.0f} lines/sec")
+
+    if not line_engine.HAS_NUMPY:
+        print("numpy:      not installed, skipping vectorized engine")
+        return 0
+
+    vectorized, vectorized_time = timed(vectorized_lines, args.lines, products, args.seed)
+    print(f"vectorized: {vectorized_time:8.3f}s  {args.lines / vectorized_time:12,.0f} lines/sec "
+          f"({scalar_time / vectorized_time:.1f}x)")
+
+    # Same distributions: compare each statistic side by side
+    scalar_stats = summarize(scalar)
+    vectorized_stats = summarize(vectorized)
+    print()
+    print(f"{'statistic':<16} {'scalar':>10} {'vectorized':>11}")
+    for name in sorted(set(scalar_stats) | set(vectorized_stats)):
+        print(f"{name:<16} {scalar_stats.get(name, 0):>10.4f} {vectorized_stats.get(name, 0):>11.4f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
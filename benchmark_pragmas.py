@@ -0,0 +1,197 @@
+"""
+PRAGMA Profile Benchmark
+Times the DB_PROFILES against SQLite's defaults (rollback journal, full
+sync) on a scratch database shaped like TRANSACTION_LINE
+
+    cron      generator-sized transactions, one commit each
+    bulk      a backfill-sized load in large transactions, then a checkpoint
+    readonly  reader latency while a writer commits in another thread
+
+Usage:
+    python benchmark_pragmas.py [--commits 300] [--rows 50] [--bulk-rows 1000000] [--seconds 5]
+    python benchmark_pragmas.py --dir /path/on/the/real/disk
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from utils import open_db_connection, checkpoint
+
+# Journal and sync settings a database gets without a profile
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+# backfill.py's load PRAGMAs before the bulk profile
+MEMORY_JOURNAL_PRAGMAS = {'journal_mode': 'MEMORY', 'synchronous': 'OFF',
+                          'cache_size': '-262144', 'temp_store': 'MEMORY'}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS LINES (
+        Line_ID INTEGER PRIMARY KEY,
+        Transaction_ID INTEGER NOT NULL,
+        PLU TEXT NOT NULL,
+        Qty INTEGER NOT NULL,
+        Price REAL NOT NULL,
+        Total REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_lines_transaction ON LINES (Transaction_ID);
+    CREATE INDEX IF NOT EXISTS idx_lines_plu ON LINES (PLU);
+"""
+
+# ============================================
+# WORKLOADS
+# ============================================
+
+def make_rows(count, start, rng):
+    """Synthetic (Transaction_ID, PLU, Qty, Price, Total) rows"""
+    rows = []
+    for i in range(count):
+        qty = rng.randint(1, 5)
+        price = round(rng.uniform(0.5, 60.0), 2)
+        rows.append(((start + i) // 3, str(100000 + rng.randrange(5000)), qty, price, round(qty * price, 2)))
+    return rows
+
+def open_scratch(path, pragmas=None, profile=None):
+    """Connection to the scratch database with a profile, or with plain PRAGMAs"""
+    if profile:
+        conn = open_db_connection(path, pragmas={}, profile=profile)
+    else:
+        conn = sqlite3.connect(path)
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+    conn.executescript(SCHEMA)
+    return conn
+
+def insert(conn, rows):
+    conn.executemany("INSERT INTO LINES (Transaction_ID, PLU, Qty, Price, Total) VALUES (?, ?, ?, ?, ?)", rows)
+
+def bench_commits(path, commits, rows, pragmas=None, profile=None):
+    """Seconds per commit of a generator-sized batch"""
+    conn = open_scratch(path, pragmas, profile)
+    rng = random.Random(1)
+    batches = [make_rows(rows, i * rows, rng) for i in range(commits)]
+    start = time.perf_counter()
+    for batch in batches:
+        insert(conn, batch)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed / commits
+
+def bench_bulk(path, total_rows, chunk, pragmas=None, profile=None):
+    """Load seconds and checkpoint seconds for total_rows in chunk-row transactions"""
+    conn = open_scratch(path, pragmas, profile)
+    rng = random.Random(1)
+    load = 0.0
+    for offset in range(0, total_rows, chunk):
+        rows = make_rows(min(chunk, total_rows - offset), offset, rng)
+        start = time.perf_counter()
+        insert(conn, rows)
+        conn.commit()
+        load += time.perf_counter() - start
+    start = time.perf_counter()
+    checkpoint(conn)
+    done = time.perf_counter() - start
+    conn.close()
+    return load, done
+
+def bench_readers(path, seconds, rows, pragmas=None, profile=None):
+    """
+    Read latencies while a writer commits batches as fast as it can
+
+    Returns:
+        tuple: (latencies in seconds, reads that failed, writer commits)
+    """
+    rng = random.Random(1)
+    writer = open_scratch(path, pragmas, profile)
+    insert(writer, make_rows(20000, 0, rng))
+    writer.commit()
+    writer.close()
+
+    stop = threading.Event()
+    commits = [0]
+
+    def write():
+        conn = open_scratch(path, pragmas, profile)
+        offset = 20000
+        while not stop.is_set():
+            insert(conn, make_rows(rows, offset, rng))
+            conn.commit()
+            offset += rows
+            commits[0] += 1
+        conn.close()
+
+    reader = open_db_connection(path, pragmas={}, profile='readonly')
+    thread = threading.Thread(target=write)
+    thread.start()
+    latencies = []
+    failed = 0
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                reader.execute("SELECT COUNT(*), SUM(Total) FROM LINES WHERE Transaction_ID > 6000").fetchone()
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+    return latencies, failed, commits[0]
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def scratch_path(directory, name):
+    return os.path.join(directory, f"{name}.db")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the database PRAGMA profiles")
+    parser.add_argument('--commits', type=int, default=300, help="cron: transactions to commit")
+    parser.add_argument('--rows', type=int, default=50, help="Rows per generator-sized transaction")
+    parser.add_argument('--bulk-rows', type=int, default=1000000, help="bulk: rows to load")
+    parser.add_argument('--chunk', type=int, default=10000, help="bulk: rows per transaction")
+    parser.add_argument('--seconds', type=float, default=5.0, help="readonly: seconds to read for")
+    parser.add_argument('--dir', default='.', help="Directory for the scratch databases (use the real disk)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"cron: {args.commits} commits of {args.rows} rows")
+        for label, pragmas, profile in (('default', DEFAULT_PRAGMAS, None), ('cron', None, 'cron')):
+            per_commit = bench_commits(scratch_path(directory, f"commits_{label}"),
+                                       args.commits, args.rows, pragmas, profile)
+            print(f"  {label:<16} {per_commit * 1000:8.2f} ms/commit {1 / per_commit:10,.0f} commits/s")
+
+        print(f"\nbulk: {args.bulk_rows:,} rows in {args.chunk:,}-row transactions")
+        for label, pragmas, profile in (('default', DEFAULT_PRAGMAS, None),
+                                        ('memory journal', MEMORY_JOURNAL_PRAGMAS, None),
+                                        ('bulk', None, 'bulk')):
+            load, done = bench_bulk(scratch_path(directory, f"bulk_{label.replace(' ', '_')}"),
+                                    args.bulk_rows, args.chunk, pragmas, profile)
+            print(f"  {label:<16} {load:8.2f}s load {done:6.2f}s checkpoint "
+                  f"{args.bulk_rows / (load + done):12,.0f} rows/s")
+
+        print(f"\nreadonly: reads for {args.seconds:g}s while a writer commits {args.rows}-row batches")
+        for label, pragmas, profile in (('default writer', DEFAULT_PRAGMAS, None), ('cron writer', None, 'cron')):
+            latencies, failed, commits = bench_readers(scratch_path(directory, f"readers_{label.split()[0]}"),
+                                                       args.seconds, args.rows, pragmas, profile)
+            if latencies:
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99)]
+                print(f"  {label:<16} {len(latencies) / args.seconds:8,.0f} reads/s "
+                      f"median {statistics.median(latencies) * 1000:6.2f} ms p99 {p99 * 1000:7.2f} ms "
+                      f"max {latencies[-1] * 1000:7.1f} ms, {failed} failed, {commits / args.seconds:,.0f} commits/s")
+            else:
+                print(f"  {label:<16} no reads completed, {failed} failed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Startup Benchmark
+Times a cold import of config, utils and every generator in a fresh
+interpreter, and checks that importing them touches no files
+
+Each run starts a new Python process in an empty temporary directory, so
+a logs/ directory or log file appearing there means an import had side
+effects.
+
+Usage:
+    python benchmark_startup.py [--runs 20]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ['config', 'utils'] + sorted(
+    name[:-3] for name in os.listdir(REPO_DIR)
+    if name[:2].isdigit() and name.endswith('.py')
+)
+
+# Imported in the child; prints the import time in seconds
+IMPORT_SCRIPT = """
+import importlib, sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+print(time.perf_counter() - start)
+"""
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def time_import(modules, workdir):
+    """Import modules in a fresh interpreter, returning seconds"""
+    script = IMPORT_SCRIPT.format(repo=REPO_DIR, modules=modules)
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=workdir,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def created_files(workdir):
+    """Paths created under workdir (relative)"""
+    found = []
+    for root, dirs, files in os.walk(workdir):
+        for name in dirs + files:
+            found.append(os.path.relpath(os.path.join(root, name), workdir))
+    return sorted(found)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark import-time startup")
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    side_effects = set()
+    results = {}
+    for label, modules in (('config', ['config']), ('config + utils', ['config', 'utils']),
+                           ('all generators', MODULES)):
+        timings = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as workdir:
+                timings.append(time_import(modules, workdir))
+                side_effects.update(created_files(workdir))
+        results[label] = timings
+
+    print(f"{'import':<16} {'median':>10} {'min':>10}   ({args.runs} fresh interpreters)")
+    for label, timings in results.items():
+        print(f"{label:<16} {statistics.median(timings) * 1000:>8.1f}ms {min(timings) * 1000:>8.1f}ms")
+
+    if side_effects:
+        print(f"\nImports created files: {', '.join(sorted(side_effects))}")
+        return 1
+    print("\nNo files created by importing")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
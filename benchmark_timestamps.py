@@ -0,0 +1,78 @@
+"""
+Timestamp Benchmark
+Times per-row random_datetime() + format_datetime_sqlite() against the
+batched timestamp engine, and prints the hour and weekday mix it produces
+
+Usage:
+    python benchmark_timestamps.py [--count 1000000] [--seed 1]
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from config import get_date_range
+from utils import random_datetime, format_datetime_sqlite
+from timestamps import TimestampGenerator
+import line_engine
+from seeding import rand
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def per_row(n, start_date, end_date):
+    """One datetime and one strftime per timestamp"""
+    return [
+        format_datetime_sqlite(random_datetime(start_date, end_date, business_hours_only=True))
+        for _ in range(n)
+    ]
+
+def timed(func, *args, **kwargs):
+    """Run func, returning (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def report(label, n, seconds, baseline=None):
+    speedup = f" ({baseline / seconds:.1f}x)" if baseline else ""
+    print(f"{label:<22} {seconds:8.3f}s {n / seconds:14,.0f} timestamps/sec{speedup}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark timestamp generation")
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rand.seed(args.seed)
+    start_date, end_date = get_date_range()
+    n = args.count
+
+    _, baseline = timed(per_row, n, start_date, end_date)
+    report("per-row datetime", n, baseline)
+
+    generator, setup = timed(TimestampGenerator, start_date, end_date)
+    timestamps, seconds = timed(generator.generate, n)
+    report("engine (random)", n, seconds + setup, baseline)
+
+    if line_engine.HAS_NUMPY:
+        rng = line_engine.np.random.default_rng(args.seed)
+        _, seconds = timed(generator.generate, n, rng)
+        report("engine (numpy)", n, seconds + setup, baseline)
+        _, seconds = timed(generator.generate, n, rng, sort=True)
+        report("engine (numpy, sorted)", n, seconds + setup, baseline)
+
+    # Traffic mix of the engine's output
+    hours = Counter(timestamp[11:13] for timestamp in timestamps)
+    print()
+    print("hour share:    " + "  ".join(f"{hour}:{hours[hour] / n:.3f}" for hour in sorted(hours)))
+
+    day_names = {day.strftime('%Y-%m-%d'): day.strftime('%a') for day in generator.days}
+    weekdays = Counter(day_names[timestamp[:10]] for timestamp in timestamps)
+    print("weekday share: " + "  ".join(
+        f"{name}:{weekdays[name] / n:.3f}" for name in ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+    ))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
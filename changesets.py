@@ -0,0 +1,552 @@
+"""
+Changesets
+Each generation run's changes as a small gzipped SQL file, so the repo
+commits those instead of the whole retail_pos.db
+
+Generators only insert, so a changeset's new rows are the rows above
+each table's rowid high-water mark as of the previous changeset (kept in
+that changeset's header, or read from the base snapshot); the changeset
+records the rowid range per table and the rows as INSERTs. The only
+updates are PRODUCT.SOH (see stock_ledger.py), written as an UPDATE per
+product that differs from the CHANGESET_BASELINE bookkeeping table, and
+ROW_COUNTS, copied whole. Rows written between master_runner runs (by a
+generator run on its own, or backfill --append) go into the next
+changeset.
+
+Changesets are numbered, and a database records the last one it contains
+in PRAGMA user_version. Replay copies the base snapshot and applies every
+changeset numbered above the snapshot's user_version:
+
+    deltas/base.db
+    deltas/changeset-000001.sql.gz
+    deltas/changeset-000002.sql.gz
+
+master_runner.py records a changeset after each run (RECORD_CHANGESETS),
+creating the base snapshot from the database first if there isn't one.
+
+The base snapshot is only rewritten by `snapshot`, which folds the
+changesets into a fresh, VACUUMed base. Git keeps every committed base
+and changeset, so run it rarely: `status` suggests it once the
+changesets outgrow the base.
+
+Usage:
+    python changesets.py replay              # Rebuild retail_pos.db from deltas/
+    python changesets.py replay --in-place   # Only apply changesets newer than retail_pos.db
+    python changesets.py snapshot            # Make retail_pos.db the base, drop the changesets it holds
+    python changesets.py status
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+from datetime import datetime
+from config import get_setting
+from utils import setup_logger, open_db_connection
+from db_schema import TABLES, create_schema, existing_tables, migrate
+
+# Setup logger
+logger = setup_logger('Changesets')
+
+# Columns generators update in place: table -> columns
+MUTABLE_COLUMNS = {
+    'PRODUCT': ('SOH',),
+}
+
+# Bookkeeping tables copied whole into every changeset
+REPLACED_TABLES = ('ROW_COUNTS',)
+
+# Rows per multi-row INSERT statement
+ROWS_PER_STATEMENT = 500
+
+CHANGESET_PATTERN = re.compile(r'^changeset-(\d+)\.sql\.gz$')
+
+# MUTABLE_COLUMNS values as of the last changeset, which the next one is
+# diffed against
+BASELINE_DDL = """
+    CREATE TABLE IF NOT EXISTS CHANGESET_BASELINE (
+        Table_Name TEXT NOT NULL,
+        Row_ID INTEGER NOT NULL,
+        Row_Values TEXT NOT NULL,
+        PRIMARY KEY (Table_Name, Row_ID)
+    ) WITHOUT ROWID
+"""
+
+# ============================================
+# SQL TEXT
+# ============================================
+
+def sql_literal(value):
+    """A Python value from sqlite3 as an SQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return repr(value)
+
+def insert_columns(conn, table):
+    """
+    Columns to select and insert so a row keeps its rowid
+
+    A table with an INTEGER PRIMARY KEY keeps it through that column;
+    any other table needs rowid listed explicitly.
+    """
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    columns = [row[1] for row in info]
+    keys = [row for row in info if row[5]]
+    if len(keys) == 1 and keys[0][2].upper() == 'INTEGER':
+        return columns
+    return ['rowid'] + columns
+
+def read_statements(path):
+    """Yield the SQL statements of a changeset file, skipping comments"""
+    lines = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not lines and line.startswith('--'):
+                continue
+            lines.append(line)
+            # Statements end with ';' at the end of a line (a string value could too)
+            if line.endswith(';\n'):
+                statement = ''.join(lines)
+                if sqlite3.complete_statement(statement):
+                    yield statement
+                    lines = []
+
+def read_header(path):
+    """The JSON header on a changeset's first line"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.loads(f.readline()[len('-- changeset '):])
+
+# ============================================
+# RECORDING
+# ============================================
+
+def get_user_version(conn):
+    """Number of the last changeset the database contains (0 for none)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def list_changesets(directory):
+    """(number, path) of every changeset in directory, in order"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = CHANGESET_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+def save_snapshot(conn, base_path):
+    """Write a compact copy of the database (user_version included) to base_path"""
+    os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+    if conn.in_transaction:
+        conn.commit()
+    temporary = base_path + '.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    conn.execute('VACUUM INTO ?', (temporary,))
+    os.replace(temporary, base_path)
+
+def table_watermarks(conn):
+    """Highest rowid in each of TABLES (0 for a missing or empty table)"""
+    tables = existing_tables(conn)
+    return {
+        table: conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0] if table in tables else 0
+        for table in TABLES
+    }
+
+def current_values(conn):
+    """MUTABLE_COLUMNS values of every row: {table: {rowid: values}}"""
+    tables = existing_tables(conn)
+    values = {}
+    for table, columns in MUTABLE_COLUMNS.items():
+        values[table] = {}
+        if table in tables:
+            rows = conn.execute(f"SELECT rowid, {', '.join(columns)} FROM {table}")
+            values[table] = {row[0]: row[1:] for row in rows}
+    return values
+
+def save_baseline(conn):
+    """
+    Store the current MUTABLE_COLUMNS values in CHANGESET_BASELINE
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    conn.execute(BASELINE_DDL)
+    conn.execute('DELETE FROM CHANGESET_BASELINE')
+    for table, rows in current_values(conn).items():
+        conn.executemany(
+            'INSERT INTO CHANGESET_BASELINE (Table_Name, Row_ID, Row_Values) VALUES (?, ?, ?)',
+            ((table, rowid, json.dumps(values)) for rowid, values in rows.items())
+        )
+
+def read_baseline(conn):
+    """CHANGESET_BASELINE as {table: {rowid: values}}, or None if there isn't one"""
+    if 'CHANGESET_BASELINE' not in existing_tables(conn):
+        return None
+    values = {table: {} for table in MUTABLE_COLUMNS}
+    for table, rowid, row_values in conn.execute('SELECT Table_Name, Row_ID, Row_Values FROM CHANGESET_BASELINE'):
+        values.setdefault(table, {})[rowid] = tuple(json.loads(row_values))
+    return values
+
+def recorded_watermarks(conn, directory, base_path):
+    """
+    Rowid high-water marks as of the last changeset the database holds
+
+    Read from that changeset's header, or from the base snapshot when the
+    database holds no changeset past it.
+
+    Returns:
+        dict: {table: rowid}, or None if they weren't recorded
+    """
+    version = get_user_version(conn)
+    for number, path in list_changesets(directory):
+        if number == version:
+            marks = read_header(path).get('marks')
+            return {table: marks.get(table, 0) for table in TABLES} if marks else None
+
+    base = open_db_connection(base_path, profile='readonly')
+    try:
+        if get_user_version(base) == version:
+            return table_watermarks(base)
+    finally:
+        base.close()
+    return None
+
+def capture_marks(conn, base_path=None, directory=None):
+    """
+    State to diff the next changeset against: rowid watermarks and mutable
+    column values as of the last changeset
+
+    Saves the database as the base snapshot first if there isn't one, so
+    the first changeset has something to apply to. A database from before
+    high-water marks were recorded is diffed against its current state.
+
+    Returns:
+        dict: {'watermarks': {table: rowid}, 'values': {table: {rowid: values}}}
+    """
+    if base_path is None:
+        base_path = get_setting('BASE_SNAPSHOT')
+    if directory is None:
+        directory = get_setting('CHANGESET_DIR')
+    if not os.path.exists(base_path):
+        logger.info(f"No base snapshot - saving the database as {base_path}")
+        save_baseline(conn)
+        conn.commit()
+        save_snapshot(conn, base_path)
+
+    watermarks = recorded_watermarks(conn, directory, base_path)
+    if watermarks is None:
+        logger.info(f"No high-water marks recorded for changeset {get_user_version(conn)} - "
+                    f"recording changes from now on")
+        watermarks = table_watermarks(conn)
+
+    values = read_baseline(conn)
+    if values is None:
+        values = current_values(conn)
+
+    return {'watermarks': watermarks, 'values': values}
+
+def inserted_ranges(conn, marks):
+    """(first, last) rowid inserted since marks were captured, per table"""
+    tables = existing_tables(conn)
+    ranges = {}
+    for table in TABLES:
+        if table in tables:
+            watermark = marks['watermarks'].get(table, 0)
+            last = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0]
+            if last > watermark:
+                ranges[table] = [watermark + 1, last]
+    return ranges
+
+def insert_statements(conn, table, first, last):
+    """Yield multi-row INSERTs for the rows of table with rowid in [first, last]"""
+    columns = insert_columns(conn, table)
+    cursor = conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+        (first, last)
+    )
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+    while True:
+        rows = cursor.fetchmany(ROWS_PER_STATEMENT)
+        if not rows:
+            break
+        yield prefix + ',\n'.join('(' + ', '.join(map(sql_literal, row)) + ')' for row in rows) + ';\n'
+
+def update_statements(conn, marks):
+    """Yield an UPDATE for every pre-existing row whose MUTABLE_COLUMNS changed"""
+    tables = existing_tables(conn)
+    for table, columns in MUTABLE_COLUMNS.items():
+        if table not in tables:
+            continue
+        before = marks['values'].get(table, {})
+        rows = conn.execute(
+            f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid <= ?",
+            (marks['watermarks'].get(table, 0),)
+        )
+        for row in rows:
+            if before.get(row[0]) != row[1:]:
+                assignments = ', '.join(f"{column} = {sql_literal(value)}" for column, value in zip(columns, row[1:]))
+                yield f"UPDATE {table} SET {assignments} WHERE rowid = {row[0]};\n"
+
+def replace_statements(conn):
+    """Yield statements that replace each of REPLACED_TABLES with its current rows"""
+    tables = existing_tables(conn)
+    for table in REPLACED_TABLES:
+        if table not in tables:
+            continue
+        last = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0]
+        yield f"DELETE FROM {table};\n"
+        yield from insert_statements(conn, table, 1, last)
+
+def write_changeset(conn, marks, directory=None):
+    """
+    Write the changes since capture_marks() as the next numbered changeset
+
+    Stamps the database's user_version with the changeset's number.
+
+    Returns:
+        dict: The changeset's header (number, created_at, inserted rowid
+              ranges, updates), or None if nothing changed
+    """
+    if directory is None:
+        directory = get_setting('CHANGESET_DIR')
+
+    ranges = inserted_ranges(conn, marks)
+    updates = list(update_statements(conn, marks))
+    if not ranges and not updates:
+        logger.info("No changes since the last changeset")
+        return None
+
+    # Past the last file too, in case a run died between writing and stamping
+    os.makedirs(directory, exist_ok=True)
+    existing = list_changesets(directory)
+    number = max(get_user_version(conn), existing[-1][0] if existing else 0) + 1
+    path = os.path.join(directory, f"changeset-{number:06d}.sql.gz")
+
+    header = {
+        'number': number,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'ranges': ranges,
+        'updates': len(updates),
+        'marks': table_watermarks(conn),
+    }
+    with gzip.open(path + '.tmp', 'wt', compresslevel=6, encoding='utf-8') as f:
+        f.write(f"-- changeset {json.dumps(header)}\n")
+        for table, (first, last) in ranges.items():
+            f.writelines(insert_statements(conn, table, first, last))
+        f.writelines(updates)
+        f.writelines(replace_statements(conn))
+    os.replace(path + '.tmp', path)
+
+    save_baseline(conn)
+    conn.execute(f'PRAGMA user_version = {number}')
+    conn.commit()
+
+    inserted = sum(last - first + 1 for first, last in ranges.values())
+    logger.info(
+        f"Changeset {number}: {inserted:,} rows inserted, {len(updates):,} updated "
+        f"({os.path.getsize(path) / 1024:,.1f} KB)"
+    )
+    return header
+
+# ============================================
+# REPLAY
+# ============================================
+
+def apply_changesets(conn, directory=None):
+    """
+    Apply every changeset numbered above the database's user_version
+
+    Each changeset is applied in one transaction, together with the new
+    user_version, so an interrupted replay can simply be run again.
+
+    Returns:
+        list: Numbers of the changesets applied
+    """
+    if directory is None:
+        directory = get_setting('CHANGESET_DIR')
+
+    applied = []
+    version = get_user_version(conn)
+    for number, path in list_changesets(directory):
+        if number <= version:
+            continue
+        if number != version + 1:
+            raise ValueError(f"changeset {version + 1} is missing (next found: {number})")
+
+        conn.execute('BEGIN')
+        try:
+            for statement in read_statements(path):
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(number)
+        version = number
+    return applied
+
+def remove_database(database_path):
+    """Delete a database file and any WAL/journal files left beside it"""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(database_path + suffix):
+            os.remove(database_path + suffix)
+
+def replay(database_path=None, directory=None, base_path=None, in_place=False):
+    """
+    Rebuild a database from the base snapshot plus changesets
+
+    Args:
+        in_place: Apply only the changesets newer than the existing
+                  database instead of starting over from the base
+
+    Returns:
+        list: Numbers of the changesets applied
+    """
+    database_path = database_path or get_setting('DATABASE_PATH')
+    base_path = base_path or get_setting('BASE_SNAPSHOT')
+
+    if in_place and os.path.exists(database_path):
+        target = database_path
+    else:
+        if not os.path.exists(base_path):
+            raise FileNotFoundError(f"no base snapshot at {base_path}")
+        target = database_path + '.replay'
+        remove_database(target)
+        shutil.copyfile(base_path, target)
+
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        # A base from an older schema gets the new tables, and the new
+        # indexes once the rows are in
+        create_schema(conn, indexes=False)
+        applied = apply_changesets(conn, directory)
+        migrate(conn)
+        conn.execute('BEGIN')
+        save_baseline(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if target != database_path:
+        remove_database(database_path)
+        os.replace(target, database_path)
+    return applied
+
+def snapshot(database_path=None, directory=None, base_path=None):
+    """
+    Make the database the new base snapshot and delete the changesets it holds
+
+    Rows not yet in a changeset become part of the base. The snapshot is
+    VACUUMed, so it is also how deltas/ is compacted.
+
+    Returns:
+        int: Changesets removed
+    """
+    database_path = database_path or get_setting('DATABASE_PATH')
+    directory = directory or get_setting('CHANGESET_DIR')
+    base_path = base_path or get_setting('BASE_SNAPSHOT')
+
+    conn = sqlite3.connect(database_path)
+    try:
+        version = get_user_version(conn)
+        save_baseline(conn)
+        conn.commit()
+        save_snapshot(conn, base_path)
+    finally:
+        conn.close()
+
+    removed = 0
+    for number, path in list_changesets(directory):
+        if number <= version:
+            os.remove(path)
+            removed += 1
+    return removed
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def show_status(database_path, directory, base_path):
+    """Log the base snapshot, each changeset's ranges, and the database's position"""
+    base_size = None
+    if os.path.exists(base_path):
+        conn = open_db_connection(base_path, profile='readonly')
+        try:
+            version = get_user_version(conn)
+        finally:
+            conn.close()
+        base_size = os.path.getsize(base_path)
+        logger.info(f"Base snapshot {base_path}: {base_size / (1024 * 1024):,.1f} MB, "
+                    f"holds changesets up to {version}")
+    else:
+        logger.info(f"No base snapshot at {base_path}")
+
+    total = 0
+    for number, path in list_changesets(directory):
+        header = read_header(path)
+        size = os.path.getsize(path)
+        total += size
+        ranges = ', '.join(f"{table} {first:,}-{last:,}" for table, (first, last) in header['ranges'].items())
+        logger.info(f"  {number:>6} {header['created_at']} {size / 1024:>9,.1f} KB  "
+                    f"{header['updates']:,} updates  {ranges or 'no inserts'}")
+    logger.info(f"Changesets: {total / (1024 * 1024):,.2f} MB")
+    if base_size and total > base_size:
+        logger.info("The changesets are bigger than the base - "
+                    "`python changesets.py snapshot` would fold them into a new base")
+
+    if os.path.exists(database_path):
+        conn = open_db_connection(database_path, profile='readonly')
+        try:
+            logger.info(f"{database_path} holds changesets up to {get_user_version(conn)}")
+        finally:
+            conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the database from a base snapshot plus changesets")
+    parser.add_argument('command', choices=['replay', 'snapshot', 'status'])
+    parser.add_argument('--database', default=get_setting('DATABASE_PATH'),
+                        help="Database file (default: configured DATABASE_PATH)")
+    parser.add_argument('--directory', default=get_setting('CHANGESET_DIR'),
+                        help="Changeset directory (default: configured CHANGESET_DIR)")
+    parser.add_argument('--base', default=get_setting('BASE_SNAPSHOT'),
+                        help="Base snapshot (default: configured BASE_SNAPSHOT)")
+    parser.add_argument('--in-place', action='store_true',
+                        help="replay: only apply changesets newer than the database")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        show_status(args.database, args.directory, args.base)
+        return 0
+
+    if args.command == 'snapshot':
+        if not os.path.exists(args.database):
+            logger.error(f"{args.database} does not exist")
+            return 1
+        removed = snapshot(args.database, args.directory, args.base)
+        logger.info(f"Saved {args.database} as {args.base}, removed {removed} changesets")
+        return 0
+
+    try:
+        applied = replay(args.database, args.directory, args.base, args.in_place)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+    if applied:
+        logger.info(f"Applied changesets {applied[0]}-{applied[-1]} to {args.database}")
+    else:
+        logger.info(f"{args.database} is up to date")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
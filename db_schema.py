@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Database Schema
+DDL for the 10 retail POS tables and the indexes behind the generators'
+hot queries
+
+Commands:
+    python db_schema.py create [--database retail_pos.db]
+        Create any missing tables and indexes (safe on an existing database)
+    python db_schema.py migrate [--database retail_pos.db] [--dry-run]
+        Add missing indexes to an existing database
+    python db_schema.py counts [--database retail_pos.db] [--verify] [--repair]
+        Show the tracked row counts; --verify compares them with COUNT(*)
+        (exit code 1 on a mismatch) and --repair fixes them
+"""
+
+import argparse
+import os
+import sys
+from config import get_setting
+from utils import (
+    setup_logger,
+    open_db_connection,
+    ROW_COUNTS_DDL,
+    read_row_counts,
+    verify_row_counts
+)
+
+# Setup logger
+logger = setup_logger('DatabaseSchema')
+
+# ============================================
+# TABLES
+# ============================================
+
+# In dependency order (referenced tables first)
+TABLES = {
+    'CATEGORY': """
+        CREATE TABLE IF NOT EXISTS CATEGORY (
+            Category_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Category_Name TEXT NOT NULL UNIQUE,
+            Description TEXT
+        )
+    """,
+    'SUPPLIER': """
+        CREATE TABLE IF NOT EXISTS SUPPLIER (
+            Supplier_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Supplier_Name TEXT NOT NULL UNIQUE,
+            Contact_Name TEXT,
+            Contact_Phone TEXT,
+            Contact_Email TEXT,
+            Address TEXT,
+            Payment_Terms TEXT,
+            Active_Status INTEGER NOT NULL DEFAULT 1 CHECK (Active_Status IN (0, 1))
+        )
+    """,
+    'STAFF': """
+        CREATE TABLE IF NOT EXISTS STAFF (
+            Staff_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Staff_Name TEXT NOT NULL UNIQUE,
+            Active_Status INTEGER NOT NULL DEFAULT 1 CHECK (Active_Status IN (0, 1)),
+            Hire_Date TEXT,
+            Role TEXT
+        )
+    """,
+    'MACHINE': """
+        CREATE TABLE IF NOT EXISTS MACHINE (
+            Machine_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Machine_Name TEXT NOT NULL UNIQUE,
+            Location TEXT,
+            Active_Status INTEGER NOT NULL DEFAULT 1 CHECK (Active_Status IN (0, 1)),
+            Install_Date TEXT
+        )
+    """,
+    'PAYMENT_METHOD': """
+        CREATE TABLE IF NOT EXISTS PAYMENT_METHOD (
+            Payment_Method_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Payment_Method_Name TEXT NOT NULL UNIQUE,
+            Description TEXT,
+            Processing_Fee_Percent REAL CHECK (Processing_Fee_Percent >= 0),
+            Active_Status INTEGER NOT NULL DEFAULT 1 CHECK (Active_Status IN (0, 1))
+        )
+    """,
+    'TRANSACTION_TYPE': """
+        CREATE TABLE IF NOT EXISTS TRANSACTION_TYPE (
+            Transaction_Type_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Transaction_Type_Name TEXT NOT NULL UNIQUE,
+            Description TEXT,
+            Affects_Inventory INTEGER NOT NULL DEFAULT 1 CHECK (Affects_Inventory IN (0, 1)),
+            Affects_Revenue INTEGER NOT NULL DEFAULT 1 CHECK (Affects_Revenue IN (0, 1))
+        )
+    """,
+    'PRODUCT_GROUP': """
+        CREATE TABLE IF NOT EXISTS PRODUCT_GROUP (
+            Product_Group_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Product_Group_Name TEXT NOT NULL UNIQUE,
+            Description TEXT,
+            Category_ID INTEGER NOT NULL REFERENCES CATEGORY(Category_ID)
+        )
+    """,
+    'PRODUCT': """
+        CREATE TABLE IF NOT EXISTS PRODUCT (
+            PLU TEXT PRIMARY KEY,
+            Description TEXT NOT NULL,
+            Avg_Real_Cost REAL CHECK (Avg_Real_Cost >= 0),
+            SOH INTEGER NOT NULL DEFAULT 0,
+            EXP INTEGER,
+            History TEXT,
+            Product_Group_ID INTEGER REFERENCES PRODUCT_GROUP(Product_Group_ID),
+            Supplier_ID INTEGER REFERENCES SUPPLIER(Supplier_ID)
+        )
+    """,
+    'TRANSACTION_HEADER': """
+        CREATE TABLE IF NOT EXISTS TRANSACTION_HEADER (
+            Transaction_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Time_Stamp TEXT NOT NULL,
+            Staff_ID INTEGER NOT NULL REFERENCES STAFF(Staff_ID),
+            Machine_ID INTEGER NOT NULL REFERENCES MACHINE(Machine_ID),
+            Payment_Method_ID INTEGER NOT NULL REFERENCES PAYMENT_METHOD(Payment_Method_ID),
+            Transaction_Type_ID INTEGER NOT NULL REFERENCES TRANSACTION_TYPE(Transaction_Type_ID),
+            For_Staff_ID INTEGER REFERENCES STAFF(Staff_ID)
+        )
+    """,
+    'TRANSACTION_LINE': """
+        CREATE TABLE IF NOT EXISTS TRANSACTION_LINE (
+            Transaction_Line_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Transaction_ID INTEGER NOT NULL REFERENCES TRANSACTION_HEADER(Transaction_ID),
+            PLU TEXT NOT NULL REFERENCES PRODUCT(PLU),
+            Qty_Supplied INTEGER NOT NULL,
+            Original_Price REAL NOT NULL,
+            Total_Paid REAL NOT NULL,
+            Discount_Percent REAL NOT NULL DEFAULT 0
+        )
+    """,
+}
+
+# ============================================
+# INDEXES
+# ============================================
+
+# (index name, table, columns). An index is only created when no existing
+# index on the table already starts with the same columns, so the UNIQUE
+# name constraints above satisfy the name lookups on a fresh database.
+INDEXES = [
+    # *_exists() uniqueness checks (record_exists on the name column)
+    ('idx_category_name', 'CATEGORY', ('Category_Name',)),
+    ('idx_supplier_name', 'SUPPLIER', ('Supplier_Name',)),
+    ('idx_staff_name', 'STAFF', ('Staff_Name',)),
+    ('idx_machine_name', 'MACHINE', ('Machine_Name',)),
+    ('idx_payment_method_name', 'PAYMENT_METHOD', ('Payment_Method_Name',)),
+    ('idx_transaction_type_name', 'TRANSACTION_TYPE', ('Transaction_Type_Name',)),
+    ('idx_product_group_name', 'PRODUCT_GROUP', ('Product_Group_Name',)),
+    ('idx_product_plu', 'PRODUCT', ('PLU',)),
+
+    # Lines of a transaction, and COUNT(DISTINCT Transaction_ID) without a table scan
+    ('idx_transaction_line_transaction', 'TRANSACTION_LINE', ('Transaction_ID',)),
+    # Sales per product, and PRODUCT foreign key checks
+    ('idx_transaction_line_plu', 'TRANSACTION_LINE', ('PLU',)),
+    # Date range reports and exports
+    ('idx_transaction_header_time', 'TRANSACTION_HEADER', ('Time_Stamp',)),
+]
+
+# ============================================
+# SCHEMA FUNCTIONS
+# ============================================
+
+def existing_tables(conn):
+    """Names of the tables in the database"""
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return {name for (name,) in rows}
+
+def index_prefixes(conn, table):
+    """Leading column tuples of every index on table (including autoindexes)"""
+    prefixes = set()
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        index_name = index[1]
+        columns = tuple(
+            column for _, _, column in
+            conn.execute(f"PRAGMA index_info('{index_name}')").fetchall()
+        )
+        for length in range(1, len(columns) + 1):
+            prefixes.add(columns[:length])
+    return prefixes
+
+def missing_indexes(conn):
+    """
+    Indexes from INDEXES that the database doesn't have yet
+
+    Tables that don't exist are skipped.
+
+    Returns:
+        list: (index name, table, columns) tuples
+    """
+    tables = existing_tables(conn)
+    missing = []
+
+    for index_name, table, columns in INDEXES:
+        if table not in tables:
+            continue
+        if columns not in index_prefixes(conn, table):
+            missing.append((index_name, table, columns))
+
+    return missing
+
+def create_indexes(conn, indexes):
+    """Create the given (index name, table, columns) indexes"""
+    for index_name, table, columns in indexes:
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(columns)})"
+        )
+    conn.commit()
+
+def create_tables(conn):
+    """
+    Create any of the 10 tables (and the ROW_COUNTS bookkeeping table)
+    that don't exist yet
+
+    Returns:
+        list: Names of the tables created
+    """
+    tables = existing_tables(conn)
+    created = [table for table in TABLES if table not in tables]
+
+    for table in created:
+        conn.execute(TABLES[table])
+    conn.execute(ROW_COUNTS_DDL)
+    conn.commit()
+
+    return created
+
+def create_schema(conn, indexes=True):
+    """
+    Create missing tables, then (unless indexes=False) missing indexes
+
+    Bulk loads can pass indexes=False and call migrate() once the rows are in.
+
+    Returns:
+        tuple: (tables created, index names created)
+    """
+    tables_created = create_tables(conn)
+    indexes_created = migrate(conn) if indexes else []
+    return tables_created, indexes_created
+
+def migrate(conn, dry_run=False):
+    """
+    Add missing indexes to an existing database
+
+    Returns:
+        list: Names of the indexes created (or that would be, with dry_run)
+    """
+    missing = missing_indexes(conn)
+    if not dry_run:
+        create_indexes(conn, missing)
+    return [index_name for index_name, _, _ in missing]
+
+def show_row_counts(conn, verify=False, repair=False):
+    """
+    Log the tracked row counts, optionally reconciling them with COUNT(*)
+
+    Returns:
+        int: Exit code (1 if verify found a mismatch that wasn't repaired)
+    """
+    tables = [table for table in TABLES if table in existing_tables(conn)]
+
+    if verify or repair:
+        mismatches = verify_row_counts(conn, tables, repair=repair)
+        for table, tracked, actual in mismatches:
+            tracked = 'untracked' if tracked is None else f"{tracked:,}"
+            action = "repaired" if repair else "mismatch"
+            logger.warning(f"{table}: tracked {tracked}, actual {actual:,} ({action})")
+        if not mismatches:
+            logger.info("Tracked row counts match COUNT(*)")
+        if mismatches and not repair:
+            return 1
+
+    for table, count in read_row_counts(conn, tables).items():
+        logger.info(f"{table}: {count:,}")
+
+    return 0
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or migrate the retail POS schema")
+    parser.add_argument('command', choices=['create', 'migrate', 'counts'])
+    parser.add_argument('--database', default=get_setting('DATABASE_PATH'),
+                        help="Database file (default: configured DATABASE_PATH)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="migrate: list missing indexes without creating them")
+    parser.add_argument('--verify', action='store_true',
+                        help="counts: compare tracked row counts with COUNT(*)")
+    parser.add_argument('--repair', action='store_true',
+                        help="counts: overwrite wrong tracked row counts")
+    args = parser.parse_args(argv)
+
+    if args.command != 'create' and not os.path.exists(args.database):
+        logger.error(f"{args.database} does not exist. Use 'create' first.")
+        return 1
+
+    conn = open_db_connection(args.database)
+    try:
+        if args.command == 'counts':
+            return show_row_counts(conn, verify=args.verify, repair=args.repair)
+
+        if args.command == 'create':
+            tables, indexes = create_schema(conn)
+            logger.info(f"Tables created: {', '.join(tables) or 'none'}")
+        else:
+            indexes = migrate(conn, dry_run=args.dry_run)
+
+        action = "Missing indexes" if args.dry_run else "Indexes created"
+        logger.info(f"{action}: {', '.join(indexes) or 'none'}")
+    finally:
+        conn.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
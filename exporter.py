@@ -0,0 +1,306 @@
+"""
+Columnar Export
+Streams the database to CSV, and to Parquet when pyarrow is installed, so
+consumers can download tables instead of the whole retail_pos.db
+
+Every table is read from one snapshot with fetchmany() in chunks of
+EXPORT_CHUNK_SIZE rows (SQLite steps its cursor lazily, so memory stays
+flat however big the table is). Each format gets its own tree, and
+TRANSACTION_HEADER and TRANSACTION_LINE are partitioned by the month of
+the header's Time_Stamp. Their rows are read month by month (SQLite
+sorts them, spilling to temp files rather than memory), so only one
+month's files are open at a time:
+
+    exports/csv/TRANSACTION_LINE/month=2025-03/part-000000000001-000000250000.csv
+    exports/parquet/CATEGORY/CATEGORY.parquet
+
+Those two tables are append-only, so --incremental exports only the rows
+added since the watermark (last exported rowid) in export_state.json, as
+new part files. The other tables are small (and PRODUCT's SOH changes
+every run), so they are always exported in full.
+
+Usage:
+    python exporter.py                       # Full export to exports/
+    python exporter.py --incremental         # Only rows added since the last export
+    python exporter.py --tables PRODUCT TRANSACTION_LINE --no-parquet
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from config import get_setting
+from utils import setup_logger, open_db_connection
+from db_schema import TABLES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+HAS_PYARROW = pa is not None
+
+# Setup logger
+logger = setup_logger('Exporter')
+
+EXPORT_DIR = 'exports'
+EXPORT_CHUNK_SIZE = 10000
+
+# Watermarks and last export times, kept in the export directory
+STATE_FILE = 'export_state.json'
+
+# Append-only tables split by month: table -> (join, Time_Stamp column)
+PARTITIONED_TABLES = {
+    'TRANSACTION_HEADER': ('', 't.Time_Stamp'),
+    'TRANSACTION_LINE': ('JOIN TRANSACTION_HEADER h ON h.Transaction_ID = t.Transaction_ID', 'h.Time_Stamp'),
+}
+
+# ============================================
+# WRITERS
+# ============================================
+
+class CsvPart:
+    """One CSV file, rows written as they arrive"""
+
+    def __init__(self, path, columns, compress=False):
+        if compress:
+            self.file = gzip.open(path + '.gz', 'wt', newline='', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class ParquetPart:
+    """One Parquet file, a row group per EXPORT_CHUNK_SIZE buffered rows"""
+
+    def __init__(self, path, schema, chunk_size):
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.writer = pq.ParquetWriter(path, schema, compression='zstd')
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            columns = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*self.buffer), self.schema)
+            ]
+            self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+            self.buffer = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+def arrow_type(declared_type):
+    """Arrow type for a column's declared SQLite type (by affinity)"""
+    declared_type = declared_type.upper()
+    if 'INT' in declared_type:
+        return pa.int64()
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    return pa.string()
+
+# ============================================
+# EXPORT
+# ============================================
+
+def load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(output_dir, state):
+    """Write the state file atomically (a crash never leaves half a file)"""
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def export_table(conn, table, output_dir, since=0, parquet=HAS_PYARROW, compress=False, chunk_size=None):
+    """
+    Stream one table's rows with rowid > since to CSV (and Parquet)
+
+    Args:
+        conn: Connection holding the read snapshot
+        since: Watermark; 0 exports the whole table
+
+    Returns:
+        tuple: (rows exported, new watermark, files written)
+    """
+    if chunk_size is None:
+        chunk_size = EXPORT_CHUNK_SIZE
+
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    columns = [row[1] for row in info]
+    schema = pa.schema([(row[1], arrow_type(row[2])) for row in info]) if parquet else None
+    watermark = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0]
+
+    # A full export replaces the table's files
+    if not since:
+        for file_format in ('csv', 'parquet'):
+            table_dir = os.path.join(output_dir, file_format, table)
+            if os.path.isdir(table_dir):
+                shutil.rmtree(table_dir)
+
+    partition = PARTITIONED_TABLES.get(table)
+    join, month = partition if partition else ('', "''")
+    order = f"substr({month}, 1, 7), t.rowid" if partition else "t.rowid"
+    select = ', '.join(f't.{column}' for column in columns)
+    cursor = conn.execute(
+        f"SELECT {select}, substr({month}, 1, 7) FROM {table} t {join} "
+        f"WHERE t.rowid > ? AND t.rowid <= ? ORDER BY {order}",
+        (since, watermark)
+    )
+
+    # Rows arrive a month at a time: each month's files are closed before
+    # the next month's are opened
+    parts = []
+    key = None
+    files = 0
+    count = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            count += len(rows)
+
+            start = 0
+            while start < len(rows):
+                if not parts or rows[start][-1] != key:
+                    close_parts(parts)
+                    key = rows[start][-1]
+                    parts = open_parts(output_dir, table, key, partition is not None,
+                                       since, watermark, columns, schema, compress, chunk_size)
+                    files += len(parts)
+                end = start
+                while end < len(rows) and rows[end][-1] == key:
+                    end += 1
+                group = [row[:-1] for row in rows[start:end]]
+                for part in parts:
+                    part.write(group)
+                start = end
+    finally:
+        close_parts(parts)
+
+    return count, watermark, files
+
+def part_path(output_dir, file_format, table, month, partitioned, since, watermark):
+    """Path of one partition's file (created directories included)"""
+    directory = os.path.join(output_dir, file_format, table)
+    if partitioned:
+        directory = os.path.join(directory, f"month={month or 'unknown'}")
+        name = f"part-{since + 1:012d}-{watermark:012d}.{file_format}"
+    else:
+        name = f"{table}.{file_format}"
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+def open_parts(output_dir, table, month, partitioned, since, watermark, columns, schema, compress, chunk_size):
+    """Writers for one partition: CSV, plus Parquet when a schema is given"""
+    location = (table, month, partitioned, since, watermark)
+    parts = [CsvPart(part_path(output_dir, 'csv', *location), columns, compress)]
+    if schema is not None:
+        parts.append(ParquetPart(part_path(output_dir, 'parquet', *location), schema, chunk_size))
+    return parts
+
+def close_parts(parts):
+    """Close one partition's writers"""
+    for part in parts:
+        part.close()
+
+def run_export(database_path, output_dir, tables=None, incremental=False,
+               parquet=True, compress=False, chunk_size=None):
+    """
+    Export tables from one consistent snapshot of the database
+
+    Returns:
+        dict: table -> rows exported
+    """
+    if parquet and not HAS_PYARROW:
+        logger.info("pyarrow not installed - writing CSV only")
+        parquet = False
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+    exported = {}
+
+    # Read-only, and one read transaction: every table comes from the same snapshot
+    conn = open_db_connection(database_path, profile='readonly')
+    try:
+        conn.execute('BEGIN')
+        for table in tables or list(TABLES):
+            since = 0
+            if incremental and table in PARTITIONED_TABLES:
+                since = state.get(table, {}).get('watermark', 0)
+
+            start = time.perf_counter()
+            count, watermark, files = export_table(
+                conn, table, output_dir, since, parquet, compress, chunk_size
+            )
+            elapsed = time.perf_counter() - start
+
+            state[table] = {'watermark': watermark, 'exported_at': datetime.now().isoformat(timespec='seconds')}
+            save_state(output_dir, state)
+            exported[table] = count
+
+            rate = count / elapsed if elapsed > 0 else 0
+            mode = f"rows {since + 1:,}-{watermark:,}" if since else "full"
+            logger.info(f"{table:<20} {count:>10,} rows ({mode}) {files:>4} files {elapsed:7.2f}s {rate:>12,.0f} rows/sec")
+    finally:
+        conn.close()
+
+    return exported
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export tables to CSV/Parquet")
+    parser.add_argument('--database', default=get_setting('DATABASE_PATH'),
+                        help="Database file (default: configured DATABASE_PATH)")
+    parser.add_argument('--output', default=EXPORT_DIR, help="Export directory")
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), metavar='TABLE',
+                        help="Tables to export (default: all)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Transaction tables: only rows added since the last export")
+    parser.add_argument('--no-parquet', action='store_true', help="CSV only")
+    parser.add_argument('--gzip', action='store_true', help="Compress the CSV files")
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                        help="Rows fetched (and per Parquet row group) at a time")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        logger.error(f"{args.database} does not exist")
+        return 1
+
+    exported = run_export(
+        args.database, args.output, args.tables, incremental=args.incremental,
+        parquet=not args.no_parquet, compress=args.gzip, chunk_size=args.chunk_size
+    )
+    logger.info(f"Exported {sum(exported.values()):,} rows to {args.output}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,9 +12,12 @@ Commits database changes and logs after each generation run
 Creates clean, meaningful commit messages for GitHub history
 """
 
+import glob
+import shlex
 import subprocess
 import os
 from datetime import datetime
+from config import get_setting
 from utils import setup_logger, count_records
 
 # Setup logger
@@ -49,7 +52,7 @@ def has_changes():
     return success and len(output.strip()) > 0
 
 def get_database_stats():
-    """Get current database statistics"""
+    """Get current database statistics (row counts tracked in ROW_COUNTS)"""
     tables = [
         'CATEGORY', 'SUPPLIER', 'STAFF', 'MACHINE', 
         'PAYMENT_METHOD', 'TRANSACTION_TYPE', 'PRODUCT_GROUP',
@@ -109,10 +112,36 @@ Total Records: {total_records:,}
     
     return message
 
+def tracked_paths():
+    """
+    Existing paths matching GIT_TRACKED_FILES
+
+    The database is only committed whole when RECORD_CHANGESETS is off;
+    otherwise its changes go in as changesets under CHANGESET_DIR.
+    """
+    patterns = list(get_setting('GIT_TRACKED_FILES'))
+    if not get_setting('RECORD_CHANGESETS'):
+        patterns.append(get_setting('DATABASE_PATH'))
+    
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)))
+    return paths
+
+def has_staged_changes():
+    """Check if anything is staged for commit"""
+    success, _, _ = run_git_command("git diff --staged --quiet")
+    return not success
+
 def git_add_all():
-    """Stage all changes"""
+    """Stage the generated files (see tracked_paths())"""
     logger.info("Staging changes...")
-    success, output, error = run_git_command("git add .")
+    paths = tracked_paths()
+    if not paths:
+        logger.info("No generated files to stage")
+        return True
+    
+    success, output, error = run_git_command("git add -- " + " ".join(shlex.quote(path) for path in paths))
     
     if success:
         logger.info("✓ Changes staged successfully")
@@ -190,6 +219,10 @@ def auto_commit_and_push(script_name=None, push_to_github=True):
     if not git_add_all():
         return False
     
+    if not has_staged_changes():
+        logger.info("No changes to commit")
+        return True
+    
     # Commit
     if not git_commit(commit_msg):
         return False
@@ -0,0 +1,115 @@
+"""
+Vectorized Line Engine
+Generates TRANSACTION_LINE columns a whole batch at a time with NumPy
+Same distributions as build_transaction_line() in 10_generate_transaction_lines:
+quantity buckets, markup, round_price endings, discount mask and totals,
+with quantities clamped by product SOH
+
+NumPy is optional. HAS_NUMPY is False when it isn't installed, and callers
+fall back to the scalar generator
+"""
+
+import importlib
+from config import get_setting
+from utils import PRICE_ENDINGS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Quantity and markup settings come from the scalar generator
+_lines = importlib.import_module('10_generate_transaction_lines')
+
+# ============================================
+# PRODUCT COLUMNS
+# ============================================
+
+class ProductColumns:
+    """Product rows split into column arrays (load once, draw many times)"""
+
+    def __init__(self, products):
+        """
+        Args:
+            products: (plu, description, avg_cost, soh) rows
+        """
+        self.plus = [product[0] for product in products]
+        self.avg_costs = np.array([product[2] for product in products], dtype=np.float64)
+        self.sohs = np.array([product[3] for product in products], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.plus)
+
+# ============================================
+# COLUMN GENERATION
+# ============================================
+
+def generate_quantities(rng, n):
+    """Quantities drawn from the QUANTITY_WEIGHTS buckets"""
+    weights = np.array(_lines.QUANTITY_WEIGHTS, dtype=np.float64)
+    bucket = rng.choice(len(weights), size=n, p=weights / weights.sum())
+
+    low = np.array([r[0] for r in _lines.QUANTITY_RANGES])[bucket]
+    high = np.array([r[1] for r in _lines.QUANTITY_RANGES])[bucket]
+    return rng.integers(low, high + 1)
+
+def clamp_quantities(quantities, sohs):
+    """Cap quantities at stock on hand; out-of-stock lines sell 1 (backorder)"""
+    quantities = np.where((sohs > 0) & (quantities > sohs), sohs, quantities)
+    return np.where(sohs <= 0, 1, quantities)
+
+def generate_prices(rng, avg_costs):
+    """Cost times a uniform markup, whole dollars plus a round_price ending"""
+    markups = rng.uniform(*_lines.MARKUP_RANGE, size=len(avg_costs))
+    endings = np.array(PRICE_ENDINGS)[rng.integers(len(PRICE_ENDINGS), size=len(avg_costs))]
+    return np.trunc(avg_costs * markups) + endings
+
+def generate_discounts(rng, n):
+    """Discount percent per line (0.0 unless the DISCOUNT_PROBABILITY draw hits)"""
+    discounted = rng.random(n) < get_setting('DISCOUNT_PROBABILITY')
+    percentages = get_setting('DISCOUNT_PERCENTAGES')
+    percents = np.array(percentages)[rng.integers(len(percentages), size=n)]
+    return np.where(discounted, percents, 0.0)
+
+def calculate_totals(prices, quantities, discounts):
+    """Vectorized calculate_total_paid()"""
+    subtotals = prices * quantities
+    discount_amounts = np.round(subtotals * (discounts / 100), 2)
+    return np.round(subtotals - discount_amounts, 2)
+
+# ============================================
+# LINE GENERATION
+# ============================================
+
+def build_lines(transaction_ids, products, rng):
+    """
+    Build one line per entry of transaction_ids, each for a random product
+
+    Args:
+        transaction_ids: Header reference for each line
+        products: ProductColumns
+        rng: numpy.random.Generator
+
+    Returns:
+        list: (transaction_id, plu, qty, original_price, total_paid,
+              discount_percent) tuples, ready for executemany()
+    """
+    n = len(transaction_ids)
+    picks = rng.integers(len(products), size=n)
+
+    quantities = clamp_quantities(generate_quantities(rng, n), products.sohs[picks])
+    prices = generate_prices(rng, products.avg_costs[picks])
+    discounts = generate_discounts(rng, n)
+    totals = calculate_totals(prices, quantities, discounts)
+
+    plus = products.plus
+    return list(zip(
+        np.asarray(transaction_ids).tolist(),
+        [plus[i] for i in picks.tolist()],
+        quantities.tolist(),
+        prices.tolist(),
+        totals.tolist(),
+        discounts.tolist()
+    ))
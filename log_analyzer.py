@@ -0,0 +1,490 @@
+"""
+Log Analyzer
+Turns the generation logs into per-stage throughput and failure metrics
+
+Log files (plain or .gz, text or JSON lines) are streamed line by line, so
+archives of any size are read in bounded memory: only the stages of the
+run being read are held, and each stage run is written out as soon as it
+is complete. Every master runner stage run becomes one row with its
+duration, status, the generation summary counts of the tables it wrote
+and rows/sec. Generator runs outside the master runner (a single script,
+backfill) become rows named after their logger.
+
+Durations come from the runner's "(1.23s)" when it logged one ('logged').
+Older logs only have whole-second stamps, so a stage is timed from its
+generator's "Timestamp:" line to the next stage's ('estimated', includes
+process start-up), or failing that from the whole seconds ('coarse').
+
+Usage:
+    python log_analyzer.py                                # Per-stage summary of logs/
+    python log_analyzer.py logs --csv stages.csv          # One row per stage run
+    python log_analyzer.py archive --sqlite metrics.db --daily
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from config import get_setting
+from master_runner import STAGE_TABLES, STATUS_SUCCESS, STATUS_FAILED, STATUS_EXHAUSTED
+
+RUNNER_LOGGER = 'MasterRunner'
+
+# Text record: "2026-01-15 01:05:11 - CategoryGenerator - INFO - message"
+RECORD_PATTERN = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - (\S+) - ([A-Z]+) - (.*)$')
+
+# Sub-second time logged by the runner and each generator when they start
+PRECISE_TIME_PATTERN = re.compile(r'^Timestamp: (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?)$')
+
+RUNNING_PATTERN = re.compile(r'^Running: (.+) \((\S+\.py)\)$')
+
+# Runner messages that end a stage, by description (older logs have no elapsed time)
+STAGE_END_PATTERNS = [
+    (re.compile(r'^✓ (?P<stage>.+) completed successfully(?: \((?P<elapsed>[\d.]+)s\))?$'), STATUS_SUCCESS),
+    (re.compile(r'^○ (?P<stage>.+) keyspace exhausted - \d+ records created \((?P<elapsed>[\d.]+)s\)$'), STATUS_EXHAUSTED),
+    (re.compile(r'^(?P<stage>.+) finished with \d+ failed records \((?P<elapsed>[\d.]+)s\)$'), STATUS_FAILED),
+    (re.compile(r'^Error running (?P<stage>.+?): '), STATUS_FAILED),
+    (re.compile(r'^Script (?P<stage>.+) failed\. Continuing'), STATUS_FAILED),
+]
+
+TIMED_OUT_PATTERN = re.compile(r'^(\S+\.py) timed out after ')
+
+# Lines of a text generation summary (see utils.log_generation_summary)
+SUMMARY_FIELDS = {
+    'Batch Size: ': 'batch_size',
+    'Successfully Generated: ': 'success',
+    'Failed: ': 'failed',
+}
+
+# Table -> script that writes it
+TABLE_WRITERS = {
+    table: script
+    for script, (tables, _) in STAGE_TABLES.items()
+    for table in tables
+}
+
+STAGE_FIELDS = [
+    'run_started', 'stage', 'script', 'started', 'finished', 'duration_s', 'timing',
+    'status', 'batch_size', 'generated', 'failed', 'success_rate', 'rows_per_sec', 'log_file'
+]
+
+AGGREGATE_FIELDS = [
+    'day', 'stage', 'runs', 'failed_runs', 'duration_s', 'batch_size',
+    'generated', 'failed', 'success_rate', 'rows_per_sec'
+]
+
+SQLITE_TABLES = {'runs': 'STAGE_METRICS', 'daily': 'DAILY_STAGE_METRICS'}
+
+# Rows per executemany() when writing to SQLite
+SQLITE_BATCH_SIZE = 1000
+
+# ============================================
+# READING LOGS
+# ============================================
+
+def find_log_files(paths):
+    """Log files under the given files/directories, directories in name (= date) order"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.log', '.log.gz')):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+def read_lines(path):
+    """Stream a log file's lines, decompressing .gz files on the fly"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+def parse_time(text):
+    return datetime.fromisoformat(text)
+
+# ============================================
+# STAGE METRICS
+# ============================================
+
+class StageMetricsParser:
+    """
+    Turns a stream of log records into stage-run rows
+
+    feed() returns the rows that became complete with each line; close()
+    returns whatever is left at the end of the input.
+    """
+
+    def __init__(self):
+        self.source = None
+        self.in_echo = False
+        self.summaries = {}        # logger -> partial text summary
+        self.logger_started = {}   # logger -> start time, for runs outside the runner
+        self._reset_run(None)
+
+    def _reset_run(self, started):
+        self.run_started = started
+        self.open_stages = {}      # script -> row
+        self.scripts = {}          # description -> script
+        self.untimed = []          # finished rows waiting for the next "Timestamp:" line
+        self.timed_out = set()
+
+    # ---------- input ----------
+
+    def feed(self, line, source):
+        """Process one log line from file source"""
+        if source != self.source:
+            self.source = source
+            self.in_echo = False
+
+        if line.startswith('{'):
+            return self._feed_json(line)
+
+        # A failed subprocess's output echoed inside an ERROR record, up to a blank line
+        if self.in_echo:
+            self.in_echo = bool(line.strip())
+            return []
+
+        match = RECORD_PATTERN.match(line)
+        if not match:
+            return []
+        timestamp, logger, _, message = match.groups()
+
+        if message.startswith('Error output: '):
+            self.in_echo = True
+        return self._handle(timestamp, logger, message)
+
+    def _feed_json(self, line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return []
+        timestamp = record.get('time', '').replace('T', ' ')
+        logger = record.get('logger', '')
+
+        if record.get('event') == 'generation_summary':
+            return self._add_summary(timestamp, logger, {
+                'table': record.get('table'),
+                'batch_size': record.get('batch_size', 0),
+                'success': record.get('success', 0),
+                'failed': record.get('failed', 0),
+            })
+        return self._handle(timestamp, logger, record.get('message', ''))
+
+    def close(self):
+        """Rows still open at the end of the input"""
+        return self._end_run()
+
+    # ---------- records ----------
+
+    def _handle(self, timestamp, logger, message):
+        if logger == RUNNER_LOGGER:
+            return self._handle_runner(timestamp, message)
+
+        rows = []
+        precise = PRECISE_TIME_PATTERN.match(message)
+        if precise:
+            rows = self._stage_mark(precise.group(1))
+            self.logger_started[logger] = precise.group(1)
+        elif message.startswith('Generation Summary for '):
+            self.summaries[logger] = {'table': message[len('Generation Summary for '):]}
+        elif logger in self.summaries:
+            summary = self.summaries[logger]
+            for prefix, field in SUMMARY_FIELDS.items():
+                if message.startswith(prefix):
+                    summary[field] = int(message[len(prefix):])
+                    break
+            # The failed count is the last one the block needs
+            if 'failed' in summary:
+                del self.summaries[logger]
+                rows = self._add_summary(timestamp, logger, summary)
+        elif message.endswith(' STARTED'):
+            self.logger_started[logger] = timestamp
+
+        return rows
+
+    def _handle_runner(self, timestamp, message):
+        if message == 'MASTER RUNNER STARTED':
+            rows = self._end_run()
+            self._reset_run(timestamp)
+            return rows
+        if message == 'MASTER RUNNER SUMMARY':
+            rows = self._end_run()
+            self._reset_run(None)
+            return rows
+
+        precise = PRECISE_TIME_PATTERN.match(message)
+        if precise:
+            if self.run_started and not self.open_stages:
+                self.run_started = precise.group(1)
+            return []
+
+        running = RUNNING_PATTERN.match(message)
+        if running:
+            description, script = running.groups()
+            self.scripts[description] = script
+            self.open_stages[script] = self._new_row(description, script, timestamp)
+            return []
+
+        timed_out = TIMED_OUT_PATTERN.match(message)
+        if timed_out:
+            self.timed_out.add(timed_out.group(1))
+            return []
+
+        for pattern, status in STAGE_END_PATTERNS:
+            match = pattern.match(message)
+            if match:
+                script = self.scripts.get(match.group('stage'))
+                if script in self.open_stages:
+                    return self._finish(self.open_stages.pop(script), timestamp, status,
+                                        match.groupdict().get('elapsed'))
+                return []
+        return []
+
+    def _new_row(self, stage, script, started):
+        row = dict.fromkeys(STAGE_FIELDS)
+        row.update({
+            'run_started': self.run_started, 'stage': stage, 'script': script,
+            'started': started, 'batch_size': 0, 'generated': 0, 'failed': 0,
+            'log_file': self.source, 'precise_start': None
+        })
+        return row
+
+    def _stage_mark(self, precise_time):
+        """A generator's start: times the previous stage, and starts the open one"""
+        rows = []
+        for row in self.untimed:
+            duration = (parse_time(precise_time) - parse_time(row['precise_start'])).total_seconds()
+            rows.append(self._complete(row, duration, 'estimated'))
+        self.untimed = []
+
+        waiting = [row for row in self.open_stages.values() if row['precise_start'] is None]
+        if len(waiting) == 1:
+            waiting[0]['precise_start'] = precise_time
+        return rows
+
+    def _add_summary(self, timestamp, logger, summary):
+        row = self._stage_for(summary['table'])
+        standalone = row is None
+        if standalone:
+            row = self._new_row(logger, None, self.logger_started.pop(logger, timestamp))
+
+        row['batch_size'] += summary.get('batch_size', 0)
+        row['generated'] += summary.get('success', 0)
+        row['failed'] += summary.get('failed', 0)
+
+        if standalone:
+            status = STATUS_FAILED if row['failed'] else STATUS_SUCCESS
+            return self._finish(row, timestamp, status, None)
+        return []
+
+    def _stage_for(self, table):
+        """Open stage a generation summary belongs to"""
+        writer = TABLE_WRITERS.get(table)
+        if writer in self.open_stages:
+            return self.open_stages[writer]
+        if len(self.open_stages) == 1:
+            return next(iter(self.open_stages.values()))
+        return None
+
+    def _finish(self, row, timestamp, status, elapsed):
+        row['finished'] = timestamp
+        row['status'] = STATUS_FAILED if row['script'] in self.timed_out else status
+
+        if elapsed is not None:
+            return [self._complete(row, float(elapsed), 'logged')]
+        if row['precise_start'] and self.run_started:
+            self.untimed.append(row)
+            return []
+        return [self._complete_coarse(row)]
+
+    def _complete_coarse(self, row):
+        start = row['precise_start'] or row['started']
+        duration = (parse_time(row['finished']) - parse_time(start[:19])).total_seconds()
+        return self._complete(row, duration, 'coarse')
+
+    def _complete(self, row, duration, timing):
+        del row['precise_start']
+        row['duration_s'] = round(max(duration, 0.0), 3)
+        row['timing'] = timing
+        if row['batch_size']:
+            row['success_rate'] = round(row['generated'] / row['batch_size'] * 100, 1)
+        if row['duration_s'] > 0:
+            row['rows_per_sec'] = round(row['generated'] / row['duration_s'], 1)
+        return row
+
+    def _end_run(self):
+        rows = [self._complete_coarse(row) for row in self.untimed]
+        self.untimed = []
+        for row in self.open_stages.values():
+            row['finished'] = row['finished'] or row['started']
+            row['status'] = 'unfinished'
+            rows.append(self._complete_coarse(row))
+        self.open_stages = {}
+        return rows
+
+def stage_runs(paths):
+    """
+    Every stage run in the given log files/directories, in log order
+
+    Yields:
+        dict with the STAGE_FIELDS keys
+    """
+    parser = StageMetricsParser()
+    for path in find_log_files(paths):
+        for line in read_lines(path):
+            yield from parser.feed(line, path)
+    yield from parser.close()
+
+# ============================================
+# AGGREGATION
+# ============================================
+
+class StageTotals:
+    """Running totals for one stage (and day)"""
+
+    def __init__(self):
+        self.runs = self.failed_runs = 0
+        self.duration = 0.0
+        self.timed_rows = 0
+        self.batch_size = self.generated = self.failed = 0
+
+    def add(self, row):
+        self.runs += 1
+        self.failed_runs += row['status'] != STATUS_SUCCESS and row['status'] != STATUS_EXHAUSTED
+        self.batch_size += row['batch_size']
+        self.generated += row['generated']
+        self.failed += row['failed']
+        # Rows/sec only counts runs that had a measurable duration
+        if row['duration_s']:
+            self.duration += row['duration_s']
+            self.timed_rows += row['generated']
+
+    def as_row(self, day, stage):
+        return {
+            'day': day, 'stage': stage, 'runs': self.runs, 'failed_runs': self.failed_runs,
+            'duration_s': round(self.duration, 3), 'batch_size': self.batch_size,
+            'generated': self.generated, 'failed': self.failed,
+            'success_rate': round(self.generated / self.batch_size * 100, 1) if self.batch_size else None,
+            'rows_per_sec': round(self.timed_rows / self.duration, 1) if self.duration else None,
+        }
+
+def daily_totals(rows):
+    """
+    Per-day, per-stage totals of stage runs in time order
+
+    A day's totals are yielded once a later day starts, so only one day
+    is held at a time.
+    """
+    day, totals = None, {}
+    for row in rows:
+        row_day = row['started'][:10]
+        if row_day != day:
+            for stage, stage_totals in totals.items():
+                yield stage_totals.as_row(day, stage)
+            day, totals = row_day, {}
+        totals.setdefault(row['stage'], StageTotals()).add(row)
+
+    for stage, stage_totals in totals.items():
+        yield stage_totals.as_row(day, stage)
+
+def with_totals(rows, totals):
+    """Pass rows through, adding each to its stage's overall totals"""
+    for row in rows:
+        totals.setdefault(row['stage'], StageTotals()).add(row)
+        yield row
+
+# ============================================
+# OUTPUT
+# ============================================
+
+def write_csv(rows, fields, path):
+    """Write rows to a CSV file ('-' for stdout); returns the row count"""
+    f = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+def write_sqlite(rows, fields, path, table):
+    """(Re)create table in an SQLite file and fill it; returns the row count"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.execute(f'CREATE TABLE {table} ({", ".join(fields)})')
+        insert = f'INSERT INTO {table} VALUES ({", ".join("?" * len(fields))})'
+
+        count, batch = 0, []
+        for row in rows:
+            batch.append([row[field] for field in fields])
+            if len(batch) >= SQLITE_BATCH_SIZE:
+                conn.executemany(insert, batch)
+                count += len(batch)
+                batch = []
+        conn.executemany(insert, batch)
+        conn.commit()
+        return count + len(batch)
+    finally:
+        conn.close()
+
+def print_totals(totals, out):
+    print(f"{'stage':<24} {'runs':>6} {'failed':>7} {'success':>8} {'time':>10} {'rows/sec':>10}", file=out)
+    for stage, stage_totals in totals.items():
+        row = stage_totals.as_row(None, stage)
+        rate = f"{row['success_rate']:.1f}%" if row['success_rate'] is not None else '-'
+        speed = f"{row['rows_per_sec']:,.0f}" if row['rows_per_sec'] is not None else '-'
+        print(f"{stage:<24} {row['runs']:>6,} {row['failed_runs']:>7,} {rate:>8} "
+              f"{row['duration_s']:>9.1f}s {speed:>10}", file=out)
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage throughput and failure metrics from the logs")
+    parser.add_argument('paths', nargs='*',
+                        help="Log files or directories (default: the configured LOG_DIR)")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--csv', metavar='FILE', help="Write the rows as CSV ('-' for stdout)")
+    output.add_argument('--sqlite', metavar='FILE',
+                        help=f"Write the rows to an SQLite table ({', '.join(SQLITE_TABLES.values())})")
+    parser.add_argument('--daily', action='store_true',
+                        help="One row per stage and day instead of one per stage run")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [get_setting('LOG_DIR')]
+    totals = {}
+    rows = with_totals(stage_runs(paths), totals)
+    fields = STAGE_FIELDS
+    if args.daily:
+        rows, fields = daily_totals(rows), AGGREGATE_FIELDS
+
+    # The summary goes to stderr when the rows are on stdout
+    out = sys.stderr if args.csv == '-' else sys.stdout
+    if args.csv:
+        count = write_csv(rows, fields, args.csv)
+        print(f"Wrote {count:,} rows to {args.csv}", file=out)
+    elif args.sqlite:
+        table = SQLITE_TABLES['daily' if args.daily else 'runs']
+        count = write_sqlite(rows, fields, args.sqlite, table)
+        print(f"Wrote {count:,} rows to {args.sqlite} ({table})", file=out)
+    else:
+        for _ in rows:
+            pass
+
+    print_totals(totals, out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,12 +10,42 @@ Created on Sun Feb  2 00:45:22 2024
 Master Runner Script
 Executes all data generation scripts in correct dependency order
 Useful for initial population or bulk regeneration
+
+Stages run in-process: each generator's generate_* function is imported
+and called directly. Stages whose upstream tables are complete run
+concurrently on a thread pool; their inserts are serialized by the
+write lock in utils. Each stage draws from its own seeded stream (see
+seeding.py), so MASTER_SEED reproduces a run whatever order stages finish in
+
+A stage that runs past STAGE_TIMEOUT is cancelled: its cancel event is
+set, which the generators check once per record and the DB helpers check
+before every query, and its SQLite connection is interrupted in case it
+is inside a long query. Either way its open transaction is rolled back
 """
 
-import subprocess
+import argparse
+import importlib
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from utils import setup_logger
+from config import get_setting
+from utils import (
+    setup_logger,
+    clear_samplers,
+    clear_unique_indexes,
+    get_db_connection,
+    count_records,
+    clear_stage_counters,
+    get_stage_counters,
+    apply_setting_overrides,
+    set_cancel_event,
+    StageCancelled
+)
+from reference_cache import clear_reference_cache
+from changesets import capture_marks, write_changeset
+from seeding import make_stream, use_stream
 
 # Setup logger
 logger = setup_logger('MasterRunner')
@@ -26,98 +56,263 @@ logger = setup_logger('MasterRunner')
 
 SCRIPT_ORDER = [
     # Phase 1: Reference tables (no dependencies)
-    ('01_generate_categories.py', 'Categories'),
-    ('02_generate_suppliers.py', 'Suppliers'),
-    ('03_generate_staff.py', 'Staff'),
-    ('04_generate_machines.py', 'Machines'),
-    ('05_generate_payment_methods.py', 'Payment Methods'),
-    ('06_generate_transaction_types.py', 'Transaction Types'),
+    ('01_generate_categories.py', 'Categories', 'generate_categories'),
+    ('02_generate_suppliers.py', 'Suppliers', 'generate_suppliers'),
+    ('03_generate_staff.py', 'Staff', 'generate_staff'),
+    ('04_generate_machines.py', 'Machines', 'generate_machines'),
+    ('05_generate_payment_methods.py', 'Payment Methods', 'generate_payment_methods'),
+    ('06_generate_transaction_types.py', 'Transaction Types', 'generate_transaction_types'),
     
     # Phase 2: Dependent master tables
-    ('07_generate_product_groups.py', 'Product Groups'),
-    ('08_generate_products.py', 'Products'),
+    ('07_generate_product_groups.py', 'Product Groups', 'generate_product_groups'),
+    ('08_generate_products.py', 'Products', 'generate_products'),
     
-    # Phase 3: Transaction tables
-    ('09_generate_transaction_headers.py', 'Transaction Headers'),
-    ('10_generate_transaction_lines.py', 'Transaction Lines'),
+    # Phase 3: Transaction tables (headers are written with their lines as baskets;
+    # 09_generate_transaction_headers.py only builds the header rows)
+    ('10_generate_transaction_lines.py', 'Transaction Baskets', 'generate_transaction_lines'),
 ]
 
+# Tables each stage writes, and the tables it reads foreign keys from.
+# A stage depends on every stage that writes one of the tables it reads.
+STAGE_TABLES = {
+    '01_generate_categories.py': (['CATEGORY'], []),
+    '02_generate_suppliers.py': (['SUPPLIER'], []),
+    '03_generate_staff.py': (['STAFF'], []),
+    '04_generate_machines.py': (['MACHINE'], []),
+    '05_generate_payment_methods.py': (['PAYMENT_METHOD'], []),
+    '06_generate_transaction_types.py': (['TRANSACTION_TYPE'], []),
+    '07_generate_product_groups.py': (['PRODUCT_GROUP'], ['CATEGORY']),
+    '08_generate_products.py': (['PRODUCT'], ['PRODUCT_GROUP', 'SUPPLIER']),
+    '10_generate_transaction_lines.py': (
+        ['TRANSACTION_HEADER', 'TRANSACTION_LINE'],
+        ['STAFF', 'MACHINE', 'PAYMENT_METHOD', 'TRANSACTION_TYPE', 'PRODUCT']
+    ),
+}
+
+STAGE_TIMEOUT = 300  # 5 minute timeout per stage
+
+# Stage outcomes (an exhausted keyspace is not a failure)
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+STATUS_EXHAUSTED = 'keyspace exhausted'
+
+# ============================================
+# DEPENDENCY GRAPH
+# ============================================
+
+def build_stage_graph():
+    """
+    Build the stage DAG from STAGE_TABLES
+    
+    Returns:
+        dict: script_name -> set of upstream script names
+    """
+    writers = {
+        table: script
+        for script, (tables, _) in STAGE_TABLES.items()
+        for table in tables
+    }
+    
+    graph = {}
+    for script_name, _, _ in SCRIPT_ORDER:
+        _, reads = STAGE_TABLES[script_name]
+        graph[script_name] = {writers[table] for table in reads if table in writers}
+    
+    return graph
+
+def critical_path_times(graph, timings):
+    """
+    Critical-path time of each stage: its own time plus the slowest chain
+    of upstream stages it had to wait for
+    
+    Returns:
+        dict: script_name -> seconds
+    """
+    path_times = {}
+    
+    # SCRIPT_ORDER is already a topological order of the graph
+    for script_name, _, _ in SCRIPT_ORDER:
+        upstream = [path_times[dep] for dep in graph[script_name]]
+        path_times[script_name] = timings.get(script_name, 0.0) + max(upstream, default=0.0)
+    
+    return path_times
+
 # ============================================
 # EXECUTION FUNCTIONS
 # ============================================
 
-def run_script(script_name, description):
+def load_stage(script_name, function_name):
+    """Import a generator script and return its generate_* function"""
+    module = importlib.import_module(script_name[:-len('.py')])
+    return getattr(module, function_name)
+
+def run_script(script_name, description, function_name, running):
     """
-    Run a single generation script
+    Run a single generation stage in the current thread
+    
+    Args:
+        running: Shared dict where the stage registers its start time, DB
+                 connection and cancel event so the scheduler can enforce
+                 the timeout
     
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (status, elapsed_seconds), status being STATUS_SUCCESS,
+               STATUS_FAILED or STATUS_EXHAUSTED
     """
-    logger.info("=" * 60)
     logger.info(f"Running: {description} ({script_name})")
-    logger.info("=" * 60)
+    
+    start = time.perf_counter()
+    cancel = threading.Event()
+    set_cancel_event(cancel)
+    running[script_name] = (start, get_db_connection(), cancel)
+    
+    # Let this stage see rows written by the stages it depends on,
+    # and reload the natural keys of the tables it writes
+    written, reads = STAGE_TABLES[script_name]
+    clear_samplers(reads)
+    clear_unique_indexes(written)
     
     try:
-        result = subprocess.run(
-            [sys.executable, script_name],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-        
-        # Log output
-        if result.stdout:
-            for line in result.stdout.strip().split('\n'):
-                logger.info(f"  {line}")
+        generate = load_stage(script_name, function_name)
         
-        # Check for errors
-        if result.returncode != 0:
-            logger.error(f"Script failed with exit code {result.returncode}")
-            if result.stderr:
-                logger.error(f"Error output: {result.stderr}")
-            return False
+        # Keyed on the rows already written, so each run continues the data
+        # rather than repeating the previous run's draws
+        stream = make_stream('stage', script_name, *[count_records(table) for table in written])
+        with use_stream(stream):
+            result = generate()
+        success_count, failed_count = result
         
-        logger.info(f"✓ {description} completed successfully")
-        return True
-        
-    except subprocess.TimeoutExpired:
-        logger.error(f"Script timed out after 5 minutes")
-        return False
+    except StageCancelled:
+        logger.error(f"{description} cancelled - its batch was rolled back")
+        return STATUS_FAILED, time.perf_counter() - start
     except Exception as e:
-        logger.error(f"Error running script: {e}")
-        return False
+        logger.error(f"Error running {description}: {e}")
+        return STATUS_FAILED, time.perf_counter() - start
+    finally:
+        set_cancel_event(None)
+    
+    elapsed = time.perf_counter() - start
+    
+    # Check for errors
+    if failed_count > 0:
+        logger.error(f"{description} finished with {failed_count} failed records ({elapsed:.2f}s)")
+        return STATUS_FAILED, elapsed
+    
+    # Nothing left to generate is expected once a fixed name list is used up
+    if getattr(result, 'keyspace_exhausted', False):
+        logger.info(f"○ {description} keyspace exhausted - {success_count} records created ({elapsed:.2f}s)")
+        return STATUS_EXHAUSTED, elapsed
+    
+    logger.info(f"✓ {description} completed successfully ({elapsed:.2f}s)")
+    return STATUS_SUCCESS, elapsed
 
-def run_all_scripts():
+def check_timeouts(running, timed_out):
     """
-    Run all generation scripts in order
+    Cancel stages that have run longer than STAGE_TIMEOUT
+    
+    The stage's cancel event is set, so it stops at its next record or
+    query, and its SQLite connection is interrupted, so a query already
+    running fails. Its open insert transaction is rolled back.
+    """
+    now = time.perf_counter()
+    
+    for script_name, (start, conn, cancel) in list(running.items()):
+        if script_name not in timed_out and now - start > STAGE_TIMEOUT:
+            logger.error(f"{script_name} timed out after {STAGE_TIMEOUT / 60:g} minutes")
+            timed_out.add(script_name)
+            cancel.set()
+            conn.interrupt()
+
+def run_all_scripts(max_workers=None):
+    """
+    Run all generation scripts, respecting the stage dependency graph
+    
+    Args:
+        max_workers: Stages allowed to run at once (default from config)
     
     Returns:
         dict: Summary of results
     """
+    if max_workers is None:
+        max_workers = get_setting('MAX_PARALLEL_STAGES')
+    
     logger.info("=" * 60)
     logger.info("MASTER RUNNER STARTED")
     logger.info(f"Timestamp: {datetime.now()}")
     logger.info(f"Total scripts to run: {len(SCRIPT_ORDER)}")
+    logger.info(f"Parallel stages: {max_workers}")
     logger.info("=" * 60)
     
     results = {
         'total': len(SCRIPT_ORDER),
         'successful': 0,
+        'exhausted': 0,
         'failed': 0,
-        'failed_scripts': []
+        'exhausted_scripts': [],
+        'failed_scripts': [],
+        'timings': {},
+        'critical_path': {},
+        'counters': {},
+        'wall_time': 0.0
     }
     
-    for script_name, description in SCRIPT_ORDER:
-        success = run_script(script_name, description)
-        
-        if success:
-            results['successful'] += 1
-        else:
-            results['failed'] += 1
-            results['failed_scripts'].append(description)
+    # Reference data is loaded once, on first use, and shared by all stages
+    clear_reference_cache()
+    clear_stage_counters()
+    
+    graph = build_stage_graph()
+    waiting_on = {script: set(deps) for script, deps in graph.items()}
+    stages = {script: (description, function_name) for script, description, function_name in SCRIPT_ORDER}
+    timings = {}
+    running = {}
+    timed_out = set()
+    futures = {}
+    run_start = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as pool:
+        while waiting_on or futures:
+            # Submit every stage whose upstream stages have finished
+            for script_name, _, _ in SCRIPT_ORDER:
+                if script_name in waiting_on and not waiting_on[script_name]:
+                    del waiting_on[script_name]
+                    description, function_name = stages[script_name]
+                    future = pool.submit(run_script, script_name, description, function_name, running)
+                    futures[future] = script_name
+            
+            done, _ = wait(futures, timeout=1.0, return_when=FIRST_COMPLETED)
+            check_timeouts(running, timed_out)
             
-            # Ask if should continue after failure
-            logger.warning(f"Script {description} failed. Continuing to next script...")
+            for future in done:
+                script_name = futures.pop(future)
+                running.pop(script_name, None)
+                status, elapsed = future.result()
+                timings[script_name] = elapsed
+                description = stages[script_name][0]
+                
+                if script_name in timed_out:
+                    status = STATUS_FAILED
+                
+                if status == STATUS_SUCCESS:
+                    results['successful'] += 1
+                elif status == STATUS_EXHAUSTED:
+                    results['exhausted'] += 1
+                    results['exhausted_scripts'].append(description)
+                else:
+                    results['failed'] += 1
+                    results['failed_scripts'].append(description)
+                    logger.warning(f"Script {description} failed. Continuing with remaining scripts...")
+                
+                # Downstream stages still run after a failure, using existing data
+                for deps in waiting_on.values():
+                    deps.discard(script_name)
+    
+    results['wall_time'] = time.perf_counter() - run_start
+    results['counters'] = get_stage_counters()
+    path_times = critical_path_times(graph, timings)
+    
+    for script_name, description, _ in SCRIPT_ORDER:
+        results['timings'][description] = timings.get(script_name, 0.0)
+        results['critical_path'][description] = path_times[script_name]
     
     return results
 
@@ -128,8 +323,25 @@ def print_summary(results):
     logger.info("=" * 60)
     logger.info(f"Total Scripts: {results['total']}")
     logger.info(f"Successful: {results['successful']}")
+    logger.info(f"Keyspace exhausted: {results['exhausted']}")
     logger.info(f"Failed: {results['failed']}")
     
+    logger.info(f"{'Stage timings:':<24} {'stage':>9} {'crit path':>10}")
+    for description, elapsed in results['timings'].items():
+        logger.info(f"  {description:<22} {elapsed:>8.2f}s {results['critical_path'][description]:>9.2f}s")
+    logger.info(f"  {'Critical path':<22} {max(results['critical_path'].values()):>8.2f}s")
+    logger.info(f"  {'Wall time':<22} {results['wall_time']:>8.2f}s")
+    
+    # One record carrying every table's counters (as fields in JSON log mode)
+    logger.info("Rows per table:", extra={'event': 'run_counters', 'counters': results['counters']})
+    for table, counts in results['counters'].items():
+        logger.info(f"  {table:<22} {counts['success']:>8,} created {counts['failed']:>6,} failed")
+    
+    if results['exhausted'] > 0:
+        logger.info("Keyspace exhausted (not failures):")
+        for script in results['exhausted_scripts']:
+            logger.info(f"  - {script}")
+    
     if results['failed'] > 0:
         logger.warning("Failed scripts:")
         for script in results['failed_scripts']:
@@ -144,10 +356,27 @@ def print_summary(results):
 # ============================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run every generation stage")
+    parser.add_argument('--set', action='append', metavar='NAME=VALUE', dest='overrides',
+                        help="Override a config setting for this run (repeatable)")
+    args = parser.parse_args()
+    
     try:
+        apply_setting_overrides(args.overrides)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e))
+    
+    try:
+        # Diff against the database as of the last changeset, so rows written
+        # since then by other entry points are recorded too
+        marks = capture_marks(get_db_connection()) if get_setting('RECORD_CHANGESETS') else None
+        
         results = run_all_scripts()
         print_summary(results)
         
+        if marks is not None:
+            write_changeset(get_db_connection(), marks)
+        
         # Exit with error code if any scripts failed
         exit_code = 0 if results['failed'] == 0 else 1
         
@@ -0,0 +1,128 @@
+"""
+Reference Data Cache
+In-memory copy of the small dimension tables used by transaction generators
+(STAFF, MACHINE, PAYMENT_METHOD, TRANSACTION_TYPE)
+Loaded once per run so header generation does no DB reads per row
+"""
+
+from seeding import rand
+from utils import execute_query
+
+# Weight towards "Normal Item Sale" (80% of transactions)
+NORMAL_SALE_TYPE_NAME = "Normal Item Sale"
+NORMAL_SALE_PROBABILITY = 0.8
+
+# ============================================
+# REFERENCE CACHE
+# ============================================
+
+class ReferenceCache:
+    """
+    Dimension tables held in memory with their active flags
+
+    staff, machines and payment_methods map ID -> Active_Status.
+    transaction_types maps ID -> dict of name/affects_inventory/affects_revenue.
+    """
+
+    def __init__(self):
+        self.staff = {}
+        self.machines = {}
+        self.payment_methods = {}
+        self.transaction_types = {}
+        self.load()
+
+    def load(self):
+        """Load (or reload) all reference tables from the database"""
+        self.staff = self._load_active_flags('STAFF', 'Staff_ID')
+        self.machines = self._load_active_flags('MACHINE', 'Machine_ID')
+        self.payment_methods = self._load_active_flags('PAYMENT_METHOD', 'Payment_Method_ID')
+
+        rows = execute_query(
+            """
+            SELECT Transaction_Type_ID, Transaction_Type_Name,
+                   Affects_Inventory, Affects_Revenue
+            FROM TRANSACTION_TYPE
+            """,
+            fetch=True
+        )
+        self.transaction_types = {
+            type_id: {
+                'name': name,
+                'affects_inventory': affects_inventory,
+                'affects_revenue': affects_revenue
+            }
+            for type_id, name, affects_inventory, affects_revenue in rows
+        }
+
+        # Pre-split ID lists so each draw is a single random index
+        self.staff_ids = list(self.staff)
+        self.active_staff_ids = [i for i, active in self.staff.items() if active == 1]
+        self.machine_ids = list(self.machines)
+        self.active_machine_ids = [i for i, active in self.machines.items() if active == 1]
+        self.payment_method_ids = list(self.payment_methods)
+        self.active_payment_method_ids = [
+            i for i, active in self.payment_methods.items() if active == 1
+        ]
+        self.transaction_type_ids = list(self.transaction_types)
+        self.normal_sale_type_id = next(
+            (i for i, t in self.transaction_types.items() if t['name'] == NORMAL_SALE_TYPE_NAME),
+            None
+        )
+
+    @staticmethod
+    def _load_active_flags(table, id_column):
+        """Load {id: Active_Status} for a table"""
+        rows = execute_query(f"SELECT {id_column}, Active_Status FROM {table}", fetch=True)
+        return dict(rows)
+
+    @staticmethod
+    def _choose(active_ids, all_ids):
+        """Pick an active ID, falling back to any ID, or None if the table is empty"""
+        if active_ids:
+            return rand.choice(active_ids)
+        if all_ids:
+            return rand.choice(all_ids)
+        return None
+
+    def random_staff_id(self, active_only=True):
+        """Get random staff ID (active staff preferred unless active_only=False)"""
+        if not active_only:
+            return rand.choice(self.staff_ids) if self.staff_ids else None
+        return self._choose(self.active_staff_ids, self.staff_ids)
+
+    def random_machine_id(self):
+        """Get random machine ID (active machines preferred)"""
+        return self._choose(self.active_machine_ids, self.machine_ids)
+
+    def random_payment_method_id(self):
+        """Get random payment method ID (active methods preferred)"""
+        return self._choose(self.active_payment_method_ids, self.payment_method_ids)
+
+    def random_transaction_type_id(self):
+        """Get random transaction type ID, weighted towards Normal Item Sale"""
+        if not self.transaction_type_ids:
+            return None
+
+        if self.normal_sale_type_id and rand.random() < NORMAL_SALE_PROBABILITY:
+            return self.normal_sale_type_id
+        return rand.choice(self.transaction_type_ids)
+
+# One cache per process, shared by every generator in the run
+_reference_cache = None
+
+def get_reference_cache():
+    """Get the reference cache for this run (loaded on first use)"""
+    global _reference_cache
+    if _reference_cache is None:
+        _reference_cache = ReferenceCache()
+    return _reference_cache
+
+def use_reference_cache(cache):
+    """Install an already loaded cache (e.g. one passed to a worker process)"""
+    global _reference_cache
+    _reference_cache = cache
+
+def clear_reference_cache():
+    """Drop the cached reference data so the next call reloads it"""
+    global _reference_cache
+    _reference_cache = None
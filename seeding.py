@@ -0,0 +1,153 @@
+"""
+Seeded Random Streams
+Reproducible generation from one MASTER_SEED (config)
+
+Each stage, shard and generation block draws from its own random.Random
+stream, derived from the master seed and the stream's path (e.g.
+('stage', 'STAFF') or ('transactions', 42)). Streams don't depend on which
+thread or process runs them, or in what order, so the same seed and row
+counts give the same rows however the work is split up.
+
+Generators draw through `rand`, which forwards to the stream installed for
+the current thread by use_stream() (or the default stream outside one).
+With MASTER_SEED = None every stream is seeded from the OS as before.
+
+Usage:
+    python seeding.py fingerprint retail_pos.db [other.db ...]
+"""
+
+import hashlib
+import random
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from config import get_setting
+
+# ============================================
+# STREAMS
+# ============================================
+
+def derive_seed(*path, master_seed=None):
+    """
+    Seed for the stream at path, derived from the master seed
+
+    Args:
+        path: Stream name parts, e.g. ('stage', 'STAFF') or ('transactions', 42)
+        master_seed: Overrides MASTER_SEED
+
+    Returns:
+        int, or None when there is no master seed (OS-seeded stream)
+    """
+    if master_seed is None:
+        master_seed = get_setting('MASTER_SEED')
+    if master_seed is None:
+        return None
+
+    digest = hashlib.sha256(repr((master_seed,) + path).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def make_stream(*path, master_seed=None):
+    """New random.Random for the stream at path"""
+    return random.Random(derive_seed(*path, master_seed=master_seed))
+
+# Stream used by threads that haven't installed one (e.g. standalone
+# scripts), created on first draw so the seed can still be overridden
+_default_stream = None
+
+def default_stream():
+    """The shared stream for draws outside use_stream()"""
+    global _default_stream
+    if _default_stream is None:
+        _default_stream = make_stream('default')
+    return _default_stream
+
+# Public random.Random methods forwarded by rand
+_STREAM_METHODS = [name for name in dir(random.Random) if not name.startswith('_')]
+
+class _StreamProxy(threading.local):
+    """
+    Per-thread stand-in for the random module's functions
+
+    The current stream's bound methods are stored on the (thread-local)
+    instance, so rand.choice() costs one attribute lookup, not a dispatch.
+    A thread's first draw binds the default stream.
+    """
+
+    def __getattr__(self, name):
+        if name != 'stream' and name not in _STREAM_METHODS:
+            raise AttributeError(name)
+        self.bind(default_stream())
+        return getattr(self, name)
+
+    def bind(self, stream):
+        """Draw from stream in the current thread"""
+        self.stream = stream
+        for name in _STREAM_METHODS:
+            setattr(self, name, getattr(stream, name))
+
+# Drop-in for the random module's functions: rand.choice(), rand.randint(), ...
+rand = _StreamProxy()
+
+def current_stream():
+    """The stream the current thread draws from"""
+    return rand.stream
+
+@contextmanager
+def use_stream(stream):
+    """Draw from stream in the current thread for the duration of the block"""
+    previous = current_stream()
+    rand.bind(stream)
+    try:
+        yield stream
+    finally:
+        rand.bind(previous)
+
+def reference_time():
+    """The run's "now": REFERENCE_TIME when pinned, else the wall clock"""
+    return get_setting('REFERENCE_TIME') or datetime.now()
+
+# ============================================
+# FINGERPRINT
+# ============================================
+
+def dataset_fingerprint(database_path):
+    """
+    SHA-256 of every table's rows in rowid order (sqlite_sequence by name)
+
+    ROW_COUNTS and CHANGESET_BASELINE are left out: they're bookkeeping
+    derived from the tables.
+    Two databases with the same fingerprint hold the same data. The file
+    bytes can still differ in SQLite's header counters, which record how
+    many transactions wrote the file.
+    """
+    conn = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    digest = hashlib.sha256()
+
+    try:
+        tables = [
+            name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN ('ROW_COUNTS', 'CHANGESET_BASELINE') ORDER BY name"
+            )
+        ]
+        for table in tables:
+            order = 'name' if table == 'sqlite_sequence' else 'rowid'
+            digest.update(f"\x00{table}\x00".encode('utf-8'))
+            for row in conn.execute(f"SELECT * FROM {table} ORDER BY {order}"):
+                digest.update(repr(row).encode('utf-8'))
+    finally:
+        conn.close()
+
+    return digest.hexdigest()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != 'fingerprint':
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(2)
+
+    fingerprints = {path: dataset_fingerprint(path) for path in sys.argv[2:]}
+    for path, fingerprint in fingerprints.items():
+        print(f"{fingerprint}  {path}")
+
+    sys.exit(0 if len(set(fingerprints.values())) == 1 else 1)
@@ -0,0 +1,191 @@
+"""
+Stats History Store
+Append-only history of database statistics snapshots in JSON Lines files
+
+Every run appends one compact line to stats_history.jsonl and never
+rewrites it, so history is kept forever and an append costs the same at
+any size. Hourly and daily rollups (the last snapshot in each hour/day)
+are kept alongside for long-range charts. Readers only read the tail of
+the file they need.
+
+Usage:
+    python stats_history.py migrate     # Convert stats_history.json
+    python stats_history.py tail [N] [--resolution raw|hourly|daily]
+"""
+
+import json
+import os
+import sys
+
+HISTORY_FILE = 'stats_history.jsonl'
+
+# Pretty-printed list written by older versions of generate_readme_stats
+LEGACY_HISTORY_FILE = 'stats_history.json'
+
+# resolution -> (file, length of the ISO timestamp prefix that names the bucket)
+ROLLUPS = {
+    'hourly': ('stats_history_hourly.jsonl', len('YYYY-MM-DDTHH')),
+    'daily': ('stats_history_daily.jsonl', len('YYYY-MM-DD')),
+}
+
+# Bytes read per step when scanning a file backwards
+TAIL_BLOCK_SIZE = 8192
+
+# ============================================
+# FILE HELPERS
+# ============================================
+
+def encode(entry):
+    """One compact JSON line"""
+    return json.dumps(entry, separators=(',', ':')) + '\n'
+
+def read_tail_lines(path, n):
+    """
+    Last n lines of a file, reading backwards from the end in blocks
+
+    Returns:
+        list of str, oldest first (empty if the file doesn't exist)
+    """
+    if n <= 0 or not os.path.exists(path):
+        return []
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+
+        # One extra newline: the file ends with one
+        while position > 0 and data.count(b'\n') <= n:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    lines = [line for line in data.decode('utf-8').split('\n') if line.strip()]
+    return lines[-n:]
+
+def last_line_offset(f):
+    """Byte offset where the last line of an open binary file starts"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    position = end
+    data = b''
+
+    while position > 0:
+        step = min(TAIL_BLOCK_SIZE, position)
+        position -= step
+        f.seek(position)
+        data = f.read(step) + data
+        newline = data.rfind(b'\n', 0, len(data) - 1)
+        if newline != -1:
+            return position + newline + 1
+
+    return 0
+
+# ============================================
+# HISTORY STORE
+# ============================================
+
+def update_rollup(path, prefix_length, entry):
+    """
+    Record entry as the latest snapshot of its bucket
+
+    The file's last line is replaced when it is from the same bucket,
+    otherwise the entry is appended.
+    """
+    bucket = entry['timestamp'][:prefix_length]
+    line = encode(entry).encode('utf-8')
+
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(line)
+        return
+
+    with open(path, 'r+b') as f:
+        offset = last_line_offset(f)
+        f.seek(offset)
+        last = f.read().decode('utf-8').strip()
+
+        if last and json.loads(last)['timestamp'][:prefix_length] == bucket:
+            f.seek(offset)
+            f.truncate()
+        else:
+            f.seek(0, os.SEEK_END)
+        f.write(line)
+
+def append_snapshot(entry):
+    """
+    Append one stats snapshot to the history and its rollups
+
+    Args:
+        entry: dict with an ISO 'timestamp' plus the stats
+    """
+    migrate_legacy_history()
+
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(encode(entry))
+
+    for path, prefix_length in ROLLUPS.values():
+        update_rollup(path, prefix_length, entry)
+
+def read_history(n, resolution='raw'):
+    """
+    Latest n snapshots, oldest first
+
+    Args:
+        resolution: 'raw' (every run), 'hourly' or 'daily'
+    """
+    path = HISTORY_FILE if resolution == 'raw' else ROLLUPS[resolution][0]
+    return [json.loads(line) for line in read_tail_lines(path, n)]
+
+def migrate_legacy_history():
+    """
+    Convert stats_history.json into the JSON Lines store (once)
+
+    Returns:
+        int: Snapshots migrated (0 if there was nothing to do)
+    """
+    if os.path.exists(HISTORY_FILE) or not os.path.exists(LEGACY_HISTORY_FILE):
+        return 0
+
+    try:
+        with open(LEGACY_HISTORY_FILE, 'r') as f:
+            entries = json.load(f)
+    except ValueError:
+        entries = []
+
+    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
+        f.writelines(encode(entry) for entry in entries)
+
+    for path, prefix_length in ROLLUPS.values():
+        buckets = {}
+        for entry in entries:
+            buckets[entry['timestamp'][:prefix_length]] = entry
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(encode(entry) for entry in buckets.values())
+
+    os.remove(LEGACY_HISTORY_FILE)
+    return len(entries)
+
+# ============================================
+# SCRIPT EXECUTION
+# ============================================
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args else None
+
+    if command == 'migrate':
+        print(f"Migrated {migrate_legacy_history()} snapshots to {HISTORY_FILE}")
+    elif command == 'tail':
+        resolution = 'raw'
+        if '--resolution' in args:
+            index = args.index('--resolution')
+            resolution = args[index + 1]
+            del args[index:index + 2]
+        count = int(args[0]) if args else 10
+        for entry in read_history(count, resolution):
+            print(entry['timestamp'], f"{entry['total_records']:,}", entry['database_size_mb'])
+    else:
+        print(__doc__.strip().split('Usage:')[1].rstrip())
+        sys.exit(2)
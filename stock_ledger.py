@@ -0,0 +1,170 @@
+"""
+Stock Ledger
+In-memory stock on hand for the products a transaction run sells from
+Loaded once per run from the product rows already in memory. Each written
+line moves its product's stock by the line quantity, in the direction of
+its transaction type (STOCK_DIRECTIONS): sales and write-offs subtract,
+returns and refunds add, and exchanges, adjustments and types that don't
+affect inventory leave it alone. Backfill also books replenishment
+receipts, so its sales never take a product below zero. Net movements
+per PLU are written to PRODUCT in one bulk UPDATE per batch, inside the
+batch's transaction, and only reach the in-memory stock once that
+transaction has committed.
+"""
+
+from config import get_setting
+from utils import get_db_connection
+
+# ============================================
+# STOCK DIRECTION
+# ============================================
+
+def stock_direction(transaction_type):
+    """
+    Sign of a transaction type's stock movement
+
+    Args:
+        transaction_type: dict with 'name' and 'affects_inventory'
+                          (see ReferenceCache.transaction_types)
+
+    Returns:
+        int: -1 (sale), +1 (return) or 0 (no stock movement)
+    """
+    if not transaction_type['affects_inventory']:
+        return 0
+    return get_setting('STOCK_DIRECTIONS').get(transaction_type['name'], -1)
+
+# ============================================
+# STOCK LEDGER
+# ============================================
+
+class StockLedger:
+    """
+    Live stock per PLU plus the net movements not yet written to PRODUCT
+
+    Lines being built can hold stock, so later lines of the same batch
+    see it gone; holds are released when the batch is written, which
+    turns its written lines into pending movements. Replenishment receipts
+    are pending movements too. commit() applies them to the stock once
+    the batch's transaction has committed; rollback() drops them (and any
+    holds) if it didn't. Stock may go negative: a line for an out-of-stock
+    product still sells one unit (backorder), unless the batch is restocked
+    with restock_lines().
+    """
+
+    def __init__(self, products, transaction_types):
+        """
+        Args:
+            products: (plu, description, avg_cost, soh) rows
+            transaction_types: ReferenceCache.transaction_types
+        """
+        self.stock = {product[0]: product[3] for product in products}
+        self.directions = {
+            type_id: stock_direction(transaction_type)
+            for type_id, transaction_type in transaction_types.items()
+        }
+        self.pending = {}
+        self.held = {}
+
+    def available(self, plu):
+        """Stock on hand for a PLU with pending movements, less what lines being built hold"""
+        return self.stock.get(plu, 0) + self.pending.get(plu, 0) + self.held.get(plu, 0)
+
+    def hold(self, plu, transaction_type_id, qty):
+        """Set stock aside for a line that hasn't been written yet"""
+        delta = self.directions.get(transaction_type_id, 0) * qty
+        if delta:
+            self.held[plu] = self.held.get(plu, 0) + delta
+
+    def receive(self, plu, qty):
+        """Book a replenishment receipt, written to PRODUCT with the next flush()"""
+        self.pending[plu] = self.pending.get(plu, 0) + qty
+
+    def restock_lines(self, headers, lines, level=None):
+        """
+        Restock products before generated lines would sell them below zero
+
+        Lines are taken in order, each holding its stock so later lines
+        see it gone. When a line takes more than its product has left, a
+        receipt first tops the stock back up to level (or the line's qty,
+        if larger), so every line is kept at its full quantity. Used by
+        backfill, whose lines are generated away from the ledger.
+
+        Args:
+            headers: Header tuples (Transaction_Type_ID at index 4)
+            lines: (header index, plu, qty, ...) tuples
+            level: Stock a receipt tops up to (default RESTOCK_LEVEL)
+
+        Returns:
+            tuple: (receipts booked, units received)
+        """
+        if level is None:
+            level = get_setting('RESTOCK_LEVEL')
+
+        directions = [self.directions.get(header[4], 0) for header in headers]
+        receipts = 0
+        received = 0
+        for line in lines:
+            plu, qty = line[1], line[2]
+            direction = directions[line[0]]
+            if direction < 0:
+                available = self.available(plu)
+                if qty > available:
+                    units = max(level, qty) - available
+                    self.receive(plu, units)
+                    receipts += 1
+                    received += units
+            self.hold(plu, headers[line[0]][4], qty)
+        return receipts, received
+
+    def move_lines(self, headers, lines):
+        """
+        Record written lines as pending movements, releasing every hold
+
+        Args:
+            headers: Header tuples (Transaction_Type_ID at index 4)
+            lines: Line tuples whose first field is their header's index
+                   in headers, then plu and qty
+        """
+        self.held = {}
+        directions = [self.directions.get(header[4], 0) for header in headers]
+
+        # Net per PLU first: one dict update per line, then one per product
+        net = {}
+        get = net.get
+        for line in lines:
+            plu = line[1]
+            net[plu] = get(plu, 0) + directions[line[0]] * line[2]
+
+        pending = self.pending
+        for plu, delta in net.items():
+            if delta:
+                pending[plu] = pending.get(plu, 0) + delta
+
+    def flush(self):
+        """
+        Write the net movement of every touched PLU to PRODUCT.SOH
+
+        Runs on the shared connection, so inside transaction() it commits
+        (or rolls back) with the lines it accounts for. The movements stay
+        pending until commit() or rollback().
+
+        Returns:
+            int: Products updated
+        """
+        deltas = [(delta, plu) for plu, delta in self.pending.items() if delta]
+        if deltas:
+            get_db_connection().executemany("UPDATE PRODUCT SET SOH = SOH + ? WHERE PLU = ?", deltas)
+        return len(deltas)
+
+    def commit(self):
+        """Apply the pending movements to the stock once they are in PRODUCT"""
+        stock = self.stock
+        for plu, delta in self.pending.items():
+            stock[plu] = stock.get(plu, 0) + delta
+        self.pending = {}
+
+    def rollback(self):
+        """Drop the pending movements and holds of a batch that wasn't written"""
+        self.pending = {}
+        self.held = {}
@@ -0,0 +1,152 @@
+"""
+Timestamp Engine
+Generates transaction timestamps in bulk as integer epoch seconds and
+formats them through lookup tables instead of one datetime + strftime each
+
+Days are weighted by WEEKDAY_TRAFFIC_WEIGHTS and hours by
+HOURLY_TRAFFIC_WEIGHTS, within BUSINESS_HOURS (open <= hour < close).
+Draws use the current seeding stream, or a numpy.random.Generator when one is given
+"""
+
+from seeding import rand
+from datetime import date, datetime, timedelta
+from config import get_setting
+
+SECONDS_PER_DAY = 86400
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+# "HH:MM:SS" for every second of the day, built on first use
+_clock_strings = None
+
+def clock_strings():
+    """Lookup table of the 86400 "HH:MM:SS" strings"""
+    global _clock_strings
+    if _clock_strings is None:
+        _clock_strings = [
+            f"{hour:02d}:{minute:02d}:{second:02d}"
+            for hour in range(24) for minute in range(60) for second in range(60)
+        ]
+    return _clock_strings
+
+def cumulative(weights):
+    """Running totals of weights, for rand.choices(cum_weights=...)"""
+    totals = []
+    running = 0
+    for weight in weights:
+        running += weight
+        totals.append(running)
+    return totals
+
+# ============================================
+# TIMESTAMP GENERATOR
+# ============================================
+
+class TimestampGenerator:
+    """
+    Random timestamps between two dates with weekday and hour-of-day weights
+
+    Timestamps are epoch seconds (naive local time, like the stored
+    Time_Stamp strings) until format() turns them into
+    "YYYY-MM-DD HH:MM:SS".
+    """
+
+    def __init__(self, start_date, end_date, hour_weights=None, weekday_weights=None,
+                 business_hours=None):
+        if hour_weights is None:
+            hour_weights = get_setting('HOURLY_TRAFFIC_WEIGHTS')
+        if weekday_weights is None:
+            weekday_weights = get_setting('WEEKDAY_TRAFFIC_WEIGHTS')
+        if business_hours is None:
+            business_hours = get_setting('BUSINESS_HOURS')
+        self.settings = (hour_weights, weekday_weights, business_hours)
+
+        # Same day range as utils.random_date: start day plus whole days between
+        first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+        day_count = (end_date - start_date).days + 1
+        self.days = [first_day + timedelta(days=offset) for offset in range(day_count)]
+        self.first_epoch_day = first_day.toordinal() - EPOCH_DAY
+
+        self.day_weights = [weekday_weights[day.weekday()] for day in self.days]
+        self.hours = list(range(business_hours['open'], business_hours['close']))
+        self.hour_weights = [hour_weights.get(hour, 1) for hour in self.hours]
+
+        self.day_cum_weights = cumulative(self.day_weights)
+        self.hour_cum_weights = cumulative(self.hour_weights)
+        self.day_prefixes = {
+            self.first_epoch_day + offset: day.strftime('%Y-%m-%d ')
+            for offset, day in enumerate(self.days)
+        }
+
+    def generate_epochs(self, n, rng=None, sort=False):
+        """
+        Draw n timestamps as epoch seconds
+
+        Args:
+            rng: Optional numpy.random.Generator (default: the current seeded stream)
+            sort: Return them in ascending order
+
+        Returns:
+            list of int, or numpy int64 array when rng is given
+        """
+        if rng is not None:
+            epochs = self._generate_epochs_numpy(n, rng)
+            if sort:
+                epochs.sort()
+            return epochs
+
+        day_offsets = rand.choices(range(len(self.days)), cum_weights=self.day_cum_weights, k=n)
+        hours = rand.choices(self.hours, cum_weights=self.hour_cum_weights, k=n)
+        first = self.first_epoch_day
+        epochs = [
+            (first + day) * SECONDS_PER_DAY + hour * 3600 + rand.randrange(3600)
+            for day, hour in zip(day_offsets, hours)
+        ]
+        if sort:
+            epochs.sort()
+        return epochs
+
+    def _generate_epochs_numpy(self, n, rng):
+        import numpy as np
+
+        day_p = np.array(self.day_weights, dtype=np.float64)
+        hour_p = np.array(self.hour_weights, dtype=np.float64)
+        day_offsets = rng.choice(len(self.days), size=n, p=day_p / day_p.sum())
+        hour_picks = rng.choice(len(self.hours), size=n, p=hour_p / hour_p.sum())
+        hours = np.array(self.hours, dtype=np.int64)[hour_picks]
+
+        return ((self.first_epoch_day + day_offsets) * SECONDS_PER_DAY
+                + hours * 3600 + rng.integers(3600, size=n))
+
+    def format(self, epochs):
+        """Format epoch seconds (within this generator's days) as "YYYY-MM-DD HH:MM:SS" strings"""
+        if hasattr(epochs, 'tolist'):
+            epochs = epochs.tolist()
+        prefixes = self.day_prefixes
+        clock = clock_strings()
+        return [prefixes[epoch // SECONDS_PER_DAY] + clock[epoch % SECONDS_PER_DAY] for epoch in epochs]
+
+    def generate(self, n, rng=None, sort=False):
+        """Draw n formatted timestamps"""
+        return self.format(self.generate_epochs(n, rng, sort))
+
+# Generators are cached per day range (building the day tables is the slow
+# part). end_date is usually now(), so keying on the raw datetimes would add
+# an entry per call; the day range only moves once a day, and only the last
+# few ranges are kept. A cached generator is rebuilt if the traffic settings
+# it was built from have been overridden since.
+MAX_CACHED_GENERATORS = 4
+_generators = {}
+
+def get_timestamp_generator(start_date, end_date):
+    """Get the cached TimestampGenerator for a date range"""
+    first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+    cache_key = (first_day, (end_date - start_date).days)
+    settings = tuple(get_setting(name) for name in
+                     ('HOURLY_TRAFFIC_WEIGHTS', 'WEEKDAY_TRAFFIC_WEIGHTS', 'BUSINESS_HOURS'))
+    generator = _generators.get(cache_key)
+    if generator is None or generator.settings != settings:
+        generator = TimestampGenerator(start_date, end_date, *settings)
+        if len(_generators) >= MAX_CACHED_GENERATORS:
+            del _generators[next(iter(_generators))]
+        _generators[cache_key] = generator
+    return generator
@@ -11,76 +11,377 @@ Utility functions for data generation
 Shared helper functions used across all generators
 """
 
+import os
+import re
+import json
+import queue
+import atexit
 import sqlite3
 import logging
-import random
+from logging.handlers import QueueHandler, QueueListener
+from seeding import rand
 import string
+import threading
+from array import array
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from config import DATABASE_PATH, LOG_FILE
+from config import get_setting, get_log_file, apply_overrides
 
 # ============================================
 # LOGGING SETUP
 # ============================================
 
-def setup_logger(script_name):
-    """Setup logging for each script"""
-    logger = logging.getLogger(script_name)
-    logger.setLevel(logging.INFO)
-    
-    # File handler
-    fh = logging.FileHandler(LOG_FILE)
-    fh.setLevel(logging.INFO)
-    
-    # Console handler
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
+# Every logger hands its records to one queue; a background listener thread
+# does the formatting and the file/console writes, so logging never blocks
+# a generator's insert loop. The listener (and the log file) only start
+# when the first record is logged, so importing a module does no I/O.
+_log_queue = queue.SimpleQueue()
+_log_listener = None
+_log_listener_lock = threading.Lock()
+
+# Attributes every LogRecord has; anything else came from extra=
+_STANDARD_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields"""
     
-    # Formatter
-    formatter = logging.Formatter(
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_FIELDS:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def get_log_formatter():
+    """Formatter for the configured LOG_FORMAT"""
+    if get_setting('LOG_FORMAT') == 'json':
+        return JsonFormatter(datefmt='%Y-%m-%dT%H:%M:%S')
+    return logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
+
+def start_log_listener():
+    """Start the background log writer (once per process)"""
+    global _log_listener
+    
+    with _log_listener_lock:
+        if _log_listener is not None:
+            return
+        
+        formatter = get_log_formatter()
+        log_file = get_log_file()
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        
+        # File handler
+        fh = logging.FileHandler(log_file, encoding='utf-8')
+        fh.setFormatter(formatter)
+        
+        # Console handler
+        ch = logging.StreamHandler()
+        ch.setFormatter(formatter)
+        
+        _log_listener = QueueListener(_log_queue, fh, ch)
+        _log_listener.start()
+
+class BufferedLogHandler(QueueHandler):
+    """Queues records for the background writer, starting it on first use"""
+    
+    def enqueue(self, record):
+        if _log_listener is None:
+            start_log_listener()
+        super().enqueue(record)
+
+def stop_log_listener():
+    """Write out every queued record and stop the background writer"""
+    global _log_listener
+    
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+def _restart_log_listener_in_child():
+    """A forked child has no writer thread: drop the parent's queued records (a new one starts on use)"""
+    global _log_listener
     
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    if _log_listener is not None:
+        _log_listener = None
+        while not _log_queue.empty():
+            _log_queue.get_nowait()
+
+atexit.register(stop_log_listener)
+os.register_at_fork(after_in_child=_restart_log_listener_in_child)
+
+def setup_logger(script_name):
+    """
+    Setup logging for each script
+    
+    Safe to call again for the same name: the logger's queue handler is
+    only attached once. Nothing is opened until the first record.
+    """
+    logger = logging.getLogger(script_name)
+    logger.setLevel(get_setting('LOG_LEVEL'))
+    
+    if not any(isinstance(handler, BufferedLogHandler) for handler in logger.handlers):
+        logger.addHandler(BufferedLogHandler(_log_queue))
+        logger.propagate = False
     
     return logger
 
+def apply_setting_overrides(assignments):
+    """
+    Apply --set NAME=VALUE overrides (see config.apply_overrides)
+
+    Loggers created at import time pick up an overridden LOG_LEVEL.
+    """
+    apply_overrides(assignments)
+    level = get_setting('LOG_LEVEL')
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and any(
+                isinstance(handler, BufferedLogHandler) for handler in logger.handlers):
+            logger.setLevel(level)
+
 # ============================================
 # DATABASE FUNCTIONS
 # ============================================
 
+# Shared connection state - one connection per process/thread
+_db_local = threading.local()
+
+# SQLite allows one writer at a time; threads in this process take turns
+_write_lock = threading.RLock()
+
+# Set by set_database_path(); otherwise the DATABASE_PATH setting
+_database_path = None
+
+# Set by set_db_profile(); otherwise the DB_PROFILE setting
+_db_profile = None
+
+def get_database_path():
+    """Database file the shared connection uses"""
+    return _database_path or get_setting('DATABASE_PATH')
+
+def get_db_profile(name=None):
+    """
+    A PRAGMA profile from DB_PROFILES
+
+    Args:
+        name: Profile name (default: set_db_profile(), else DB_PROFILE)
+    """
+    profiles = get_setting('DB_PROFILES')
+    name = name or _db_profile or get_setting('DB_PROFILE')
+    if name not in profiles:
+        raise ValueError(f"Unknown database profile {name!r} (expected one of: {', '.join(profiles)})")
+    return profiles[name]
+
+def open_db_connection(database_path=None, pragmas=None, profile=None):
+    """
+    Open a new SQLite connection with a PRAGMA profile
+
+    Args:
+        pragmas: Applied after the profile's (default: DB_PRAGMAS)
+        profile: Name in DB_PROFILES (see get_db_profile()); a profile
+                 with a 'mode' opens the file through a URI with that mode
+    """
+    spec = get_db_profile(profile)
+    database_path = database_path or get_database_path()
+    if spec.get('mode'):
+        conn = sqlite3.connect(f"file:{database_path}?mode={spec['mode']}", uri=True)
+    else:
+        conn = sqlite3.connect(database_path)
+    if pragmas is None:
+        pragmas = get_setting('DB_PRAGMAS')
+    for name, value in {**spec.get('pragmas', {}), **pragmas}.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
 def get_db_connection():
-    """Get SQLite database connection with foreign keys enabled"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.execute('PRAGMA foreign_keys = ON')
+    """
+    Get the shared SQLite connection for the current process/thread
+    
+    The connection is opened on first use and reused by every helper in
+    this module, so a whole generation batch runs on a single connection.
+    A forked child never reuses its parent's connection.
+    """
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None or _db_local.pid != os.getpid():
+        conn = open_db_connection()
+        _db_local.conn = conn
+        _db_local.pid = os.getpid()
     return conn
 
+def close_db_connection():
+    """Commit and close the shared connection for the current process/thread"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None and _db_local.pid == os.getpid():
+        conn.commit()
+        conn.close()
+    _db_local.conn = None
+
+atexit.register(close_db_connection)
+
+def set_database_path(database_path):
+    """Point the shared connection at another database file (reopened on next use)"""
+    global _database_path
+    close_db_connection()
+    clear_samplers()
+    clear_unique_indexes()
+    _database_path = database_path
+
+def set_db_profile(name):
+    """
+    Use another PRAGMA profile for the shared connection (reopened on next use)
+
+    None goes back to the DB_PROFILE setting.
+    """
+    global _db_profile
+    if name is not None:
+        get_db_profile(name)
+    close_db_connection()
+    _db_profile = name
+
+def checkpoint(conn=None):
+    """
+    Copy the WAL into the database file and truncate it
+
+    Does nothing outside WAL mode.
+
+    Returns:
+        tuple: (busy, WAL pages, pages checkpointed)
+    """
+    conn = conn or get_db_connection()
+    if conn.in_transaction:
+        conn.commit()
+    return conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+
+def in_transaction():
+    """Check if an explicit transaction is open on the shared connection"""
+    return getattr(_db_local, 'in_transaction', False) and _db_local.pid == os.getpid()
+
+@contextmanager
+def transaction():
+    """
+    Run a block inside one explicit transaction on the shared connection
+    
+    Commits on success and rolls back on error. Nested use joins the
+    outer transaction, and execute_query() stops committing per statement
+    while the transaction is open. Writers in other threads of this
+    process wait until the transaction ends.
+    """
+    check_cancelled()
+    conn = get_db_connection()
+    
+    if in_transaction():
+        yield conn
+        return
+    
+    with _write_lock:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        _db_local.in_transaction = True
+        
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            _db_local.in_transaction = False
+
 def execute_query(query, params=None, fetch=False):
-    """Execute a query and return results if needed"""
+    """Execute a query on the shared connection and return results if needed"""
+    check_cancelled()
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
         if fetch:
-            results = cursor.fetchall()
-            conn.close()
-            return results
-        else:
-            conn.commit()
-            lastrowid = cursor.lastrowid
-            conn.close()
-            return lastrowid
-    except sqlite3.Error as e:
-        conn.close()
-        raise e
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return cursor.fetchall()
+        
+        with _write_lock:
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                if not in_transaction():
+                    conn.commit()
+                return cursor.lastrowid
+            except sqlite3.Error as e:
+                if not in_transaction():
+                    conn.rollback()
+                raise e
+    finally:
+        cursor.close()
+
+def insert_many(query, rows, chunk_size=None):
+    """
+    Insert a batch of rows with executemany inside one transaction
+    
+    Rows are written in chunks of chunk_size. If a chunk fails (e.g. one
+    row violates a constraint) it is rolled back to a savepoint and
+    retried row by row, so a bad row only fails itself.
+    
+    Args:
+        query: Parameterised INSERT statement
+        rows: List of parameter tuples
+        chunk_size: Rows per executemany call (default from config)
+    
+    Returns:
+        list: (row_id, error) for each input row; row_id is None on failure
+    """
+    if chunk_size is None:
+        chunk_size = get_setting('INSERT_CHUNK_SIZE')
+    
+    results = []
+    
+    with transaction() as conn:
+        cursor = conn.cursor()
+        
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            cursor.execute('SAVEPOINT insert_chunk')
+            
+            try:
+                cursor.executemany(query, chunk)
+                # Rows from one executemany under the write lock get consecutive rowids
+                last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                first_id = last_id - len(chunk) + 1
+                results.extend((first_id + i, None) for i in range(len(chunk)))
+            except sqlite3.Error:
+                cursor.execute('ROLLBACK TO insert_chunk')
+                for row in chunk:
+                    try:
+                        cursor.execute(query, row)
+                        results.append((cursor.lastrowid, None))
+                    except sqlite3.Error as e:
+                        results.append((None, e))
+            finally:
+                cursor.execute('RELEASE insert_chunk')
+        
+        cursor.close()
+        
+        # Row counts are updated in the same transaction as the rows
+        table = insert_target(query)
+        if table:
+            add_row_count(conn, table, sum(1 for row_id, _ in results if row_id is not None))
+    
+    return results
 
 def record_exists(table, column, value):
     """Check if a record with given value exists"""
@@ -90,12 +391,13 @@ def record_exists(table, column, value):
 
 def get_random_record(table, column='*', where_clause=None):
     """Get a random record from a table"""
-    if where_clause:
-        query = f"SELECT {column} FROM {table} WHERE {where_clause} ORDER BY RANDOM() LIMIT 1"
-    else:
-        query = f"SELECT {column} FROM {table} ORDER BY RANDOM() LIMIT 1"
+    # Draw a rowid from the cached sampler instead of ORDER BY RANDOM()
+    rowid = get_sampler(table, 'rowid', where_clause).draw()
+    if rowid is None:
+        return None
     
-    result = execute_query(query, fetch=True)
+    query = f"SELECT {column} FROM {table} WHERE rowid = ?"
+    result = execute_query(query, (rowid,), fetch=True)
     return result[0] if result else None
 
 def get_all_records(table, column='*', where_clause=None):
@@ -107,8 +409,16 @@ def get_all_records(table, column='*', where_clause=None):
     
     return execute_query(query, fetch=True)
 
-def count_records(table, where_clause=None):
-    """Count records in a table"""
+def count_records(table, where_clause=None, exact=False):
+    """
+    Count records in a table
+    
+    Without a where_clause the count comes from the ROW_COUNTS bookkeeping
+    table; exact=True runs a real COUNT(*) instead.
+    """
+    if not where_clause and not exact:
+        return read_row_counts(get_db_connection(), [table])[table]
+    
     if where_clause:
         query = f"SELECT COUNT(*) FROM {table} WHERE {where_clause}"
     else:
@@ -117,6 +427,366 @@ def count_records(table, where_clause=None):
     result = execute_query(query, fetch=True)
     return result[0][0]
 
+# ============================================
+# ROW COUNTS
+# ============================================
+
+# Rows per table, kept up to date by insert_many() inside the same
+# transaction as the inserted rows, so stats never scan the big tables.
+# A table is seeded with one COUNT(*) the first time it is written.
+ROW_COUNTS_DDL = """
+    CREATE TABLE IF NOT EXISTS ROW_COUNTS (
+        Table_Name TEXT PRIMARY KEY,
+        Row_Count INTEGER NOT NULL DEFAULT 0 CHECK (Row_Count >= 0),
+        Updated_At TEXT
+    )
+"""
+
+_INSERT_TARGET = re.compile(r'^\s*INSERT\s+(?:OR\s+\w+\s+)?INTO\s+(\w+)', re.IGNORECASE)
+
+def insert_target(query):
+    """Table an INSERT statement writes to (None for other statements)"""
+    match = _INSERT_TARGET.match(query)
+    return match.group(1).upper() if match else None
+
+def row_counts_exist(conn):
+    """Check if the database has the ROW_COUNTS table"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ROW_COUNTS'"
+    ).fetchone()
+    return row is not None
+
+def add_row_count(conn, table, delta):
+    """
+    Add delta to table's tracked row count (call inside the write transaction)
+    
+    A table that isn't tracked yet starts from a COUNT(*), which already
+    includes this batch.
+    """
+    conn.execute(ROW_COUNTS_DDL)
+    tracked = conn.execute(
+        "SELECT 1 FROM ROW_COUNTS WHERE Table_Name = ?", (table,)
+    ).fetchone()
+    
+    if tracked is None:
+        conn.execute(
+            f"""
+            INSERT INTO ROW_COUNTS (Table_Name, Row_Count, Updated_At)
+            SELECT ?, COUNT(*), datetime('now') FROM {table}
+            """,
+            (table,)
+        )
+    elif delta:
+        conn.execute(
+            """
+            UPDATE ROW_COUNTS SET Row_Count = Row_Count + ?, Updated_At = datetime('now')
+            WHERE Table_Name = ?
+            """,
+            (delta, table)
+        )
+
+def read_row_counts(conn, tables):
+    """
+    Row counts of tables from ROW_COUNTS
+    
+    Tables that aren't tracked yet (nothing written since ROW_COUNTS was
+    added) fall back to COUNT(*).
+    
+    Args:
+        conn: Any connection to the database (read-only is fine)
+    
+    Returns:
+        dict: table -> row count
+    """
+    tracked = {}
+    if row_counts_exist(conn):
+        tracked = dict(conn.execute("SELECT Table_Name, Row_Count FROM ROW_COUNTS").fetchall())
+    
+    counts = {}
+    for table in tables:
+        if table in tracked:
+            counts[table] = tracked[table]
+        else:
+            counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+def verify_row_counts(conn, tables=None, repair=False):
+    """
+    Reconcile ROW_COUNTS with real COUNT(*) results
+    
+    Args:
+        tables: Tables to check (default: every table in the database)
+        repair: Overwrite wrong or missing counts with the real ones
+    
+    Returns:
+        list: (table, tracked count or None, actual count) for each mismatch
+    """
+    if tables is None:
+        tables = [
+            name for (name,) in conn.execute(
+                """
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+                  AND name NOT IN ('ROW_COUNTS', 'CHANGESET_BASELINE')
+                ORDER BY name
+                """
+            )
+        ]
+    
+    tracked = {}
+    if row_counts_exist(conn):
+        tracked = dict(conn.execute("SELECT Table_Name, Row_Count FROM ROW_COUNTS").fetchall())
+    
+    mismatches = []
+    for table in tables:
+        actual = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if tracked.get(table) != actual:
+            mismatches.append((table, tracked.get(table), actual))
+    
+    if repair and mismatches:
+        with _write_lock:
+            conn.execute(ROW_COUNTS_DDL)
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO ROW_COUNTS (Table_Name, Row_Count, Updated_At)
+                VALUES (?, ?, datetime('now'))
+                """,
+                [(table, actual) for table, _, actual in mismatches]
+            )
+            conn.commit()
+    
+    return mismatches
+
+# ============================================
+# RANDOM KEY SAMPLING
+# ============================================
+
+class KeySampler:
+    """
+    Draw random keys from a table in O(1) per draw
+    
+    The keys matching where_clause are loaded once into a compact array.
+    If the keys form a dense integer range (no filter, no gaps) nothing is
+    loaded and keys are drawn straight from that range.
+    """
+    
+    def __init__(self, table, key_column='rowid', where_clause=None):
+        self.table = table
+        self.key_column = key_column
+        self.where_clause = where_clause
+        self.keys = None
+        self.key_range = None
+        self.load()
+    
+    def load(self):
+        """Load (or reload) the candidate key set from the database"""
+        self.keys = None
+        self.key_range = None
+        
+        if self.where_clause is None:
+            low, high, count = execute_query(
+                f"SELECT MIN({self.key_column}), MAX({self.key_column}), COUNT(*) FROM {self.table}",
+                fetch=True
+            )[0]
+            if isinstance(low, int) and isinstance(high, int) and high - low + 1 == count:
+                self.key_range = range(low, high + 1)
+                return
+            query = f"SELECT {self.key_column} FROM {self.table}"
+        else:
+            query = f"SELECT {self.key_column} FROM {self.table} WHERE {self.where_clause}"
+        
+        keys = [row[0] for row in execute_query(query, fetch=True)]
+        
+        # Integer keys go into a 64-bit array, anything else (e.g. PLU) stays a list
+        if all(isinstance(key, int) for key in keys):
+            self.keys = array('q', keys)
+        else:
+            self.keys = keys
+    
+    def __len__(self):
+        if self.key_range is not None:
+            return len(self.key_range)
+        return len(self.keys)
+    
+    def add(self, key):
+        """Add a newly inserted key to the candidate set"""
+        if self.key_range is not None:
+            if key == self.key_range.stop:
+                self.key_range = range(self.key_range.start, key + 1)
+                return
+            self.keys = array('q', self.key_range)
+            self.key_range = None
+        self.keys.append(key)
+    
+    def draw(self):
+        """Draw one random key (None if there are no candidates)"""
+        candidates = self.key_range if self.key_range is not None else self.keys
+        if not candidates:
+            return None
+        return candidates[rand.randrange(len(candidates))]
+    
+    def draw_many(self, k):
+        """Draw k random keys in one call (with replacement)"""
+        candidates = self.key_range if self.key_range is not None else self.keys
+        if not candidates:
+            return []
+        return rand.choices(candidates, k=k)
+
+# Samplers are cached per (table, key, filter) and loaded once per run
+_samplers = {}
+
+def get_sampler(table, key_column='rowid', where_clause=None):
+    """Get the cached KeySampler for a table/key/filter combination"""
+    cache_key = (table, key_column, where_clause)
+    sampler = _samplers.get(cache_key)
+    if sampler is None:
+        sampler = KeySampler(table, key_column, where_clause)
+        _samplers[cache_key] = sampler
+    return sampler
+
+def clear_samplers(tables=None):
+    """
+    Drop cached samplers so the next draw reloads from the database
+    
+    Args:
+        tables: Only drop samplers for these tables (default: all)
+    """
+    if tables is None:
+        _samplers.clear()
+        return
+    
+    for cache_key in list(_samplers):
+        if cache_key[0] in tables:
+            _samplers.pop(cache_key, None)
+
+# ============================================
+# UNIQUENESS INDEX
+# ============================================
+
+class UniqueIndex:
+    """
+    Natural-key values of one column held in memory for uniqueness checks
+    
+    The column is loaded once; generated values are reserved as they are
+    drawn, so a candidate is checked against the table and against values
+    reserved earlier in the same batch without touching the database.
+    Reservations are kept even if the insert later fails.
+    
+    Canonical decimal keys below numeric_limit (e.g. PLUs) are kept in a
+    bitmap of numeric_limit bits instead of a set.
+    """
+    
+    def __init__(self, table, column, numeric_limit=None):
+        self.table = table
+        self.column = column
+        self.numeric_limit = numeric_limit
+        self.values = set()
+        self.bitmap = None
+        self.load()
+    
+    def load(self):
+        """Load (or reload) the column values from the database"""
+        self.values = set()
+        if self.numeric_limit:
+            self.bitmap = bytearray((self.numeric_limit + 7) // 8)
+        
+        for (value,) in execute_query(f"SELECT {self.column} FROM {self.table}", fetch=True):
+            self._add(value)
+    
+    def _bit(self, value):
+        """Bitmap position of value, or None if it belongs in the set"""
+        if self.bitmap is None:
+            return None
+        if isinstance(value, str):
+            # Only canonical digit strings, so '0123' and '123' stay distinct
+            if not value.isdigit() or (value[0] == '0' and value != '0'):
+                return None
+            value = int(value)
+        if isinstance(value, int) and 0 <= value < self.numeric_limit:
+            return value
+        return None
+    
+    def _add(self, value):
+        bit = self._bit(value)
+        if bit is None:
+            self.values.add(value)
+        else:
+            self.bitmap[bit >> 3] |= 1 << (bit & 7)
+    
+    def __contains__(self, value):
+        bit = self._bit(value)
+        if bit is None:
+            return value in self.values
+        return bool(self.bitmap[bit >> 3] & (1 << (bit & 7)))
+    
+    def __iter__(self):
+        """Iterate set-held values (bitmap-held values are not listed)"""
+        return iter(self.values)
+    
+    def reserve(self, value):
+        """
+        Reserve value if it is free
+        
+        Returns:
+            bool: True if reserved, False if already taken
+        """
+        if value in self:
+            return False
+        self._add(value)
+        return True
+
+# Uniqueness indexes are cached per (table, column) and loaded once per run
+_unique_indexes = {}
+
+def get_unique_index(table, column, numeric_limit=None):
+    """Get the cached UniqueIndex for a table's natural-key column"""
+    cache_key = (table, column)
+    index = _unique_indexes.get(cache_key)
+    if index is None:
+        index = UniqueIndex(table, column, numeric_limit)
+        _unique_indexes[cache_key] = index
+    return index
+
+def clear_unique_indexes(tables=None):
+    """
+    Drop cached uniqueness indexes so the next use reloads from the database
+    
+    Args:
+        tables: Only drop indexes for these tables (default: all)
+    """
+    if tables is None:
+        _unique_indexes.clear()
+        return
+    
+    for cache_key in list(_unique_indexes):
+        if cache_key[0] in tables:
+            _unique_indexes.pop(cache_key, None)
+
+# ============================================
+# STAGE CANCELLATION
+# ============================================
+
+# Cancel event of the stage running in this thread (set by master_runner)
+_stage_local = threading.local()
+
+class StageCancelled(BaseException):
+    """
+    Raised in a stage's thread once its cancel event is set
+
+    A BaseException, so the per-record `except Exception` handlers in the
+    generators don't swallow it; transaction() rolls back on the way out.
+    """
+
+def set_cancel_event(event):
+    """Give the stage running in this thread a cancel event (None to clear it)"""
+    _stage_local.cancel = event
+
+def check_cancelled():
+    """Raise StageCancelled if this thread's stage has been cancelled"""
+    event = getattr(_stage_local, 'cancel', None)
+    if event is not None and event.is_set():
+        raise StageCancelled()
+
 # ============================================
 # DATA GENERATION HELPERS
 # ============================================
@@ -139,30 +809,83 @@ def generate_unique_value(generator_func, checker_func, max_retries=10):
             return value
     return None
 
+def reserve_unique_value(generator_func, unique_index, max_retries=10):
+    """
+    Generate a value and reserve it in a UniqueIndex
+    
+    Args:
+        generator_func: Function that generates a value
+        unique_index: UniqueIndex of the column the value is for
+        max_retries: Maximum number of attempts
+    
+    Returns:
+        Reserved value or None if max retries exceeded
+    """
+    for _ in range(max_retries):
+        value = generator_func()
+        if unique_index.reserve(value):
+            return value
+    return None
+
+def remaining_keys(keyspace, unique_index):
+    """Values of a finite keyspace that are not taken yet"""
+    return [value for value in keyspace if value not in unique_index]
+
+def sample_keyspace(keyspace, unique_index, k):
+    """
+    Reserve up to k free values of a finite keyspace, without replacement
+    
+    Args:
+        keyspace: Every value the generator can produce
+        unique_index: UniqueIndex of the column the values are for
+        k: Number of values wanted
+    
+    Returns:
+        list: Reserved values (fewer than k when the keyspace runs out)
+    """
+    remaining = remaining_keys(keyspace, unique_index)
+    chosen = rand.sample(remaining, min(k, len(remaining)))
+    for value in chosen:
+        unique_index.reserve(value)
+    return chosen
+
+class GenerationResult(tuple):
+    """
+    (success_count, failed_count) returned by a generator, flagged when the
+    generator's finite keyspace ran out before the batch was filled
+    
+    Unpacks like the plain tuple, so existing callers are unaffected.
+    """
+    
+    def __new__(cls, success_count, failed_count, keyspace_exhausted=False):
+        result = super().__new__(cls, (success_count, failed_count))
+        result.keyspace_exhausted = keyspace_exhausted
+        return result
+
 def random_string(length=10, chars=string.ascii_uppercase + string.digits):
     """Generate random string"""
-    return ''.join(random.choice(chars) for _ in range(length))
+    return ''.join(rand.choice(chars) for _ in range(length))
 
 def random_phone():
     """Generate random Australian phone number"""
     prefixes = ['04', '02', '03', '07', '08']
-    prefix = random.choice(prefixes)
+    prefix = rand.choice(prefixes)
     if prefix == '04':  # Mobile
-        return f"{prefix}{random.randint(10000000, 99999999)}"
+        return f"{prefix}{rand.randint(10000000, 99999999)}"
     else:  # Landline
-        return f"{prefix} {random.randint(1000, 9999)} {random.randint(1000, 9999)}"
+        return f"{prefix} {rand.randint(1000, 9999)} {rand.randint(1000, 9999)}"
 
 def random_email(name):
     """Generate random email address"""
     domains = ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'example.com']
     clean_name = name.lower().replace(' ', '.').replace("'", "")
-    return f"{clean_name}@{random.choice(domains)}"
+    return f"{clean_name}@{rand.choice(domains)}"
 
 def random_date(start_date, end_date):
     """Generate random date between start and end"""
     time_between = end_date - start_date
     days_between = time_between.days
-    random_days = random.randint(0, days_between)
+    random_days = rand.randint(0, days_between)
     return start_date + timedelta(days=random_days)
 
 def random_datetime(start_date, end_date, business_hours_only=True):
@@ -170,12 +893,13 @@ def random_datetime(start_date, end_date, business_hours_only=True):
     random_date_val = random_date(start_date, end_date)
     
     if business_hours_only:
-        hour = random.randint(8, 22)  # 8 AM to 10 PM
+        business_hours = get_setting('BUSINESS_HOURS')
+        hour = rand.randrange(business_hours['open'], business_hours['close'])
     else:
-        hour = random.randint(0, 23)
+        hour = rand.randint(0, 23)
     
-    minute = random.randint(0, 59)
-    second = random.randint(0, 59)
+    minute = rand.randint(0, 59)
+    second = rand.randint(0, 59)
     
     return random_date_val.replace(hour=hour, minute=minute, second=second)
 
@@ -189,17 +913,19 @@ def format_date_sqlite(dt):
 
 def weighted_random_choice(choices, weights):
     """Make weighted random choice"""
-    return random.choices(choices, weights=weights, k=1)[0]
+    return rand.choices(choices, weights=weights, k=1)[0]
 
 def random_boolean(true_probability=0.5):
     """Generate random boolean with given probability of True"""
-    return random.random() < true_probability
+    return rand.random() < true_probability
+
+# Cent endings used by round_price (equally likely)
+PRICE_ENDINGS = [0.49, 0.99, 0.95, 0.89, 0.79, 0.69]
 
 def round_price(price):
     """Round price to nearest 0.49 or 0.99 (common retail pricing)"""
     whole = int(price)
-    decimal_choices = [0.49, 0.99, 0.95, 0.89, 0.79, 0.69]
-    return whole + random.choice(decimal_choices)
+    return whole + rand.choice(PRICE_ENDINGS)
 
 # ============================================
 # BUSINESS LOGIC HELPERS
@@ -255,12 +981,49 @@ def validate_length(value, max_length, field_name):
 # LOGGING HELPERS
 # ============================================
 
+# Rows generated per table in this process: {table: {'success': n, 'failed': n}}
+_stage_counters = {}
+_counters_lock = threading.Lock()
+
+def clear_stage_counters():
+    """Reset the per-table counters (e.g. at the start of a run)"""
+    with _counters_lock:
+        _stage_counters.clear()
+
+def get_stage_counters():
+    """Copy of the per-table success/failed counters accumulated by log_generation_summary()"""
+    with _counters_lock:
+        return {table: dict(counts) for table, counts in _stage_counters.items()}
+
 def log_generation_summary(logger, table_name, success_count, failed_count, batch_size):
-    """Log summary of generation run"""
+    """
+    Log summary of generation run and add it to the per-table counters
+    
+    With LOG_FORMAT = 'json' the summary is one record whose fields hold
+    the counts, instead of the text banner.
+    """
+    with _counters_lock:
+        counts = _stage_counters.setdefault(table_name, {'success': 0, 'failed': 0})
+        counts['success'] += success_count
+        counts['failed'] += failed_count
+    
+    success_rate = success_count / batch_size * 100 if batch_size else 0.0
+    
+    if get_setting('LOG_FORMAT') == 'json':
+        logger.info(f"Generation Summary for {table_name}", extra={
+            'event': 'generation_summary',
+            'table': table_name,
+            'batch_size': batch_size,
+            'success': success_count,
+            'failed': failed_count,
+            'success_rate': round(success_rate, 1)
+        })
+        return
+    
     logger.info("=" * 60)
     logger.info(f"Generation Summary for {table_name}")
     logger.info(f"Batch Size: {batch_size}")
     logger.info(f"Successfully Generated: {success_count}")
     logger.info(f"Failed: {failed_count}")
-    logger.info(f"Success Rate: {(success_count/batch_size*100):.1f}%")
-    logger.info("=" * 60)
\ No newline at end of file
+    logger.info(f"Success Rate: {success_rate:.1f}%")
+    logger.info("=" * 60)
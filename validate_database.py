@@ -4,10 +4,10 @@ Ensures database structure matches expected schema
 Used by GitHub Actions for testing
 """
 
-import sqlite3
 import sys
 import os
-from config import DATABASE_PATH
+from config import get_setting
+from utils import open_db_connection
 
 # Expected schema
 EXPECTED_SCHEMA = {
@@ -37,16 +37,16 @@ def get_table_columns(conn, table_name):
 def validate_schema():
     """Validate database schema"""
     print("Starting database schema validation...")
+    database_path = get_setting('DATABASE_PATH')
     
     # Check if database exists
-    if not os.path.exists(DATABASE_PATH):
-        print(f"⚠️  Database file not found: {DATABASE_PATH}")
+    if not os.path.exists(database_path):
+        print(f"⚠️  Database file not found: {database_path}")
         print("This is normal for first run. Database will be created.")
         return True
     
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.execute('PRAGMA foreign_keys = ON')
+        conn = open_db_connection(database_path, profile='readonly')
         
         all_valid = True
         
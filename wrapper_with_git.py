@@ -14,7 +14,7 @@ Wraps any generator script to automatically commit after execution
 import sys
 import subprocess
 from datetime import datetime
-from config import AUTO_COMMIT_ENABLED, AUTO_PUSH_ENABLED
+from config import get_setting
 from git_commit_after_generation import auto_commit_and_push
 from utils import setup_logger
 
@@ -61,9 +61,9 @@ def run_generator_with_git(script_path):
         return 1
     
     # Auto-commit if enabled
-    if AUTO_COMMIT_ENABLED:
+    if get_setting('AUTO_COMMIT_ENABLED'):
         logger.info("Auto-commit enabled, committing changes...")
-        success = auto_commit_and_push(script_name, AUTO_PUSH_ENABLED)
+        success = auto_commit_and_push(script_name, get_setting('AUTO_PUSH_ENABLED'))
         
         if not success:
             logger.warning("Auto-commit failed, but data was generated")